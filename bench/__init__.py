@@ -0,0 +1 @@
+# bench — benchmark offline della pipeline (fixture TE registrate, LLM finto, DB sintetico)
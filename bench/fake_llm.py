@@ -0,0 +1,171 @@
+# bench/fake_llm.py — stand-in locale dell'endpoint Anthropic Messages (POST /v1/messages)
+# - Latenza configurabile (media + jitter), code lente (slow_rate richieste a slow_ms) e iniezione di 429 con retry-after
+# - Risposte deterministiche nel formato Messages (content[0].text + usage) in base al tipo di prompt
+# - Message Batches: POST /v1/messages/batches, GET .../{id}, GET .../{id}/results (JSONL), POST .../{id}/cancel;
+#   la batch risulta "ended" dopo batch_delay_ms, le richieste "throttled" diventano risultati "errored"
+# - Il client ufficiale si punta qui con ANTHROPIC_BASE_URL=http://127.0.0.1:<porta>
+# Uso: python -m bench.fake_llm [--port 8766] [--latency-ms 200] [--jitter-ms 50] [--rate-429 0.05] [--batch-delay-ms 2000]
+#                               [--slow-rate 0.05 --slow-ms 3000]
+
+import argparse, json, random, threading, time, uuid
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+LOREM_IT = ("L'indicatore ha mostrato una variazione in linea con le attese, confermando il quadro "
+            "di moderazione della domanda interna e un graduale rientro delle pressioni sui prezzi. ")
+
+def _text_for(prompt: str) -> str:
+    if prompt.startswith("Traduci in ITALIANO"):
+        title = prompt.split("\n\n", 1)[-1].strip()
+        return f"Il titolo tradotto in italiano è: {title} (IT)"
+    if prompt.startswith("Scrivi un riassunto"):
+        return (LOREM_IT * 4).strip()
+    return "\n\n".join([(LOREM_IT * 5).strip()] * 4)
+
+class FakeMessagesHandler(BaseHTTPRequestHandler):
+    server_version = "FakeAnthropic/1.0"
+    latency_s = 0.0
+    jitter_s = 0.0
+    rate_429 = 0.0
+    slow_rate = 0.0
+    slow_s = 0.0
+    rng = random.Random(7)
+    lock = threading.Lock()
+    stats = {"requests": 0, "throttled": 0}
+    batch_delay_s = 0.0
+    batches: dict = {}
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, code: int, obj, headers=None):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass   # client andato via (copia hedged scaduta o annullata)
+
+    def _message(self, params: dict) -> dict:
+        prompt = "".join(m.get("content", "") if isinstance(m.get("content"), str) else ""
+                         for m in params.get("messages", []))
+        text = _text_for(prompt)
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+            "model": params.get("model", "fake"), "stop_reason": "end_turn", "stop_sequence": None,
+            "content": [{"type": "text", "text": text}],
+            "usage": {"input_tokens": max(1, len(prompt) // 4), "output_tokens": max(1, len(text) // 4)},
+        }
+
+    # ---- Message Batches ----
+    def _batch_obj(self, b: dict) -> dict:
+        ended = b["cancelled"] or (time.time() - b["created"] >= self.batch_delay_s)
+        n = len(b["requests"])
+        if ended and b["results"] is None:
+            with self.lock:
+                b["results"] = []
+                for r in b["requests"]:
+                    self.stats["batch_requests"] = self.stats.get("batch_requests", 0) + 1
+                    if b["cancelled"]:
+                        res = {"type": "canceled"}
+                    elif self.rng.random() < self.rate_429:
+                        res = {"type": "errored", "error": {"type": "error", "error": {"type": "overloaded_error", "message": "fake"}}}
+                    else:
+                        res = {"type": "succeeded", "message": self._message(r.get("params", {}))}
+                    b["results"].append({"custom_id": r["custom_id"], "result": res})
+        counts = {"processing": 0 if ended else n, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for r in b["results"] or []:
+            counts[r["result"]["type"]] = counts.get(r["result"]["type"], 0) + 1
+        iso = lambda ts: datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        return {
+            "id": b["id"], "type": "message_batch", "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts, "created_at": iso(b["created"]), "expires_at": iso(b["created"] + 86400),
+            "ended_at": iso(time.time()) if ended else None, "archived_at": None, "cancel_initiated_at": None,
+            "results_url": f"http://{self.headers.get('Host')}/v1/messages/batches/{b['id']}/results" if ended else None,
+        }
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts[:3] != ["v1", "messages", "batches"] or len(parts) < 4 or parts[3] not in self.batches:
+            return self._json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+        b = self.batches[parts[3]]
+        obj = self._batch_obj(b)
+        if len(parts) == 5 and parts[4] == "results":
+            if b["results"] is None:
+                return self._json(400, {"type": "error", "error": {"type": "invalid_request_error", "message": "in progress"}})
+            data = "".join(json.dumps(r) + "\n" for r in b["results"]).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/binary")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self._json(200, obj)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts[:3] == ["v1", "messages", "batches"]:
+            if len(parts) == 3:
+                b = {"id": f"msgbatch_{uuid.uuid4().hex[:20]}", "created": time.time(),
+                     "requests": body.get("requests", []), "results": None, "cancelled": False}
+                with self.lock:
+                    self.batches[b["id"]] = b
+                    self.stats["batches"] = self.stats.get("batches", 0) + 1
+                return self._json(200, self._batch_obj(b))
+            if len(parts) == 5 and parts[4] == "cancel" and parts[3] in self.batches:
+                self.batches[parts[3]]["cancelled"] = True
+                return self._json(200, self._batch_obj(self.batches[parts[3]]))
+            return self._json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+        with self.lock:
+            self.stats["requests"] += 1
+            throttle = self.rng.random() < self.rate_429
+            delay = max(0.0, self.latency_s + self.rng.uniform(-self.jitter_s, self.jitter_s))
+            if self.rng.random() < self.slow_rate:
+                delay = self.slow_s; self.stats["slow"] = self.stats.get("slow", 0) + 1
+            if throttle: self.stats["throttled"] += 1
+        if self.path.rstrip("/") != "/v1/messages":
+            return self._json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+        if throttle:
+            return self._json(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "rate_limit (fake)"}},
+                              headers={"retry-after": "0"})
+        time.sleep(delay)
+        self._json(200, self._message(body))
+
+def start_fake_llm(port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0, rate_429: float = 0.0, seed: int = 7,
+                   batch_delay_ms: float = 0.0, slow_rate: float = 0.0, slow_ms: float = 0.0):
+    """Avvia il server in un thread daemon; ritorna (server, base_url, stats)."""
+    stats = {"requests": 0, "throttled": 0}
+    handler = type("BoundFakeMessagesHandler", (FakeMessagesHandler,), {
+        "latency_s": latency_ms / 1000.0, "jitter_s": jitter_ms / 1000.0, "rate_429": rate_429,
+        "slow_rate": slow_rate, "slow_s": slow_ms / 1000.0, "rng": random.Random(seed), "lock": threading.Lock(), "stats": stats,
+        "batch_delay_s": batch_delay_ms / 1000.0, "batches": {},
+    })
+    srv = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True, name="fake-llm").start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}", stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake Anthropic Messages endpoint")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--latency-ms", type=float, default=200.0)
+    ap.add_argument("--jitter-ms", type=float, default=50.0)
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--batch-delay-ms", type=float, default=2000.0)
+    ap.add_argument("--slow-rate", type=float, default=0.0, help="frazione di richieste lente (coda di latenza)")
+    ap.add_argument("--slow-ms", type=float, default=3000.0)
+    args = ap.parse_args()
+    srv, url, _ = start_fake_llm(args.port, args.latency_ms, args.jitter_ms, args.rate_429,
+                                 batch_delay_ms=args.batch_delay_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    print(f"Fake Anthropic su {url} (export ANTHROPIC_BASE_URL={url})")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
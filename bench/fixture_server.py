@@ -0,0 +1,124 @@
+# bench/fixture_server.py — server HTTP locale che imita il TE stream a partire dalle card registrate
+# - /stream?i=economy: prima pagina + bottone "More" (markup come sul sito: li.te-stream-item, a.te-stream-country, ...)
+# - /ws/stream.ashx?start=N&size=M: frammento HTML delle card successive (chiamato dal bottone "More")
+# - Età rese relative al momento della richiesta ("N hours ago", date assolute oltre i 7 giorni)
+# - ETag su ogni risposta: If-None-Match uguale -> 304 (per il motore HTTP dello scraper)
+# Uso: python -m bench.fixture_server [--port 8765] [--page-size 20] [--latency-ms 0]
+
+import argparse, hashlib, html, json, threading, time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import List, Dict, Any
+from urllib.parse import urlparse, parse_qs
+
+CARDS_PATH = Path(__file__).parent / "fixtures" / "te_stream_cards.json"
+IMPACT_CLASS = {3: "text-danger", 2: "text-primary", 1: "text-info", 0: ""}
+
+def load_cards(path: Path = CARDS_PATH) -> List[Dict[str, Any]]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def _time_text(age_hours: float, now: datetime) -> str:
+    if age_hours < 1: return f"{max(1, int(age_hours * 60))} minutes ago"
+    if age_hours < 24: return f"{int(age_hours)} hours ago"
+    if age_hours < 24 * 7: return f"{int(age_hours // 24)} days ago"
+    return (now - timedelta(hours=age_hours)).strftime("%Y-%m-%d")
+
+def render_card(c: Dict[str, Any], now: datetime) -> str:
+    e = html.escape
+    slug = c["country"].lower().replace(" ", "-")
+    return (
+        '<li class="te-stream-item">'
+        f'<span class="te-stream-impact {IMPACT_CLASS.get(int(c.get("importance", 0)), "")}"></span>'
+        f'<a class="te-stream-country" href="/{slug}/indicators">{e(c["country"])}</a> '
+        f'<a class="te-stream-title" href="/{slug}/news">{e(c["title"])}</a>'
+        f'<span class="te-stream-item-description">{e(c["description"])}</span>'
+        f'<small>{e(_time_text(float(c["age_hours"]), now))}</small>'
+        f'<a class="te-stream-category" href="/{slug}/{e(c.get("category","").lower().replace(" ", "-"))}">{e(c.get("category",""))}</a>'
+        '</li>'
+    )
+
+PAGE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Stream - Economy</title></head>
+<body>
+<ul id="stream" class="list-unstyled">{cards}</ul>
+<button id="stream-btn" class="btn" data-start="{next_start}">More</button>
+<script>
+const btn = document.getElementById('stream-btn');
+btn.addEventListener('click', async () => {{
+  const start = parseInt(btn.dataset.start, 10);
+  btn.disabled = true;
+  const r = await fetch('/ws/stream.ashx?i=economy&start=' + start + '&size={page_size}');
+  const frag = await r.text();
+  if (!frag.trim()) {{ btn.style.display = 'none'; return; }}
+  document.getElementById('stream').insertAdjacentHTML('beforeend', frag);
+  btn.dataset.start = String(start + {page_size});
+  btn.disabled = false;
+}});
+</script>
+</body></html>"""
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "TEFixture/1.0"
+    cards: List[Dict[str, Any]] = []
+    page_size = 20
+    latency_s = 0.0
+    requests_served = 0
+    not_modified = 0
+
+    def log_message(self, fmt, *args):  # silenzioso
+        pass
+
+    def _send(self, code: int, body: str, ctype: str = "text/html; charset=utf-8"):
+        data = body.encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(data).hexdigest()[:16]
+        if code == 200 and self.headers.get("If-None-Match") == etag:
+            type(self).not_modified += 1
+            self.send_response(304); self.send_header("ETag", etag); self.end_headers()
+            return
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        type(self).requests_served += 1
+        if self.latency_s: time.sleep(self.latency_s)
+        u = urlparse(self.path); q = parse_qs(u.query)
+        now = datetime.now()
+        if u.path == "/stream":
+            cards = "".join(render_card(c, now) for c in self.cards[:self.page_size])
+            return self._send(200, PAGE_TEMPLATE.format(cards=cards, next_start=self.page_size, page_size=self.page_size))
+        if u.path == "/ws/stream.ashx":
+            start = int((q.get("start") or ["0"])[0]); size = int((q.get("size") or [str(self.page_size)])[0])
+            return self._send(200, "".join(render_card(c, now) for c in self.cards[start:start + size]))
+        return self._send(404, "not found", "text/plain")
+
+def start_fixture_server(cards: List[Dict[str, Any]] = None, port: int = 0,
+                         page_size: int = 20, latency_ms: float = 0.0):
+    """Avvia il server in un thread daemon; ritorna (server, base_url dello stream)."""
+    handler = type("BoundFixtureHandler", (FixtureHandler,), {
+        "cards": cards if cards is not None else load_cards(),
+        "page_size": page_size, "latency_s": latency_ms / 1000.0, "requests_served": 0, "not_modified": 0,
+    })
+    srv = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True, name="te-fixture").start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/stream?i=economy"
+
+def main():
+    ap = argparse.ArgumentParser(description="Fixture server TE stream")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--page-size", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    srv, url = start_fixture_server(port=args.port, page_size=args.page_size, latency_ms=args.latency_ms)
+    print(f"TE fixture stream su {url} (Ctrl+C per uscire)")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
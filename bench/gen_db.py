@@ -0,0 +1,49 @@
+# bench/gen_db.py — genera un news_cache.sqlite sintetico a scala 1×/10×/100× dalle card registrate
+# - Stesso schema di db_init (colonne derivate incluse: i rollup restano coerenti); chiavi/titoli univoci per replica, età distribuite sui 60 giorni
+# - Deterministico (seed) per confronti stabili con la baseline
+# Uso: python -m bench.gen_db --scale 10 --out /tmp/news_cache_10x.sqlite
+
+import argparse, hashlib, random, time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any
+
+import te_macro_agent_final_multi as ag
+from bench.fixture_server import load_cards, _time_text
+
+def generate_db(path: str, scale: int = 1, seed: int = 42, cards: List[Dict[str, Any]] = None) -> int:
+    cards = cards if cards is not None else load_cards()
+    rng = random.Random(seed)
+    p = Path(path)
+    if p.exists(): p.unlink()
+    conn = ag.db_init(str(p))
+    now_ts = time.time(); now = datetime.now()
+    rows = []
+    for r in range(scale):
+        for c in cards:
+            age_h = float(c["age_hours"]) if r == 0 else rng.uniform(0.5, 60 * 24.0)
+            title = c["title"] if r == 0 else f"{c['title']} ({r})"
+            key = hashlib.sha1(f"{c['country']}|{title}|{r}".encode("utf-8")).hexdigest()
+            seen = now_ts - age_h * 3600.0 * rng.uniform(0.0, 0.5)
+            rows.append((key, c["country"], title, c["description"], _time_text(age_h, now),
+                         int(c.get("importance", 0)), c.get("category", ""), seen, seen,
+                         *ag._derive_columns({"title": title, "description": c["description"]})))
+    conn.executemany("""
+        INSERT OR REPLACE INTO te_items(key,country,title,description,time_text,importance,category_raw,first_seen_ts,last_seen_ts,
+                                        category_mapped,topic_sig,is_result)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+    """, rows)
+    conn.commit(); conn.close()
+    return len(rows)
+
+def main():
+    ap = argparse.ArgumentParser(description="DB sintetico per i benchmark")
+    ap.add_argument("--scale", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+    n = generate_db(args.out, args.scale, args.seed)
+    print(f"{n} righe -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench/make_fixtures.py — registra le card del TE stream dalla cache locale in bench/fixtures/te_stream_cards.json
+# - Le card reali (news_cache.sqlite) sono la base; per gli altri paesi del menu si derivano varianti testuali
+# - L'età è salvata in ore rispetto alla cattura: il fixture server la rende relativa ("N hours/days ago")
+# Uso: python -m bench.make_fixtures [--db news_cache.sqlite] [--per-country 60]
+
+import argparse, json, sqlite3
+from pathlib import Path
+
+from dateutil import parser as dtparser
+
+import te_macro_agent_final_multi as ag
+
+FIXTURES = Path(__file__).parent / "fixtures"
+CARDS_PATH = FIXTURES / "te_stream_cards.json"
+
+# varianti per paese: (nome nel testo, aggettivo/sigla)
+COUNTRY_ALIASES = {
+    "Euro Area": ("Euro Area", "Euro Area"), "Germany": ("Germany", "German"),
+    "United Kingdom": ("UK", "UK"), "Italy": ("Italy", "Italian"), "France": ("France", "French"),
+    "China": ("China", "Chinese"), "Japan": ("Japan", "Japanese"),
+}
+# colore TE simulato per categoria (classe CSS come sul sito)
+IMPACT_BY_CATEGORY = [
+    (("inflation", "cpi", "pce", "gdp", "payrolls", "unemployment", "jobless", "interest rate"), 3),
+    (("pmi", "ism", "confidence", "sentiment", "retail", "housing", "mortgage", "industrial"), 2),
+    (("bond", "crude", "gas", "stock"), 1),
+]
+
+def _impact(category_raw: str, title: str) -> int:
+    t = f"{category_raw} {title}".lower()
+    for keys, imp in IMPACT_BY_CATEGORY:
+        if any(k in t for k in keys): return imp
+    return 0
+
+def _age_hours(time_text: str, seen_ts: float) -> float:
+    """Età al momento della cattura (last_seen_ts), non rispetto a oggi."""
+    if ag.REL_RX.search(time_text or ""):
+        age = ag.parse_age_days_from_text(time_text)
+    else:
+        try: age = max(0.0, (seen_ts - dtparser.parse(time_text, fuzzy=True).timestamp()) / 86400.0)
+        except Exception: age = 0.0
+    return round(age * 24.0, 2)
+
+def _variant(text: str, country: str) -> str:
+    name, adj = COUNTRY_ALIASES[country]
+    for src, dst in (("United States", name), ("U.S.", adj), ("US ", adj + " "), ("American", adj)):
+        text = text.replace(src, dst)
+    return text
+
+def build_cards(db_path: str, per_country: int) -> list:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("""
+        SELECT country,title,description,time_text,category_raw,last_seen_ts
+        FROM te_items ORDER BY last_seen_ts DESC, key
+    """).fetchall()
+    conn.close()
+    cards = []
+    for c, t, d, tt, cat, seen in rows:
+        cards.append({"country": c, "title": t, "description": d, "category": cat,
+                      "importance": _impact(cat, t), "age_hours": _age_hours(tt, seen)})
+    base = [x for x in cards if x["country"] == "United States"][:per_country]
+    for country in COUNTRY_ALIASES:
+        for x in base:
+            cards.append(dict(x, country=country, title=_variant(x["title"], country),
+                              description=_variant(x["description"], country)))
+    # ordine dello stream: più recenti in alto
+    cards.sort(key=lambda x: (x["age_hours"], x["country"], x["title"]))
+    return cards
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--db", default=str(ag.script_dir / "news_cache.sqlite"))
+    ap.add_argument("--per-country", type=int, default=60)
+    args = ap.parse_args()
+    cards = build_cards(args.db, args.per_country)
+    FIXTURES.mkdir(parents=True, exist_ok=True)
+    CARDS_PATH.write_text(json.dumps(cards, ensure_ascii=False, indent=0), encoding="utf-8")
+    print(f"{len(cards)} card -> {CARDS_PATH}")
+
+if __name__ == "__main__":
+    main()
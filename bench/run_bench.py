@@ -0,0 +1,262 @@
+# bench/run_bench.py — benchmark offline della pipeline con confronto contro una baseline salvata
+# Casi: import a freddo dei moduli (python -X importtime), parse_age_days_from_text, db_upsert (scrittura con le righe
+#       già preparate, cioè il tempo sotto lock) e db_upsert_prepare (classificazione e valori, fuori lock),
+#       db_load_recent, build_selection,
+#       build_selection_sweep (finestre 1–30gg in un passaggio), enrichment (LLM finto),
+#       p99 delle chiamate LLM con code lente (4% a 1.5s) con e senza richieste hedged,
+#       scrape_30d sul fixture server: motore HTTP e Playwright (quest'ultimo saltato se Chromium non è installato)
+#       memoria (tracemalloc) di contesto 60gg/11 paesi (completo e con descrizioni lazy) e selezione:
+#       picco MB e blocchi vivi (chiavi "mem.*")
+# Controllo golden: build_selection_sweep deve dare per ogni finestra la stessa selezione di build_selection
+#       (fixture delle card), altrimenti exit 1
+# Uso:
+#   python -m bench.run_bench                      # confronta con bench/baseline.json, exit 1 se regressioni
+#   python -m bench.run_bench --scales 1,10,100    # anche la scala 100× del DB sintetico
+#   python -m bench.run_bench --update-baseline    # riscrive la baseline con i tempi correnti
+
+import argparse, gc, json, logging, os, statistics, subprocess, sys, tempfile, time, tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-bench")
+
+import te_macro_agent_final_multi as ag
+from bench.fixture_server import load_cards, start_fixture_server
+from bench.fake_llm import start_fake_llm
+from bench.gen_db import generate_db
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+REPO_DIR = Path(__file__).resolve().parent.parent
+IMPORT_MODULES = ["te_macro_agent_final_multi", "te_jobs", "te_report", "te_scraper"]
+COUNTRIES = ["United States", "Euro Area", "Germany", "United Kingdom", "Italy", "France",
+             "China", "Japan", "Spain", "Netherlands"]
+AGE_TEXTS = ["3 minutes ago", "5 hours ago", "2 days ago", "1 week ago", "2025-08-15", "Aug 29, 2025",
+             "yesterday", "", "The annual inflation rate rose to 2.9% in August", "12 hours ago"]
+
+def _timeit(fn: Callable[[], object], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+def _import_time_s(module: str) -> float:
+    """Tempo cumulativo di import del modulo in un interprete nuovo (riga di -X importtime)."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_DIR))
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=str(REPO_DIR),
+                         env=env, capture_output=True, text=True, check=True).stderr
+    for line in out.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f"import di {module} non trovato nell'output di -X importtime")
+
+def _traced(fn: Callable[[], object]):
+    """(risultato, picco MB, migliaia di blocchi ancora allocati a fine chiamata) sotto tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        out = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        blocks = sum(st.count for st in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    return out, peak / 2**20, blocks / 1000.0
+
+def run_mem_cases(tmp: Path, scale: int = 10, days: int = 5) -> Dict[str, float]:
+    """Contesto 60gg sugli 11 paesi del menu e selezione: picco di memoria e blocchi trattenuti."""
+    cfg = ag.Config()
+    db_path = tmp / f"mem_{scale}.sqlite"
+    generate_db(str(db_path), scale=scale)
+    conn = ag.db_init(str(db_path))
+    try:
+        ctx, peak, blocks = _traced(lambda: ag.db_load_recent(conn, ag.DEFAULT_COUNTRIES_MENU, 60))
+        res = {f"mem.peak_mb[context,{scale}x]": peak, f"mem.blocks_k[context,{scale}x]": blocks}
+        del ctx
+        ctx, peak, blocks = _traced(lambda: ag.db_load_recent(conn, ag.DEFAULT_COUNTRIES_MENU, 60, lazy_descriptions=True,
+                                                             derived=True))
+        res.update({f"mem.peak_mb[context,lazy,{scale}x]": peak, f"mem.blocks_k[context,lazy,{scale}x]": blocks})
+    finally:
+        conn.close()
+    # selezione come nella pipeline: contesto lazy, descrizioni lette solo per i pool
+    _, peak, blocks = _traced(lambda: ag.build_selection(ctx, days, cfg))
+    res[f"mem.peak_mb[selection,{scale}x,d{days}]"] = peak
+    return res
+
+def _chromium_available() -> bool:
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            return Path(p.chromium.executable_path).exists()
+    except Exception:
+        return False
+
+def _cards_as_items(cards) -> List[dict]:
+    return [{"country": c["country"], "title": c["title"], "description": c["description"],
+             "time": f"{max(1, int(c['age_hours']))} hours ago", "importance": c["importance"],
+             "category_raw": c["category"], "age_days": c["age_hours"] / 24.0} for c in cards]
+
+def run_cases(scales: List[int], repeat: int, tmp: Path, llm_latency_ms: float, llm_rate_429: float,
+              with_scrape: bool, selection_max_scale: int = 10) -> Dict[str, float]:
+    res: Dict[str, float] = {}
+    cfg = ag.Config()
+    cards = load_cards()
+
+    for mod in IMPORT_MODULES:
+        res[f"import[{mod}]"] = statistics.median(_import_time_s(mod) for _ in range(max(3, repeat)))
+
+    texts = AGE_TEXTS * 500
+    res["parse_age_days_from_text[5000]"] = _timeit(lambda: [ag.parse_age_days_from_text(t) for t in texts], repeat)
+
+    for scale in scales:
+        items = _cards_as_items(cards) * 1
+        if scale > 1:
+            items = [dict(it, title=f"{it['title']} ({r})") for r in range(scale) for it in items]
+        keys = [ag._fp(it) for it in items]
+        prepared = ag.db_upsert_prepare(None, items, keys)   # DB vuoto: tutte chiavi nuove
+        def _upsert():
+            p = tmp / f"upsert_{scale}.sqlite"
+            if p.exists(): p.unlink()
+            conn = ag.db_init(str(p)); ag.db_upsert(conn, items, prepared=prepared, keys=keys); conn.close()
+        res[f"db_upsert[{scale}x]"] = _timeit(_upsert, repeat)
+        res[f"db_upsert_prepare[{scale}x]"] = _timeit(lambda: ag.db_upsert_prepare(None, items), repeat)
+
+        db_path = tmp / f"ctx_{scale}.sqlite"
+        generate_db(str(db_path), scale=scale)
+        conn = ag.db_init(str(db_path))
+        res[f"db_load_recent[{scale}x]"] = _timeit(lambda: ag.db_load_recent(conn, COUNTRIES, 60), repeat)
+        ctx = ag.db_load_recent(conn, COUNTRIES, 60, derived=True)   # come load_context_items: classificazione dal DB
+        conn.close()
+        if scale > selection_max_scale:
+            continue  # la dedup per similarità è quadratica: oltre questa scala solo i casi DB
+        for days in (5, 30):
+            res[f"build_selection[{scale}x,d{days}]"] = _timeit(lambda: ag.build_selection(ctx, days, cfg), repeat)
+        res[f"build_selection_sweep[{scale}x,d1-30]"] = _timeit(lambda: ag.build_selection_sweep(ctx, cfg), repeat)
+    res.update(run_mem_cases(tmp, scale=min(max(scales), selection_max_scale)))
+
+    # enrichment contro il finto endpoint Messages
+    srv, base_url, stats = start_fake_llm(latency_ms=llm_latency_ms, jitter_ms=llm_latency_ms / 4, rate_429=llm_rate_429)
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    try:
+        summarizer = ag.MacroSummarizer(cfg.ANTHROPIC_API_KEY, cfg.MODEL, cfg.MODEL_TEMP, cfg.MAX_TOKENS)
+        sel = _cards_as_items(cards[:12])
+        def _enrich():
+            batch = [dict(it) for it in sel]
+            ag.enrich_selection_it(summarizer, batch, cfg, delay_s=0.0, workers=cfg.ENRICH_WORKERS)
+        res["enrichment[12 items]"] = _timeit(_enrich, repeat)
+        logging.info("Fake LLM: %s", stats)
+    finally:
+        srv.shutdown(); os.environ.pop("ANTHROPIC_BASE_URL", None)
+    res.update(run_llm_tail_cases(cards, llm_latency_ms))
+
+    if with_scrape:
+        fsrv, url = start_fixture_server(cards=cards)
+        try:
+            http_scraper = ag.TEStreamScraper(ag.Config(BASE_URL=url, SCRAPE_ENGINE="http"))
+            res["scrape_30d[fixture,http]"] = _timeit(lambda: http_scraper.scrape_30d(COUNTRIES, max_days=60), repeat)
+            if _chromium_available():
+                scraper = ag.TEStreamScraper(ag.Config(BASE_URL=url, SCRAPE_ENGINE="browser"))
+                res["scrape_30d[fixture]"] = _timeit(lambda: scraper.scrape_30d(COUNTRIES, max_days=60), 1)
+            else:
+                logging.warning("Chromium non installato: salto scrape_30d via browser (python -m playwright install chromium)")
+        finally:
+            fsrv.shutdown()
+    return res
+
+def run_llm_tail_cases(cards, llm_latency_ms: float, calls: int = 400, workers: int = 4) -> Dict[str, float]:
+    """p99 per chiamata (riassunti) con il 4% di risposte lente: hedging al p95 contro chiamata singola.
+    400 chiamate: il p99 non è il solo massimo (una copia capitata anch'essa su una risposta lenta)."""
+    from concurrent.futures import ThreadPoolExecutor
+    res: Dict[str, float] = {}
+    items = (_cards_as_items(cards) * (calls // max(1, len(cards)) + 1))[:calls]
+    for name, hedge in (("llm_call_p99[tail]", True), ("llm_call_p99[tail,no-hedge]", False)):
+        srv, base_url, stats = start_fake_llm(latency_ms=llm_latency_ms, jitter_ms=llm_latency_ms / 4,
+                                              slow_rate=0.04, slow_ms=1500.0)
+        os.environ["ANTHROPIC_BASE_URL"] = base_url
+        try:
+            cfg = ag.Config(LLM_HEDGE=hedge, LLM_SLO_P95_S={"summary": 0.25})   # budget iniziale finché mancano campioni
+            summarizer = ag.MacroSummarizer(cfg.ANTHROPIC_API_KEY, cfg.MODEL, cfg.MODEL_TEMP, cfg.MAX_TOKENS)
+            def _one(it):
+                t0 = time.perf_counter(); summarizer.summarize_item_it(it, cfg); return time.perf_counter() - t0
+            with ThreadPoolExecutor(workers) as ex:
+                lat = sorted(ex.map(_one, items))
+            res[name] = lat[min(len(lat) - 1, int(0.99 * len(lat)))]
+            logging.info("Fake LLM (%s): %s", name, stats)
+        finally:
+            srv.shutdown(); os.environ.pop("ANTHROPIC_BASE_URL", None)
+    return res
+
+def _selection_sig(sel) -> List[tuple]:
+    return [(ag._fp(it), it.get("title"), it.get("description"), it.get("importance"), it.get("score"),
+             it.get("category_mapped"), it.get("merged_from")) for it in sel]
+
+def check_selection_sweep(cfg: "ag.Config") -> List[str]:
+    """Finestre in cui la sweep differisce da build_selection sul fixture delle card (lista vuota = ok)."""
+    ctx = _cards_as_items(load_cards())
+    sweep = ag.build_selection_sweep(ctx, cfg, range(1, 31))
+    return [f"selezione {d}gg: sweep {len(sweep[d])} item vs build_selection {len(ref)}"
+            for d in range(1, 31) for ref in [ag.build_selection(ctx, d, cfg)]
+            if _selection_sig(sweep[d]) != _selection_sig(ref)]
+
+def _fmt(name: str, v: float) -> str:
+    if name.startswith("mem.peak_mb"): return f"{v:.2f} MB"
+    if name.startswith("mem.blocks_k"): return f"{v:.1f} k blocchi"
+    return f"{v*1000:.1f} ms"
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], tolerance: float, floor_s: float) -> List[str]:
+    regressions = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if base is None: continue
+        floor = 0.0 if name.startswith("mem.") else floor_s
+        if cur > base * tolerance and (cur - base) > floor:
+            regressions.append(f"{name}: {_fmt(name, cur)} vs baseline {_fmt(name, base)} (x{cur/base:.2f})")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark offline TE macro agent")
+    ap.add_argument("--scales", default="1,10")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--selection-max-scale", type=int, default=10)
+    ap.add_argument("--tolerance", type=float, default=1.5, help="fattore massimo rispetto alla baseline")
+    ap.add_argument("--floor-ms", type=float, default=5.0, help="differenze assolute sotto soglia ignorate")
+    ap.add_argument("--llm-latency-ms", type=float, default=40.0)
+    ap.add_argument("--llm-rate-429", type=float, default=0.05)
+    ap.add_argument("--no-scrape", action="store_true")
+    ap.add_argument("--baseline", default=str(BASELINE_PATH))
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--out", default="", help="salva i risultati correnti in JSON")
+    args = ap.parse_args(argv)
+    ag.setup_logging(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="te_bench_") as d:
+        current = run_cases([int(x) for x in args.scales.split(",") if x.strip()], args.repeat, Path(d),
+                            args.llm_latency_ms, args.llm_rate_429, not args.no_scrape, args.selection_max_scale)
+
+    golden = check_selection_sweep(ag.Config())
+    baseline = json.loads(Path(args.baseline).read_text()) if Path(args.baseline).exists() else {}
+    width = max(len(k) for k in current)
+    for name, cur in current.items():
+        base = baseline.get(name)
+        delta = f"(baseline {_fmt(name, base):>12}, x{cur/base:.2f})" if base else "(nuovo)"
+        print(f"{name:<{width}}  {_fmt(name, cur):>14}  {delta}")
+    if args.out:
+        Path(args.out).write_text(json.dumps(current, indent=1))
+    if args.update_baseline:
+        Path(args.baseline).write_text(json.dumps(dict(baseline, **current), indent=1, sort_keys=True) + "\n")
+        print(f"Baseline aggiornata: {args.baseline}")
+        return 0
+
+    if golden:
+        print("\nSWEEP DIVERSA DA build_selection:")
+        for g in golden: print("  - " + g)
+        return 1
+    regressions = compare(current, baseline, args.tolerance, args.floor_ms / 1000.0)
+    if regressions:
+        print("\nREGRESSIONI:")
+        for r in regressions: print("  - " + r)
+        return 1
+    print("\nNessuna regressione rispetto alla baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,20 +3,27 @@
 # - Executive Summary: usa signature (context_items, cfg, chosen_countries)
 # - Selezione: build_selection(items_ctx, days, cfg)
 # - Riassunti in IT con summarize_item_it; titoli in IT con translate_it
-# - DB: db_count_by_country, db_load_recent, db_upsert, db_prune
+# - DB: db_count_by_country, db_load_recent, db_upsert, db_prune; copertura dai rollup (db_coverage, db_latest_results)
 # - Scraper: scrape_30d
-# - Report: save_report(filename, es_text, selection, countries, days, context_count, output_dir)
+# - Report: DOCX in memoria via te_report (save_report solo per la copia su disco)
 # - Legge ANTHROPIC_API_KEY/DB_PATH/OUTPUT_DIR dai Secrets → env PRIMA di istanziare Config()
+# - Pipeline in background: te_jobs.JobRunner (coda condivisa fra sessioni, la UI fa polling dello stato)
+# - DB: un solo scrittore per processo (te_writer), le sessioni leggono con connessioni read-only
+# - Prefetch (te_prefetch): al cambio dei paesi contesto e selezioni 1–30gg (build_selection_sweep) preparati in
+#   background, riusati dal job; al cambio dei giorni anteprima immediata delle notizie che entrano/escono
+# - Toggle "Profilo della run": job profilato (te_profile), hotspot per stage e flamegraph speedscope scaricabili
+# - Avvio rapido: scraper/LLM/report importati su richiesta; DB, moduli e check Chromium scaldati in un thread all'avvio
 
 import os
 import time
+import uuid
+import logging
+import threading
 import subprocess
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
 
 import streamlit as st
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_message
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Import dal macro agent (come definito nel file che mi hai dato)
@@ -25,8 +32,6 @@ import te_macro_agent_final_multi as ag
 
 Config = ag.Config
 setup_logging = ag.setup_logging
-TEStreamScraper = ag.TEStreamScraper
-MacroSummarizer = ag.MacroSummarizer
 build_selection = ag.build_selection
 db_init = ag.db_init
 db_upsert = ag.db_upsert
@@ -35,11 +40,14 @@ db_count_by_country = ag.db_count_by_country
 db_load_recent = ag.db_load_recent
 save_report = ag.save_report
 
+from te_jobs import JobRunner, build_docx, QUEUED, DONE, ERROR, CANCELLED
+from te_report import DEFAULT_RENDERER as report_renderer, DOCX_MIME
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Secrets → env (per far sì che Config() trovi la chiave e i path giusti)
 # ──────────────────────────────────────────────────────────────────────────────
 def _apply_secrets_to_env():
-    for k in ("ANTHROPIC_API_KEY", "DB_PATH", "OUTPUT_DIR"):
+    for k in ("ANTHROPIC_API_KEY", "DB_PATH", "OUTPUT_DIR", "JOB_CONCURRENCY"):
         if k in st.secrets:
             os.environ[k] = str(st.secrets[k]).strip()
 _apply_secrets_to_env()
@@ -63,33 +71,53 @@ def ensure_playwright_chromium() -> None:
             subprocess.check_call([os.sys.executable, "-m", "playwright", "install", "chromium"])
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Retry helper per le chiamate al modello (409/429 tipici)
+# Warm-up all'avvio del server (thread in background, una volta per processo)
 # ──────────────────────────────────────────────────────────────────────────────
-def _retryable(fn, *args, **kwargs):
-    @retry(
-        reraise=True,
-        retry=retry_if_exception_message(match=r"(?i)(429|rate[_\s-]?limit|Too Many Requests|acceleration limit)"),
-        wait=wait_exponential(multiplier=1.5, min=2, max=30),
-        stop=stop_after_attempt(5),
-    )
-    def _call():
-        return fn(*args, **kwargs)
-    return _call()
+@st.cache_resource(show_spinner=False)
+def start_warmup() -> dict:
+    state = {"done": threading.Event(), "chromium": threading.Event(), "error": None}
+    def _warm():
+        try:
+            import te_scraper, te_summarizer  # noqa: F401  (regex, XPath e JS compilati all'import)
+            from te_writer import get_writer
+            db_path = os.environ.get("DB_PATH") or Config.DB_PATH
+            get_writer(db_path)   # scrittore unico del processo (schema/migrazioni), condiviso dalle sessioni
+            conn = ag.db_connect_ro(db_path)
+            try: conn.execute("SELECT COUNT(*) FROM te_items").fetchone()
+            finally: conn.close()
+            ensure_playwright_chromium()
+            state["chromium"].set()
+        except Exception as e:
+            state["error"] = str(e)
+            logging.warning("Warm-up incompleto: %s", e)
+        finally:
+            state["done"].set()
+    threading.Thread(target=_warm, daemon=True, name="te-warmup").start()
+    return state
 
-def call_once_per_run(cache_key: str, caller):
-    if "api_once_cache" not in st.session_state:
-        st.session_state.api_once_cache = {}
-    if cache_key in st.session_state.api_once_cache:
-        return st.session_state.api_once_cache[cache_key]
-    val = caller()
-    st.session_state.api_once_cache[cache_key] = val
-    return val
+# ──────────────────────────────────────────────────────────────────────────────
+# Job runner condiviso fra le sessioni (la pipeline gira in background)
+# ──────────────────────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def get_job_runner() -> JobRunner:
+    cfg = Config()
+    concurrency = int(os.environ.get("JOB_CONCURRENCY") or cfg.JOB_CONCURRENCY)
+    return JobRunner(concurrency=concurrency, ttl_s=cfg.JOB_TTL_S, prefetch=get_prefetcher())
+
+# Prefetch speculativo: al cambio dei paesi contesto e selezione si preparano mentre l'analista sceglie
+@st.cache_resource(show_spinner=False)
+def get_prefetcher():
+    cfg = Config()
+    if not cfg.PREFETCH: return None
+    from te_prefetch import PrefetchManager
+    return PrefetchManager(max_concurrent=cfg.PREFETCH_CONCURRENCY, debounce_s=cfg.PREFETCH_DEBOUNCE_S, ttl_s=cfg.PREFETCH_TTL_S)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # UI
 # ──────────────────────────────────────────────────────────────────────────────
 st.set_page_config(page_title="StanAI Macro Agent", page_icon="📈", layout="wide")
 st.title("📈 StanAI Macro Agent — UI Streamlit (compatibile)")
+warm = start_warmup()
 
 # Diagnostica chiave (mascherata) per capire se l'app sta usando i Secrets giusti
 _key = (os.environ.get("ANTHROPIC_API_KEY") or "").strip()
@@ -103,10 +131,11 @@ left, right = st.columns([1, 2], gap="large")
 with left:
     run_btn = st.button("Esegui pipeline")
     days = st.number_input("Giorni per la SELEZIONE (1–30)", min_value=1, max_value=30, value=5, step=1)
+    profile_run = st.toggle("Profilo della run", value=False,
+                            help="Campionatore + cProfile: hotspot per stage e flamegraph (speedscope) accanto al DOCX")
 with right:
-    cfg_tmp = Config()  # solo per leggere il menu paesi di default dal modulo
     st.markdown("**Seleziona i Paesi (coerenti col macro agent):**")
-    countries_all = cfg_tmp.DEFAULT_COUNTRIES_MENU
+    countries_all = ag.DEFAULT_COUNTRIES_MENU
     c1, c2 = st.columns(2)
     with c1: select_all = st.button("Seleziona tutti")
     with c2: deselect_all = st.button("Deseleziona tutti")
@@ -124,169 +153,207 @@ with right:
         )
     chosen_countries = [c for c, v in st.session_state.country_flags.items() if v]
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+prefetcher = get_prefetcher()
+if prefetcher is not None and not run_btn:
+    # una Config per sessione (il polling rilancia lo script ogni secondo), la stessa per request e peek
+    if "prefetch_cfg" not in st.session_state:
+        st.session_state.prefetch_cfg = Config()
+    pf_cfg = st.session_state.prefetch_cfg
+    prefetcher.request(st.session_state.session_id, pf_cfg, chosen_countries, int(days))
+    pf = prefetcher.status(st.session_state.session_id)
+    if pf["state"] == "ready":
+        left.caption(f"⚡ Dati pronti: {pf['context']} notizie, {pf['llm_hits']} testi IT in cache (aggiornati {pf['age_s']:.0f}s fa)")
+    elif pf["state"] in ("pending", "queued", "running"):
+        left.caption("⏳ Preparo i dati per i paesi scelti…")
+    # selezioni 1–30gg già calcolate (sweep): al cambio dei giorni anteprima immediata di chi entra/esce
+    sel = prefetcher.peek(pf_cfg, chosen_countries, int(days)) if pf["state"] == "ready" else None
+    if sel is not None:
+        view = st.session_state.get("sweep_view")
+        key = tuple(sorted(chosen_countries))
+        if view is None or view["key"] != key:
+            view = {"key": key, "days": int(days), "sel": sel, "diff": None}
+        elif view["days"] != int(days):
+            view = {"key": key, "days": int(days), "sel": sel, "diff": (view["days"], *ag.selection_diff(view["sel"], sel))}
+        st.session_state.sweep_view = view
+        with left.expander(f"🔀 Selezione {int(days)} gg: {len(sel)} notizie" + (
+                f" (+{len(view['diff'][1])} / −{len(view['diff'][2])} rispetto a {view['diff'][0]} gg)" if view["diff"] else "")):
+            if view["diff"]:
+                for it in view["diff"][1]: st.markdown(f"➕ {it.get('country','')} — {it.get('title','')}")
+                for it in view["diff"][2]: st.markdown(f"➖ {it.get('country','')} — {it.get('title','')}")
+            else:
+                for it in sel: st.markdown(f"• {it.get('country','')} — {it.get('title','')}")
+
+# ==== Copertura DB (rollup: lettura a tempo costante, nessuna scansione delle notizie)
+with st.expander("📊 Copertura DB per paese/categoria"):
+    cov_days = st.slider("Finestra (giorni)", min_value=1, max_value=Config.PRUNE_DAYS, value=7)
+    try:
+        import pandas as pd
+        conn = ag.db_connect_ro(os.environ.get("DB_PATH") or Config.DB_PATH)
+        try:
+            shown = chosen_countries or countries_all
+            cov = ag.db_coverage(conn, shown, days=cov_days)
+            latest = ag.db_latest_results(conn, shown)
+        finally:
+            conn.close()
+        st.dataframe(pd.DataFrame([
+            {"paese": c, **{cat: f"{v['results']}/{v['items']} ({v['red']}🔴)" + (f" · {v['last_result_day']}" if v["last_result_day"] else "")
+                            for cat, v in cats.items()}}
+            for c, cats in cov.items()]), use_container_width=True)
+        st.caption("Cella: risultati pubblicati / notizie totali (rosse) · giorno dell'ultimo risultato")
+        if latest:
+            st.dataframe(pd.DataFrame([{**r, "age_days": round(r["age_days"], 1)} for r in latest if r["age_days"] <= cov_days]),
+                         use_container_width=True)
+    except Exception as e:
+        st.info(f"Copertura non disponibile: {e}")
+
 st.divider()
 
 # ──────────────────────────────────────────────────────────────────────────────
-# RUN
+# RUN (invio job) + rendering dello stato del job della sessione
 # ──────────────────────────────────────────────────────────────────────────────
+runner = get_job_runner()
+
 if run_btn:
     setup_logging()
     cfg = Config()  # ora che env è popolato dai Secrets, qui trovi anche OUTPUT_DIR/DB_PATH/chiave ecc.
+    if profile_run: cfg.PROFILE = True
 
     if not chosen_countries:
         st.warning("Seleziona almeno un Paese.")
         st.stop()
 
-    st.write(f"▶ **Contesto ES (giorni)**: {cfg.CONTEXT_DAYS} | **Selezione**: {days} giorni")
-    st.write(f"▶ **Paesi**: {', '.join(chosen_countries)}")
-
-    # Browser pronto (il macro aprirà Playwright in scraper.scrape_30d)
-    with st.status("Preparazione browser…", expanded=False) as sst:
-        ensure_playwright_chromium()
-        sst.update(label="Browser pronto", state="complete")
-
-    # ==== Pipeline dati con DB (Delta Mode) — fedele al macro agent ====
-    items_ctx: List[Dict[str, Any]] = []
-    with st.status("Carico/aggiorno notizie (DB + stream)…", expanded=False) as sst:
-        try:
-            scraper = TEStreamScraper(cfg)
-            conn = db_init(cfg.DB_PATH)
-
-            warm, fresh = [], []
-            for c in chosen_countries:
-                cnt = db_count_by_country(conn, c)
-                (warm if cnt >= cfg.WARMUP_NEW_COUNTRY_MIN else fresh).append(c)
-
-            items_new = []
-            if fresh:
-                items_new += scraper.scrape_30d(fresh, max_days=cfg.CONTEXT_DAYS)
-            if warm:
-                items_new += scraper.scrape_30d(warm, max_days=min(cfg.SCRAPE_HORIZON_DAYS, cfg.CONTEXT_DAYS))
-
-            if items_new:
-                db_upsert(conn, items_new)
-                db_prune(conn, max_age_days=cfg.PRUNE_DAYS)
-
-            items_ctx = db_load_recent(conn, chosen_countries, max_age_days=cfg.CONTEXT_DAYS)
-
-            # fallback se base DB è scarsa (come nel main del macro)
-            if len(items_ctx) < 20:
-                items_all = scraper.scrape_30d(chosen_countries, max_days=cfg.CONTEXT_DAYS)
-                if items_all:
-                    db_upsert(conn, items_all)
-                    items_ctx = db_load_recent(conn, chosen_countries, max_age_days=cfg.CONTEXT_DAYS)
-
-            sst.update(label=f"Base pronta: {len(items_ctx)} notizie nel contesto (≤{cfg.CONTEXT_DAYS}gg).", state="complete")
-        except Exception as e:
-            st.exception(e)
-            st.stop()
-
-    if not items_ctx:
-        st.error("❌ Nessuna notizia disponibile entro la finestra.")
-        st.stop()
-
-    # ==== Executive Summary (firma: (context_items, cfg, chosen_countries)) ====
-    st.info("Genero l’Executive Summary…")
-    es_error = None
-    es_text = ""
-    try:
-        summarizer = MacroSummarizer(cfg.ANTHROPIC_API_KEY, cfg.MODEL, cfg.MODEL_TEMP, cfg.MAX_TOKENS)
-        es_text = call_once_per_run(
-            f"es::{len(items_ctx)}::{','.join(chosen_countries)}::{cfg.CONTEXT_DAYS}",
-            lambda: _retryable(summarizer.executive_summary, items_ctx, cfg, chosen_countries)
+    # Scraper pronto (HTTP, con fallback Playwright, in scraper.scrape_30d dentro il job)
+    if not warm["chromium"].is_set():
+        with st.status("Preparazione browser…", expanded=False) as sst:
+            warm["done"].wait()
+            if not warm["chromium"].is_set():
+                ensure_playwright_chromium()  # warm-up fallito: riprova qui e mostra l'eventuale errore
+            sst.update(label="Browser pronto", state="complete")
+
+    # prefetch non ancora partito: il job fa da sé (quello in corso prosegue, il job riusa ciò che trova pronto)
+    if prefetcher is not None and prefetcher.status(st.session_state.session_id)["state"] in ("pending", "queued"):
+        prefetcher.cancel(st.session_state.session_id)
+    st.session_state.pop("partial_docx", None)
+    st.session_state.job_id = runner.submit(cfg, chosen_countries, int(days), owner=st.session_state.session_id)
+
+job = runner.store.get(st.session_state.get("job_id", "")) if st.session_state.get("job_id") else None
+if job is not None:
+    res = job.result
+    st.write(f"▶ **Contesto ES (giorni)**: {Config.CONTEXT_DAYS} | **Selezione**: {job.days} giorni")
+    st.write(f"▶ **Paesi**: {', '.join(job.countries)}")
+
+    if job.status == QUEUED:
+        st.info(f"Job in coda (posizione {runner.store.queue_position(job.id)}).")
+    elif not job.finished:
+        st.progress(min(1.0, job.progress), text=job.stage)
+    if not job.finished and st.button("Annulla job"):
+        runner.cancel(job.id)
+        st.rerun()
+
+    if "context_count" in res:
+        st.caption(f"Base pronta: {res['context_count']} notizie nel contesto (≤{Config.CONTEXT_DAYS}gg).")
+
+    # ==== Executive Summary (appena disponibile)
+    if "es_text" in res:
+        st.subheader("Executive Summary")
+        if res.get("es_error"):
+            st.error(f"Motivo errore ES: {res['es_error']}")
+        st.write(res["es_text"])
+
+    # ==== Anteprima tabellare: subito dopo build_selection (testo originale EN),
+    # poi ogni riga passa in IT appena il suo item è completato (ordine di completamento)
+    selection_items = res.get("selection") or []
+    pending = [it for it in selection_items if not ag.is_enriched_it(it)]
+    if selection_items:
+        with st.expander("Anteprima Selezione", expanded=not job.finished):
+            try:
+                import pandas as pd
+                prev_sel = [{
+                    "stato": "✅" if ag.is_enriched_it(it) else ("⚠️" if it.get("llm_fallback") else "⏳"),
+                    "time": it.get("time",""),
+                    "age_days": it.get("age_days",""),
+                    "country": it.get("country",""),
+                    "importance": it.get("importance",0),
+                    "score": it.get("score",0),
+                    "category": it.get("category_mapped",""),
+                    "title_it": (it.get("title_it") or it.get("title","") or "")[:120],
+                    "summary_it": (it.get("summary_it") or it.get("description","") or "")[:160],
+                } for it in selection_items]
+                st.dataframe(pd.DataFrame(prev_sel), use_container_width=True)
+            except Exception:
+                st.info("Anteprima non disponibile (pandas mancante).")
+
+    # ==== Report DOCX
+    if res.get("docx_bytes"):
+        if res.get("out_path"):
+            st.info(f"Report salvato su disco: `{res['out_path']}`")
+        st.download_button(
+            "📥 Scarica report DOCX",
+            data=res["docx_bytes"],
+            file_name=res.get("filename") or "report.docx",
+            mime=DOCX_MIME,
         )
-    except Exception as e:
-        es_error = str(e)
-        es_text = "Executive Summary non disponibile per errore di generazione."
-
-    st.subheader("Executive Summary")
-    if es_error:
-        st.error(f"Motivo errore ES: {es_error}")
-    st.write(es_text)
-
-    # ==== Selezione (ultimi N giorni) ====
-    st.info(f"Costruisco la selezione (ultimi {int(days)} giorni)…")
-    try:
-        selection_items = build_selection(items_ctx, int(days), cfg, expand1_days=10, expand2_days=30)
-    except Exception as e:
-        st.exception(e)
-        st.stop()
-
-    # ==== Traduzione titoli + riassunti IT (signature del macro agent) ====
-    st.info("Traduco titoli e genero riassunti in italiano…")
-    prog = st.progress(0.0)
-    total = max(1, len(selection_items))
-    for i, it in enumerate(selection_items, 1):
-        # Piccolo delay per “levigare” il rate
-        if i > 1:
-            time.sleep(0.4)
-
-        # Titolo IT
-        try:
-            it["title_it"] = call_once_per_run(
-                f"ti::{hash(it.get('title',''))}",
-                lambda: _retryable(summarizer.translate_it, it.get("title",""), cfg)
-            )
-        except Exception:
-            it["title_it"] = it.get("title","") or ""
-
-        # Riassunto IT (se fallisce, fallback: description originale)
-        try:
-            it["summary_it"] = call_once_per_run(
-                f"si::{hash((it.get('title',''), it.get('time','')))}",
-                lambda: _retryable(summarizer.summarize_item_it, it, cfg)
-            )
-            if not it["summary_it"] or len(it["summary_it"].strip()) < 30:
-                raise RuntimeError("Riassunto troppo corto")
-        except Exception:
-            it["summary_it"] = (it.get("description","") or "")
-
-        prog.progress(i / total)
-
-    st.success("✅ Pipeline completata.")
-
-    # ==== Anteprima tabellare
-    with st.expander("Anteprima Selezione"):
-        try:
-            import pandas as pd
-            prev_sel = [{
-                "time": it.get("time",""),
-                "age_days": it.get("age_days",""),
-                "country": it.get("country",""),
-                "importance": it.get("importance",0),
-                "score": it.get("score",0),
-                "category": it.get("category_mapped",""),
-                "title_it": (it.get("title_it","") or "")[:120],
-                "summary_it": (it.get("summary_it","") or "")[:160],
-            } for it in selection_items]
-            st.dataframe(pd.DataFrame(prev_sel), use_container_width=True)
-        except Exception:
-            st.info("Anteprima non disponibile (pandas mancante).")
-
-    # ==== Report DOCX (firma con context_count)
-    try:
-        ts = datetime.now().strftime("%Y%m%d_%H%M")
-        filename = f"MacroAnalysis_AutoSelect_{int(days)}days_{ts}.docx"
-        out_path = save_report(
-            filename, es_text, selection_items, chosen_countries,
-            int(days), len(items_ctx), cfg.OUTPUT_DIR
-        )
-        st.info(f"Report salvato su disco: `{out_path}`")
-        try:
-            data = Path(out_path).read_bytes()
+    elif selection_items and pending:
+        # DOCX con quanto già pronto (gli item mancanti restano in inglese) + completamento dei rimanenti
+        st.caption(f"Item completati: {len(selection_items) - len(pending)}/{len(selection_items)}")
+        c1, c2 = st.columns(2)
+        if c1.button("📄 Genera DOCX con gli item pronti"):
+            try:
+                st.session_state.partial_docx = build_docx(job, partial=True)
+            except Exception as e:
+                st.error(f"Errore nella generazione/salvataggio DOCX: {e}")
+        if job.finished and c2.button("▶ Completa rimanenti"):
+            runner.finish_remaining(job.id, Config())
+            st.rerun()
+        part = st.session_state.get("partial_docx")
+        if part:
             st.download_button(
-                "📥 Scarica report DOCX",
-                data=data,
-                file_name=Path(out_path).name,
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                "📥 Scarica DOCX parziale",
+                data=part["docx_bytes"],
+                file_name=part["filename"],
+                mime=DOCX_MIME,
             )
-        except Exception as e:
-            st.warning(f"Report creato ma non scaricabile ora: {e}")
-    except Exception as e:
-        st.error(f"Errore nella generazione/salvataggio DOCX: {e}")
 
-    # Riepilogo
-    st.write("---")
-    st.write(f"**Notizie totali nel contesto (≤{cfg.CONTEXT_DAYS} gg):** {len(items_ctx)}")
-    st.write(f"**Notizie selezionate (ultimi {int(days)} gg):** {len(selection_items)}")
-    st.caption(f"Esecuzione: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+    # ==== Anteprima report (Markdown, senza python-docx)
+    if "es_text" in res and selection_items:
+        with st.expander("Anteprima report"):
+            st.markdown(report_renderer.render_markdown(
+                res["es_text"], selection_items, job.countries, job.days, int(res.get("context_count", 0))))
+
+    # ==== Tempi per stage (trace della run: JSON + snapshot Prometheus)
+    traces = res.get("traces") or {}
+    if traces:
+        last = traces[max(traces, key=int)]
+        with st.expander("⏱ Tempi per stage"):
+            try:
+                import pandas as pd
+                st.dataframe(pd.DataFrame(last["breakdown"]), use_container_width=True)
+            except Exception:
+                st.json(last["breakdown"])
+            c1, c2 = st.columns(2)
+            c1.download_button("Trace JSON", data=last["json"], file_name=f"trace_{job.id}.json", mime="application/json")
+            c2.download_button("Metriche Prometheus", data=last["prom"], file_name=f"metrics_{job.id}.prom", mime="text/plain")
+            prof = res.get("profile")
+            if prof:
+                st.code(prof["hotspots"], language=None)
+                st.download_button("Flamegraph (speedscope)", data=prof["speedscope"],
+                                   file_name=f"{prof['stem']}.speedscope.json", mime="application/json")
+                st.caption("Apri il file su https://www.speedscope.app")
+
+    if job.status == DONE:
+        st.success("✅ Pipeline completata.")
+        # Riepilogo
+        st.write("---")
+        st.write(f"**Notizie totali nel contesto (≤{Config.CONTEXT_DAYS} gg):** {res.get('context_count', 0)}")
+        st.write(f"**Notizie selezionate (ultimi {job.days} gg):** {len(selection_items)}")
+        st.caption(f"Esecuzione: {datetime.fromtimestamp(job.finished_ts or time.time()).strftime('%d/%m/%Y %H:%M')}")
+    elif job.status == ERROR:
+        st.error(f"❌ {job.error}")
+    elif job.status == CANCELLED:
+        st.warning("Job annullato.")
+    else:
+        # polling: il job prosegue nel worker, la pagina si aggiorna da sola
+        time.sleep(1.0)
+        st.rerun()
@@ -0,0 +1,157 @@
+# te_archive.py — archivio append-only delle catture grezze dello scraper + ri-estrazione offline
+# - Un file per giorno (ARCHIVE_DIR/YYYY-MM-DD.jsonl.gz o .jsonl.zst): ogni cattura è un membro/frame compresso
+# - Righe JSON: {"cap", "ts", "kind": "card"|"page", ...}; le card sono quelle grezze di _extract_* (prima del filtro
+#   paesi/orizzonte: con ARCHIVE_RAW anche il motore browser le estrae dalla pagina senza filtrarle)
+# - Ri-estrazione: rilegge l'archivio, ri-applica estrattore HTML (se ci sono pagine) e _postprocess_raw,
+#   e ricostruisce te_items con l'istante della cattura come last_seen (niente browser, niente rete)
+# Uso:
+#   python te_archive.py stats [--archive-dir DIR]
+#   python te_archive.py reextract [--since 2025-10-01] [--until 2025-10-19] [--countries "Italy,Germany"] [--db PATH] [--fresh]
+
+import argparse, gzip, io, json, logging, sqlite3, threading, time, uuid
+from collections import OrderedDict
+from datetime import datetime, date
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterator, Tuple
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+from te_scraper import TEStreamScraper, _extract_cards_html
+
+try:
+    import zstandard as zstd
+except ImportError:  # opzionale: senza zstandard si usa gzip
+    zstd = None
+
+_write_lock = threading.Lock()
+EXTS = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+def _codec(codec: str) -> str:
+    c = (codec or "gzip").lower()
+    if c == "zstd" and zstd is None:
+        logging.warning("zstandard non installato: archivio in gzip.")
+        c = "gzip"
+    return c if c in EXTS else "gzip"
+
+def append_capture(archive_dir: str, cards: List[Dict[str, Any]], engine: str = "", max_days: float = 0,
+                   countries: Optional[List[str]] = None, pages: Optional[List[Dict[str, str]]] = None,
+                   codec: str = "gzip", ts: Optional[float] = None) -> Path:
+    """Accoda una cattura (card grezze + eventuali pagine HTML) al file del giorno; ritorna il path."""
+    ts = time.time() if ts is None else float(ts)
+    c = _codec(codec)
+    d = Path(archive_dir); d.mkdir(parents=True, exist_ok=True)
+    path = d / f"{datetime.fromtimestamp(ts):%Y-%m-%d}{EXTS[c]}"
+    head = {"cap": uuid.uuid4().hex[:12], "ts": ts, "engine": engine, "max_days": max_days,
+            "countries": list(countries or [])}
+    buf = io.StringIO()
+    for p in pages or []:
+        buf.write(json.dumps(dict(head, kind="page", url=p.get("url", ""), body=p.get("body", "")), ensure_ascii=False) + "\n")
+    for card in cards or []:
+        buf.write(json.dumps(dict(head, kind="card", card=card), ensure_ascii=False) + "\n")
+    data = buf.getvalue().encode("utf-8")
+    with tr.span("archive.append", cards=len(cards or []), pages=len(pages or [])) as sp:
+        blob = zstd.ZstdCompressor(level=6).compress(data) if c == "zstd" else gzip.compress(data, compresslevel=6)
+        with _write_lock, open(path, "ab") as f:   # un membro gzip / frame zstd per cattura: append-only
+            f.write(blob)
+        sp.set(bytes=len(blob))
+    return path
+
+def _open_lines(path: Path) -> Iterator[str]:
+    if path.name.endswith(".zst"):
+        if zstd is None:
+            raise RuntimeError(f"zstandard necessario per leggere {path.name}")
+        with open(path, "rb") as f, zstd.ZstdDecompressor().stream_reader(f, read_across_frames=True) as r:
+            yield from io.TextIOWrapper(r, encoding="utf-8")
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            yield from f
+
+def archive_files(archive_dir: str, since: Optional[date] = None, until: Optional[date] = None) -> List[Path]:
+    out = []
+    for p in Path(archive_dir).glob("*.jsonl.*"):
+        try:
+            day = datetime.strptime(p.name.split(".", 1)[0], "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        if (since and day < since) or (until and day > until): continue
+        out.append(p)
+    return sorted(out)
+
+def iter_file_captures(path: Path) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, str]]]]:
+    """(testata, card, pagine) per cattura di un file, in ordine di scrittura."""
+    caps: "OrderedDict[str, Tuple[Dict[str, Any], list, list]]" = OrderedDict()
+    for line in _open_lines(path):
+        if not line.strip(): continue
+        rec = json.loads(line)
+        head, cards, pages = caps.setdefault(rec["cap"], (
+            {k: rec.get(k) for k in ("cap", "ts", "engine", "max_days", "countries")}, [], []))
+        if rec.get("kind") == "page":
+            pages.append({"url": rec.get("url", ""), "body": rec.get("body", "")})
+        else:
+            cards.append(rec.get("card") or {})
+    yield from caps.values()
+
+def iter_captures(archive_dir: str, since: Optional[date] = None, until: Optional[date] = None):
+    for path in archive_files(archive_dir, since, until):
+        yield from iter_file_captures(path)
+
+def reextract(archive_dir: str, db_path: str, since: Optional[date] = None, until: Optional[date] = None,
+              countries: Optional[List[str]] = None, max_days: float = 60, fresh: bool = False) -> Dict[str, int]:
+    """Ricostruisce te_items dall'archivio. Le pagine HTML (se presenti) vengono ri-parsate con l'estrattore attuale."""
+    if fresh:   # anche -wal/-shm: un WAL rimasto verrebbe riapplicato al DB nuovo
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(db_path) + suffix).unlink(missing_ok=True)
+    conn = ag.db_init(db_path)
+    stats = {"captures": 0, "cards": 0, "items": 0, "from_html": 0}
+    try:
+        with tr.span("archive.reextract") as sp:
+            for head, cards, pages in iter_captures(archive_dir, since, until):
+                if pages:
+                    raw = [c for p in pages for c in _extract_cards_html(p["body"])]
+                    stats["from_html"] += 1
+                else:
+                    raw = cards
+                items = TEStreamScraper._postprocess_raw(raw, countries, max_days, now=head["ts"])
+                ag.db_upsert(conn, items, now=head["ts"])
+                stats["captures"] += 1; stats["cards"] += len(raw); stats["items"] += len(items)
+            sp.set(**stats)
+    finally:
+        conn.close()
+    return stats
+
+def _day(s: str) -> Optional[date]:
+    return datetime.strptime(s, "%Y-%m-%d").date() if s else None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Archivio catture TE: statistiche e ri-estrazione offline")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("stats", "reextract"):
+        p = sub.add_parser(name)
+        p.add_argument("--archive-dir", default=ag.Config.ARCHIVE_DIR)
+        p.add_argument("--since", default="")
+        p.add_argument("--until", default="")
+    p = sub.choices["reextract"]
+    p.add_argument("--db", default=ag.Config.DB_PATH)
+    p.add_argument("--countries", default="", help="elenco separato da virgole (default: tutti)")
+    p.add_argument("--max-days", type=float, default=ag.Config.PRUNE_DAYS, help="orizzonte rispetto alla cattura")
+    p.add_argument("--fresh", action="store_true", help="ricrea il DB da zero")
+    args = ap.parse_args(argv)
+    ag.setup_logging(logging.INFO)
+
+    if args.cmd == "stats":
+        for path in archive_files(args.archive_dir, _day(args.since), _day(args.until)):
+            n_cap = n_cards = n_pages = 0
+            for _, cards, pages in iter_file_captures(path):
+                n_cap += 1; n_cards += len(cards); n_pages += len(pages)
+            print(f"{path.name:<24} {path.stat().st_size/1024:9.1f} KB  catture={n_cap} card={n_cards} pagine={n_pages}")
+        return 0
+
+    countries = [c.strip() for c in args.countries.split(",") if c.strip()] or None
+    t0 = time.perf_counter()
+    stats = reextract(args.archive_dir, args.db, _day(args.since), _day(args.until), countries, args.max_days, args.fresh)
+    print(f"Ri-estrazione: {stats['captures']} catture ({stats['from_html']} da HTML), {stats['cards']} card "
+          f"-> {stats['items']} item in {args.db} ({time.perf_counter() - t0:.2f}s)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,261 @@
+# te_batch.py — report multipli (profili paese/giorni) in un solo processo, senza prompt interattivi
+# - Un solo load_context_items sull'unione dei paesi (uno scrape, un db_load_recent), poi filtro per profilo
+# - Traduzioni/riassunti IT una volta per item (fingerprint) anche se selezionato in più profili,
+#   con cache persistente nel DB (tabella llm_cache) fra un run e l'altro
+# - ES dei profili in parallelo; ogni report viene renderizzato appena ES e item del profilo sono pronti
+# - --message-batch: ES + testi IT in un'unica Message Batch (costo dimezzato, latenza fino a ore):
+#   adatto ai run schedulati notturni, non alla UI interattiva
+# Uso: python te_batch.py profili.toml [--output-dir DIR] [--no-llm-cache] [--message-batch]
+#
+# Formato profili (TOML o JSON con la stessa struttura):
+#   output_dir = "reports"            # opzionale
+#   [[profile]]
+#   name = "usa"
+#   countries = ["United States"]
+#   days = 5
+
+import argparse, json, logging, re, sqlite3, threading, time, contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+
+@dataclass
+class Profile:
+    name: str
+    countries: List[str]
+    days: int
+    es_text: str = ""
+    selection: List[Dict[str, Any]] = field(default_factory=list)
+    context_count: int = 0
+    out_path: str = ""
+    ctx: List[Dict[str, Any]] = field(default_factory=list, repr=False)   # contesto filtrato (solo durante il run)
+    submitted: bool = False
+
+def load_profiles(path: str) -> Dict[str, Any]:
+    """Legge il file profili (.toml o .json) e valida paesi/giorni."""
+    p = Path(path)
+    if p.suffix.lower() == ".toml":
+        import tomllib
+        data = tomllib.loads(p.read_text(encoding="utf-8"))
+    else:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    profiles = []
+    for i, raw in enumerate(data.get("profile") or data.get("profiles") or []):
+        countries = [ag.normalize_country(c) for c in raw.get("countries") or []]
+        days = int(raw.get("days", 5))
+        if not countries: raise ValueError(f"Profilo #{i+1}: nessun paese")
+        if not 1 <= days <= 30: raise ValueError(f"Profilo #{i+1}: giorni fuori da 1–30 ({days})")
+        name = re.sub(r"[^\w\-]+", "_", str(raw.get("name") or f"p{i+1}")).strip("_") or f"p{i+1}"
+        profiles.append(Profile(name=name, countries=list(dict.fromkeys(countries)), days=days))
+    if not profiles: raise ValueError(f"Nessun profilo in {path}")
+    return {"output_dir": data.get("output_dir"), "profiles": profiles}
+
+# ============= Cache LLM persistente (titolo/riassunto IT per fingerprint + modello) =============
+class LLMCache:
+    """
+    Letture da una connessione read-only; scritture accumulate e inviate a blocchi di FLUSH_ROWS righe,
+    un commit per blocco: con writer (te_writer) dallo scrittore unico del processo, altrimenti da una
+    connessione propria con lo stesso timeout delle altre. Errori di scrittura: solo log, il batch prosegue.
+    """
+    FLUSH_ROWS = 50
+
+    def __init__(self, db_path: str, model: str, writer=None):
+        self.model, self.writer = model, writer
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._futs: List[Future] = []
+        if writer is None:
+            ag.db_init(db_path).close()   # schema (llm_cache compresa)
+            self.wconn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+        self.conn = ag.db_connect_ro(db_path, check_same_thread=False)
+        self.hits = self.misses = 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, str]]:
+        out: Dict[str, Dict[str, str]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                qs = ",".join("?" * len(chunk))
+                for k, t, s in self.conn.execute(
+                        f"SELECT key,title_it,summary_it FROM llm_cache WHERE model=? AND key IN ({qs})", [self.model, *chunk]):
+                    out[k] = {"title_it": t or "", "summary_it": s or ""}
+        self.hits += len(out); self.misses += len(keys) - len(out)
+        return out
+
+    def put(self, key: str, it: Dict[str, Any]):
+        with self._lock:
+            self._pending.append((key, self.model, it.get("title_it", ""), it.get("summary_it", ""), time.time()))
+            if len(self._pending) >= self.FLUSH_ROWS: self._flush_locked()
+
+    def _flush_locked(self, prune_days: int = 0):
+        rows, self._pending = self._pending, []
+        if not rows and not prune_days: return
+        if self.writer is not None:
+            self._futs.append(self.writer.submit_llm_cache(rows, prune_days))
+            return
+        try:
+            ag.db_llm_cache_put(self.wconn, rows, commit=False)
+            if prune_days: ag.db_llm_cache_prune(self.wconn, prune_days, commit=False)
+            self.wconn.commit()
+        except sqlite3.Error as e:
+            if self.wconn.in_transaction: self.wconn.rollback()
+            logging.warning("Cache LLM: scrittura di %d righe non riuscita: %s", len(rows), e)
+
+    def flush(self, prune_days: int = 0):
+        with self._lock: self._flush_locked(prune_days)
+
+    def prune(self, max_age_days: int):
+        self.flush(max_age_days)
+
+    def close(self):
+        self.flush()
+        for f in self._futs:
+            try: f.result()
+            except Exception as e: logging.warning("Cache LLM: scrittura non riuscita: %s", e)
+        if self.writer is None: self.wconn.close()
+        self.conn.close()
+
+# ============= Batch =============
+def run_batch(cfg: ag.Config, profiles: List[Profile], output_dir: Optional[str] = None,
+              use_cache: bool = True, summarizer=None, use_message_batch: bool = False) -> List[Profile]:
+    out_dir = output_dir or cfg.OUTPUT_DIR
+    union = list(dict.fromkeys(c for p in profiles for c in p.countries))
+
+    # 1) contesto unico per l'unione dei paesi
+    with tr.span("batch.context", countries=len(union)):
+        items_ctx = ag.load_context_items(cfg, union)
+    logging.info("Batch: %d profili, paesi=%s, contesto=%d item", len(profiles), ",".join(union), len(items_ctx))
+
+    # 2) selezione per profilo (filtro del contesto condiviso)
+    with tr.span("batch.selection", profiles=len(profiles)):
+        for p in profiles:
+            wanted = set(p.countries)
+            p.ctx = [it for it in items_ctx if it.get("country") in wanted]
+            p.context_count = len(p.ctx)
+            p.selection = ag.build_selection(p.ctx, p.days, cfg, expand1_days=10, expand2_days=30) if p.ctx else []
+
+    if summarizer is None:
+        from te_summarizer import MacroSummarizer
+        summarizer = MacroSummarizer(cfg.ANTHROPIC_API_KEY, cfg.MODEL, cfg.MODEL_TEMP, cfg.MAX_TOKENS)
+
+    # 3) item unici fra i profili (fingerprint) + cache persistente
+    unique: Dict[str, Dict[str, Any]] = {}
+    for p in profiles:
+        for it in p.selection:
+            unique.setdefault(ag._fp(it), dict(it))
+    writer = None
+    if use_cache and cfg.SINGLE_WRITER:
+        from te_writer import get_writer
+        writer = get_writer(cfg.DB_PATH)
+    cache = LLMCache(cfg.DB_PATH, ag.llm_cache_model(cfg), writer) if use_cache else None
+    cached = cache.get_many(list(unique)) if cache else {}
+    for k, fields in cached.items():
+        unique[k].update(fields)
+    todo = [it for k, it in unique.items() if k not in cached]
+    tr.add("batch_items", len(unique), kind="unique")
+    tr.add("batch_items", sum(len(p.selection) for p in profiles), kind="selected")
+    tr.add("batch_items", len(cached), kind="cache_hit")
+
+    # 4) ES in parallelo, arricchimento dei soli item mancanti, render appena un profilo è completo
+    lock = threading.Lock()
+    pending = {p.name: {ag._fp(it) for it in p.selection} - set(cached) for p in profiles}
+    es_done: Dict[str, bool] = {p.name: False for p in profiles}
+    render_futs: List[Future] = []
+    ts = datetime.now().strftime("%Y%m%d_%H%M")
+    render_pool = ThreadPoolExecutor(max_workers=max(1, min(4, len(profiles))), thread_name_prefix="te-batch-render")
+
+    def _render(p: Profile):
+        for it in p.selection:
+            it.update({k: v for k, v in unique[ag._fp(it)].items() if k in ("title_it", "summary_it")})
+        filename = f"MacroAnalysis_{p.name}_{p.days}days_{ts}.docx"
+        p.out_path = ag.save_report(filename, p.es_text, p.selection, p.countries, p.days, p.context_count, out_dir)
+
+    def _maybe_render(p: Profile):
+        with lock:
+            if not es_done[p.name] or pending[p.name] or p.submitted: return
+            p.submitted = True
+        render_futs.append(render_pool.submit(contextvars.copy_context().run, _render, p))
+
+    def _es(p: Profile):
+        p.es_text = summarizer.executive_summary(p.ctx, cfg, p.countries) if p.ctx else "Nessun contenuto."
+        with lock: es_done[p.name] = True
+        _maybe_render(p)
+
+    def _on_item(_, it):
+        k = ag._fp(it)
+        if cache and not it.get("llm_fallback"): cache.put(k, it)   # i ripieghi non vanno in cache
+        ready = []
+        with lock:
+            for p in profiles:
+                if k in pending[p.name]:
+                    pending[p.name].discard(k)
+                    if not pending[p.name]: ready.append(p)
+        for p in ready: _maybe_render(p)
+
+    def _interactive():
+        with ThreadPoolExecutor(max_workers=max(1, min(4, len(profiles))), thread_name_prefix="te-batch-es") as es_pool:
+            es_futs = [es_pool.submit(contextvars.copy_context().run, _es, p) for p in profiles]
+            ag.enrich_selection_it(summarizer, todo, cfg, delay_s=0.4, on_item=_on_item, workers=cfg.ENRICH_WORKERS)
+            for f in es_futs: f.result()
+
+    def _message_batch():
+        # una sola batch asincrona: nessun render anticipato, tutti i profili sono pronti insieme
+        es_jobs = {p.name: (p.ctx, p.countries) for p in profiles if p.ctx}
+        es_out = summarizer.batch_generate(cfg, es_jobs=es_jobs, items=todo)
+        if cache:
+            for it in todo:
+                if not it.get("llm_fallback"): cache.put(ag._fp(it), it)
+        with lock:
+            for p in profiles:
+                p.es_text = es_out.get(p.name, "Nessun contenuto.")
+                pending[p.name].clear(); es_done[p.name] = True
+
+    try:
+        with tr.span("batch.llm", es=len(profiles), items=len(todo), message_batch=int(use_message_batch)):
+            (_message_batch if use_message_batch else _interactive)()
+        for p in profiles: _maybe_render(p)   # profili senza item da arricchire
+        with tr.span("batch.render_wait"):
+            for f in list(render_futs): f.result()
+    finally:
+        render_pool.shutdown(wait=True)
+        if cache:
+            cache.prune(cfg.PRUNE_DAYS); cache.close()
+            logging.info("Cache LLM: %d hit, %d miss", cache.hits, cache.misses)
+    for p in profiles: p.ctx = []
+    return profiles
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="TE Macro Agent – report multipli da file profili")
+    ap.add_argument("profiles", help="file .toml o .json con i profili")
+    ap.add_argument("--output-dir", default="")
+    ap.add_argument("--no-llm-cache", action="store_true", help="non usare/aggiornare la cache persistente dei testi IT")
+    ap.add_argument("--message-batch", action="store_true",
+                    help="ES e testi IT via Message Batches API (sconto 50%%, completamento asincrono fino a ore)")
+    args = ap.parse_args(argv)
+    ag.setup_logging(logging.INFO)
+    cfg = ag.Config()
+    spec = load_profiles(args.profiles)
+    out_dir = args.output_dir or spec["output_dir"] or cfg.OUTPUT_DIR
+
+    t0 = time.perf_counter()
+    with tr.run("batch", profiles=len(spec["profiles"])) as trace:
+        profiles = run_batch(cfg, spec["profiles"], out_dir, use_cache=not args.no_llm_cache,
+                             use_message_batch=args.message_batch)
+    if cfg.TRACE_EXPORT:
+        trace.export(str(Path(out_dir) / "traces"), f"batch_{datetime.now():%Y%m%d_%H%M%S}")
+
+    print("=" * 80)
+    print(f"✅ Batch completato: {len(profiles)} report in {time.perf_counter() - t0:.1f}s")
+    for p in profiles:
+        print(f"• {p.name:<16} {p.days:>2}gg  {', '.join(p.countries):<40} item={len(p.selection):<3} -> {p.out_path}")
+    for row in trace.stage_breakdown()[:10]:
+        print(f"  ⏱ {row['stage']:<28} {row['total_ms']:>10.1f} ms  ×{row['calls']}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
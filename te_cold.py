@@ -0,0 +1,178 @@
+# te_cold.py — archivio "freddo" delle righe scadute di te_items (al posto della DELETE secca di db_prune)
+# - Parquet (pyarrow, compressione zstd) partizionato per giorno di last_seen: COLD_DIR/day=YYYY-MM-DD/part-*.parquet
+# - Righe ordinate per paese/categoria: le statistiche dei row group rendono efficace il pushdown dei filtri
+# - scan(): filtri su paese/periodo/categoria spinti nel reader (partizioni day= saltate, row group scartati),
+#   dedup per chiave (vince l'osservazione più recente)
+# - load_items(): NewsItem con age_days, per finestre ES oltre PRUNE_DAYS e backtest della selezione
+# Uso:
+#   python te_cold.py stats [--cold-dir DIR]
+#   python te_cold.py scan [--countries "Italy,Germany"] [--since 2025-06-01] [--until 2025-08-31] [--categories inflazione,lavoro] [--limit 20]
+#   python te_cold.py compact [--cold-dir DIR]
+
+import argparse, logging, os, time, uuid
+from datetime import datetime, date
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Sequence, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+
+COLUMNS = ("key",) + ag.DB_COLUMNS + ("category_mapped",)
+SCHEMA = pa.schema([
+    ("key", pa.string()), ("country", pa.string()), ("title", pa.string()), ("description", pa.string()),
+    ("time_text", pa.string()), ("importance", pa.int8()), ("category_raw", pa.string()),
+    ("first_seen_ts", pa.float64()), ("last_seen_ts", pa.float64()), ("category_mapped", pa.string()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+ROW_GROUP_SIZE = 4096
+DayLike = Union[str, date, datetime, float, None]
+
+def _day(v: DayLike) -> Optional[str]:
+    if v is None or v == "": return None
+    if isinstance(v, (int, float)): return f"{datetime.fromtimestamp(v):%Y-%m-%d}"
+    if isinstance(v, datetime): return f"{v:%Y-%m-%d}"
+    if isinstance(v, date): return v.isoformat()
+    return date.fromisoformat(str(v)[:10]).isoformat()
+
+def archive_rows(cold_dir: str, rows: Sequence[Sequence[Any]]) -> int:
+    """
+    Scrive righe di te_items (ordine: key + DB_COLUMNS) in un nuovo part file per giorno di last_seen.
+    File scritto con nome temporaneo e poi rinominato: un part è visibile solo se completo.
+    """
+    if not rows: return 0
+    with tr.span("cold.archive", rows=len(rows)) as sp:
+        by_day: Dict[str, List[Sequence[Any]]] = {}
+        for r in rows:
+            by_day.setdefault(_day(float(r[-1])), []).append(r)
+        written = 0
+        for day, part in sorted(by_day.items()):
+            cols = list(zip(*part))
+            data = {name: list(cols[i]) for i, name in enumerate(COLUMNS[:-1])}
+            data["importance"] = [int(x or 0) for x in data["importance"]]
+            data["category_mapped"] = [ag.detect_category_from_text(f"{t or ''} {d or ''}")
+                                       for t, d in zip(data["title"], data["description"])]
+            table = pa.table(data, schema=SCHEMA).sort_by([("country", "ascending"), ("category_mapped", "ascending"),
+                                                           ("last_seen_ts", "ascending")])
+            d = Path(cold_dir) / f"day={day}"; d.mkdir(parents=True, exist_ok=True)
+            name = f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet"
+            tmp = d / f".{name}.tmp"
+            pq.write_table(table, tmp, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+            os.replace(tmp, d / name)
+            written += table.num_rows
+        sp.set(days=len(by_day), rows_written=written)
+    return written
+
+def _dataset(cold_dir: str):
+    return ds.dataset(cold_dir, format="parquet", partitioning=PARTITIONING, schema=SCHEMA.append(pa.field("day", pa.string())),
+                      exclude_invalid_files=True, ignore_prefixes=[".", "_"])
+
+def scan(cold_dir: str, countries: Optional[List[str]] = None, since: DayLike = None, until: DayLike = None,
+         categories: Optional[List[str]] = None, columns: Optional[List[str]] = None, dedup: bool = True) -> pa.Table:
+    """
+    Righe archiviate come tabella Arrow. since/until = giorni (inclusi) di last_seen; categories sulla
+    tassonomia interna (category_mapped). I filtri sono spinti nel reader; dedup per chiave sul last_seen più recente.
+    """
+    cols = list(columns or COLUMNS)
+    if not Path(cold_dir).is_dir():
+        return SCHEMA.empty_table().select(cols)
+    need = list(dict.fromkeys(cols + (["key", "last_seen_ts"] if dedup else [])))
+    flt = None
+    def _and(e):
+        nonlocal flt
+        flt = e if flt is None else flt & e
+    if since is not None: _and(ds.field("day") >= _day(since))
+    if until is not None: _and(ds.field("day") <= _day(until))
+    if countries: _and(ds.field("country").isin([ag.normalize_country(c) for c in countries]))
+    if categories: _and(ds.field("category_mapped").isin(list(categories)))
+    with tr.span("cold.scan", countries=len(countries or []), since=_day(since) or "", until=_day(until) or "") as sp:
+        table = _dataset(cold_dir).to_table(columns=need, filter=flt)
+        sp.set(rows_read=table.num_rows)
+        if dedup and table.num_rows:
+            table = table.take(pc.sort_indices(table, sort_keys=[("last_seen_ts", "descending")]))
+            seen: set = set()
+            keep = [i for i, k in enumerate(table.column("key").to_pylist()) if not (k in seen or seen.add(k))]
+            if len(keep) < table.num_rows:
+                table = table.take(pa.array(keep, type=pa.int64()))
+        sp.set(rows_out=table.num_rows)
+    return table.select(cols)
+
+def load_items(cold_dir: str, countries: List[str], since: DayLike = None, until: DayLike = None,
+               categories: Optional[List[str]] = None, now: Optional[float] = None) -> List["ag.NewsItem"]:
+    """NewsItem dalle righe archiviate; età relativa a now (testi relativi letti rispetto all'istante della cattura)."""
+    now = time.time() if now is None else now
+    t = scan(cold_dir, countries, since, until, categories,
+             columns=["key", "country", "title", "description", "time_text", "importance", "category_raw", "last_seen_ts"])
+    out = []
+    for r in t.to_pylist():
+        seen = float(r["last_seen_ts"])
+        at_capture = ag.parse_age_days_from_text(r["time_text"] or "", now=datetime.fromtimestamp(seen))
+        age = max(0.0, (now - seen) / 86400.0) + (at_capture if at_capture is not None and at_capture <= 90.0 else 0.0)
+        it = ag.NewsItem({"country": r["country"], "title": r["title"] or "", "description": r["description"] or "",
+                          "time": r["time_text"] or "", "importance": int(r["importance"] or 0),
+                          "category_raw": r["category_raw"] or "", "age_days": age})
+        it._key = r["key"]   # chiave di te_items all'archiviazione (dedup con il contesto caldo)
+        out.append(it)
+    return out
+
+def stats(cold_dir: str) -> List[Dict[str, Any]]:
+    """Per giorno: part file, righe (dai metadati, senza leggere i dati) e byte su disco."""
+    out = []
+    for d in sorted(Path(cold_dir).glob("day=*")):
+        parts = sorted(d.glob("part-*.parquet"))
+        out.append({"day": d.name[4:], "parts": len(parts),
+                    "rows": sum(pq.ParquetFile(p).metadata.num_rows for p in parts),
+                    "bytes": sum(p.stat().st_size for p in parts)})
+    return out
+
+def compact(cold_dir: str, day: DayLike = None) -> int:
+    """Fonde i part file di ogni giorno (o di un giorno) in uno solo, deduplicato; ritorna i giorni compattati."""
+    n = 0
+    days = [Path(cold_dir) / f"day={_day(day)}"] if day is not None else sorted(Path(cold_dir).glob("day=*"))
+    for d in days:
+        parts = sorted(d.glob("part-*.parquet"))
+        if len(parts) < 2: continue
+        table = scan(cold_dir, since=d.name[4:], until=d.name[4:])
+        rows = list(zip(*(table.column(c).to_pylist() for c in COLUMNS[:-1])))
+        archive_rows(cold_dir, rows)
+        for p in parts: p.unlink()
+        n += 1
+    return n
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Archivio freddo (Parquet) delle notizie uscite da te_items")
+    ap.add_argument("cmd", choices=["stats", "scan", "compact"])
+    ap.add_argument("--cold-dir", default=ag.Config.COLD_DIR)
+    ap.add_argument("--countries", default="")
+    ap.add_argument("--since", default="")
+    ap.add_argument("--until", default="")
+    ap.add_argument("--categories", default="")
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args(argv)
+    ag.setup_logging(logging.INFO)
+
+    if args.cmd == "stats":
+        rows = stats(args.cold_dir)
+        for r in rows:
+            print(f"{r['day']}  part={r['parts']:<3} righe={r['rows']:<7} {r['bytes']/1024:8.1f} KiB")
+        print(f"Totale: {len(rows)} giorni, {sum(r['rows'] for r in rows)} righe, "
+              f"{sum(r['bytes'] for r in rows)/2**20:.2f} MiB")
+    elif args.cmd == "scan":
+        split = lambda s: [x.strip() for x in s.split(",") if x.strip()]
+        t0 = time.perf_counter()
+        table = scan(args.cold_dir, split(args.countries) or None, args.since or None, args.until or None,
+                     split(args.categories) or None,
+                     columns=["country", "category_mapped", "time_text", "last_seen_ts", "title"])
+        for r in table.slice(0, args.limit).to_pylist():
+            print(f"{datetime.fromtimestamp(r['last_seen_ts']):%Y-%m-%d}  {r['country']:<16} {r['category_mapped']:<11} {r['title'][:90]}")
+        print(f"{table.num_rows} righe in {(time.perf_counter() - t0)*1000:.1f} ms")
+    else:
+        print(f"Giorni compattati: {compact(args.cold_dir)}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,413 @@
+# te_headlines.py — traduzione locale dei titoli "a formula" dello stream TE, senza chiamata LLM
+# - Titolo = [paese] indicatore [predicato] [modificatori] [": fonte"], es. "US Job Cuts Fall in September: Challenger"
+#   -> "USA: tagli di posti di lavoro in calo a settembre (Challenger)"
+# - Dizionari: paesi/aggettivi, indicatori (nome IT con genere/numero per l'accordo), verbi/direzioni, modificatori
+#   (mese, trimestre, livelli "to/from/at X%", massimi/minimi di N mesi, serie consecutive, attese)
+# - Il titolo deve essere riconosciuto per intero, altrimenti None: il chiamante usa il LLM (translate_it)
+# - Hit rate: stats() e contatore nel trace (headline_translations{source=template|llm})
+# Uso: python te_headlines.py [--db news_cache.sqlite] [--misses 30]   # hit rate e campione sui titoli del DB
+#      python te_headlines.py --check                                   # casi noti (_CHECKS), exit 1 se divergono
+
+import argparse, re, sqlite3, threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import te_trace as tr
+
+# ============= Dizionari =============
+COUNTRIES_IT = {
+    "US": "USA", "U.S.": "USA", "United States": "USA", "American": "USA",
+    "UK": "Regno Unito", "U.K.": "Regno Unito", "United Kingdom": "Regno Unito", "British": "Regno Unito",
+    "Euro Area": "Eurozona", "Eurozone": "Eurozona", "EU": "UE", "European Union": "UE",
+    "Germany": "Germania", "German": "Germania", "France": "Francia", "French": "Francia",
+    "Italy": "Italia", "Italian": "Italia", "Spain": "Spagna", "Spanish": "Spagna",
+    "China": "Cina", "Chinese": "Cina", "Japan": "Giappone", "Japanese": "Giappone",
+    "Netherlands": "Paesi Bassi", "Dutch": "Paesi Bassi", "Canada": "Canada", "Canadian": "Canada",
+    "Australia": "Australia", "Australian": "Australia", "Switzerland": "Svizzera", "Swiss": "Svizzera",
+    "India": "India", "Indian": "India", "Brazil": "Brasile", "Brazilian": "Brasile",
+    "Mexico": "Messico", "Mexican": "Messico", "South Korea": "Corea del Sud", "South Korean": "Corea del Sud",
+    "Russia": "Russia", "Russian": "Russia", "Turkey": "Turchia", "Turkish": "Turchia",
+    "Sweden": "Svezia", "Swedish": "Svezia", "Norway": "Norvegia", "Norwegian": "Norvegia",
+    "Poland": "Polonia", "Polish": "Polonia", "Belgium": "Belgio", "Belgian": "Belgio",
+    "Austria": "Austria", "Austrian": "Austria", "Ireland": "Irlanda", "Irish": "Irlanda",
+    "Portugal": "Portogallo", "Portuguese": "Portogallo", "Greece": "Grecia", "Greek": "Grecia",
+    "New Zealand": "Nuova Zelanda", "South Africa": "Sudafrica", "South African": "Sudafrica",
+}
+
+# nome inglese -> (nome italiano, genere/numero: ms | fs | mp | fp)
+INDICATORS_IT: Dict[str, Tuple[str, str]] = {
+    # prezzi
+    "Inflation Rate": ("inflazione", "fs"), "Annual Inflation Rate": ("inflazione annua", "fs"),
+    "Inflation": ("inflazione", "fs"), "Core Inflation Rate": ("inflazione core", "fs"), "Core Inflation": ("inflazione core", "fs"),
+    "Food Inflation": ("inflazione alimentare", "fs"), "Producer Inflation": ("inflazione alla produzione", "fs"),
+    "CPI": ("CPI", "ms"), "Core CPI": ("CPI core", "ms"), "PPI": ("PPI", "ms"), "Core PPI": ("PPI core", "ms"),
+    "Consumer Prices": ("prezzi al consumo", "mp"), "Producer Prices": ("prezzi alla produzione", "mp"),
+    "Import Prices": ("prezzi all'import", "mp"), "Export Prices": ("prezzi all'export", "mp"),
+    "Energy Prices": ("prezzi dell'energia", "mp"), "Food Prices": ("prezzi alimentari", "mp"),
+    "PCE Prices": ("prezzi PCE", "mp"), "Core PCE Prices": ("prezzi PCE core", "mp"),
+    "PCE Inflation": ("inflazione PCE", "fs"), "Core PCE Inflation": ("inflazione PCE core", "fs"),
+    "House Prices": ("prezzi delle case", "mp"), "Home Prices": ("prezzi delle case", "mp"),
+    "Used Car Prices": ("prezzi delle auto usate", "mp"),
+    "Consumer Inflation Expectations": ("aspettative d'inflazione dei consumatori", "fp"),
+    "Inflation Expectations": ("aspettative d'inflazione", "fp"),
+    "Year-Ahead Inflation Expectations": ("aspettative d'inflazione a un anno", "fp"),
+    # lavoro
+    "Unemployment Rate": ("tasso di disoccupazione", "ms"), "Jobless Rate": ("tasso di disoccupazione", "ms"),
+    "Jobless Claims": ("richieste di sussidi di disoccupazione", "fp"),
+    "Initial Jobless Claims": ("richieste iniziali di sussidi di disoccupazione", "fp"),
+    "Continuing Jobless Claims": ("richieste continuative di sussidi di disoccupazione", "fp"),
+    "Non Farm Payrolls": ("buste paga non agricole", "fp"), "Nonfarm Payrolls": ("buste paga non agricole", "fp"),
+    "Job Cuts": ("tagli di posti di lavoro", "mp"), "Job Openings": ("posti di lavoro vacanti", "mp"),
+    "Job Quits": ("dimissioni volontarie", "fp"), "Employment": ("occupazione", "fs"),
+    "Wage Growth": ("crescita dei salari", "fs"), "Average Hourly Earnings": ("retribuzione oraria media", "fs"),
+    "Labor Costs": ("costo del lavoro", "ms"), "Unit Labor Costs": ("costo unitario del lavoro", "ms"),
+    "Productivity": ("produttività", "fs"),
+    # attività
+    "GDP": ("PIL", "ms"), "GDP Growth": ("crescita del PIL", "fs"), "GDP Growth Rate": ("crescita del PIL", "fs"),
+    "Economy": ("economia", "fs"), "Industrial Production": ("produzione industriale", "fs"),
+    "Industrial Output": ("produzione industriale", "fs"),
+    "Manufacturing Output": ("produzione manifatturiera", "fs"), "Manufacturing Production": ("produzione manifatturiera", "fs"),
+    "Capacity Utilization": ("utilizzo della capacità produttiva", "ms"),
+    "Industrial Capacity Utilization": ("utilizzo della capacità produttiva", "ms"),
+    "Retail Sales": ("vendite al dettaglio", "fp"), "Factory Orders": ("ordini all'industria", "mp"),
+    "Durable Goods Orders": ("ordini di beni durevoli", "mp"), "Business Inventories": ("scorte delle imprese", "fp"),
+    "Wholesale Inventories": ("scorte all'ingrosso", "fp"), "Wholesale Inventory Growth": ("crescita delle scorte all'ingrosso", "fs"),
+    "Construction Output": ("produzione nelle costruzioni", "fs"), "Construction Spending": ("spesa per costruzioni", "fs"),
+    "Personal Income": ("reddito personale", "ms"), "Personal Spending": ("spesa personale", "fs"),
+    "Consumer Spending": ("spesa dei consumatori", "fs"), "Consumer Credit": ("credito al consumo", "ms"),
+    "Consumer Credit Expansion": ("espansione del credito al consumo", "fs"),
+    "Car Registrations": ("immatricolazioni di auto", "fp"), "Car Sales": ("vendite di auto", "fp"),
+    # immobiliare e mutui
+    "Housing Starts": ("nuovi cantieri residenziali", "mp"), "Building Permits": ("permessi di costruzione", "mp"),
+    "Existing Home Sales": ("vendite di case esistenti", "fp"), "New Home Sales": ("vendite di nuove case", "fp"),
+    "Pending Home Sales": ("compromessi di vendita di case", "mp"), "Homebuilder Confidence": ("fiducia dei costruttori", "fs"),
+    "Homebuilder Sentiment": ("fiducia dei costruttori", "fs"),
+    "Mortgage Applications": ("richieste di mutuo", "fp"), "Mortgage Rates": ("tassi sui mutui", "mp"),
+    "Mortgage Rate": ("tasso sui mutui", "ms"), "30-Year Mortgage Rate": ("tasso sui mutui a 30 anni", "ms"),
+    # PMI e fiducia
+    "Manufacturing PMI": ("PMI manifatturiero", "ms"), "Services PMI": ("PMI dei servizi", "ms"),
+    "Composite PMI": ("PMI composito", "ms"), "ISM Manufacturing PMI": ("PMI manifatturiero ISM", "ms"),
+    "ISM Services PMI": ("PMI dei servizi ISM", "ms"), "Chicago PMI": ("PMI di Chicago", "ms"), "PMI": ("PMI", "ms"),
+    "Manufacturing Activity": ("attività manifatturiera", "fs"), "Factory Activity": ("attività manifatturiera", "fs"),
+    "Manufacturing Sector": ("settore manifatturiero", "ms"), "Manufacturing": ("manifattura", "fs"),
+    "Factory Growth": ("crescita manifatturiera", "fs"), "Services Activity": ("attività dei servizi", "fs"),
+    "Service Sector": ("settore dei servizi", "ms"), "Services Sector": ("settore dei servizi", "ms"),
+    "Business Activity": ("attività economica", "fs"), "Business Activity Growth": ("crescita dell'attività economica", "fs"),
+    "Private Sector": ("settore privato", "ms"), "Private Sector Growth": ("crescita del settore privato", "fs"),
+    "Business Confidence": ("fiducia delle imprese", "fs"), "Consumer Confidence": ("fiducia dei consumatori", "fs"),
+    "Consumer Sentiment": ("fiducia dei consumatori", "fs"), "Economic Sentiment": ("sentiment economico", "ms"),
+    "Michigan Consumer Sentiment": ("fiducia dei consumatori dell'Università del Michigan", "fs"),
+    "UMich Consumer Confidence": ("fiducia dei consumatori dell'Università del Michigan", "fs"),
+    "UMich Consumer Sentiment": ("fiducia dei consumatori dell'Università del Michigan", "fs"),
+    "Small Business Optimism": ("ottimismo delle piccole imprese", "ms"), "ZEW Economic Sentiment": ("indice ZEW", "ms"),
+    "Ifo Business Climate": ("clima d'affari Ifo", "ms"), "Business Climate": ("clima d'affari", "ms"),
+    # commercio estero e conti
+    "Trade Balance": ("bilancia commerciale", "fs"), "Trade Deficit": ("deficit commerciale", "ms"),
+    "Trade Surplus": ("surplus commerciale", "ms"), "Exports": ("esportazioni", "fp"), "Imports": ("importazioni", "fp"),
+    "Current Account Deficit": ("deficit delle partite correnti", "ms"), "Current Account Surplus": ("surplus delle partite correnti", "ms"),
+    "Budget Deficit": ("deficit di bilancio", "ms"), "Capital Inflows": ("afflussi di capitale", "mp"),
+    # mercati ed energia
+    "10-Year Yield": ("rendimento decennale", "ms"), "10-Year Treasury Yield": ("rendimento del Treasury decennale", "ms"),
+    "2-Year Yield": ("rendimento a 2 anni", "ms"), "30-Year Yield": ("rendimento a 30 anni", "ms"),
+    "Treasury Yields": ("rendimenti dei Treasury", "mp"), "Yields": ("rendimenti", "mp"), "Bond Yields": ("rendimenti obbligazionari", "mp"),
+    "Stocks": ("azioni", "fp"), "Stock Market": ("Borsa", "fs"),
+    "Crude Inventories": ("scorte di greggio", "fp"), "Crude Oil Inventories": ("scorte di greggio", "fp"),
+    "Crude Oil Stocks": ("scorte di greggio", "fp"), "Crude Stocks": ("scorte di greggio", "fp"),
+    "Gasoline Inventories": ("scorte di benzina", "fp"), "Gasoline Stocks": ("scorte di benzina", "fp"),
+    "Distillate Stocks": ("scorte di distillati", "fp"), "Natural Gas Stocks": ("scorte di gas naturale", "fp"),
+    "Money Supply": ("offerta di moneta", "fs"),
+    "Natural Gas Storage": ("scorte di gas naturale", "fp"), "Natural Gas Stockpiles": ("scorte di gas naturale", "fp"), "Home Price Growth": ("crescita dei prezzi delle case", "fs"),
+    "Initial Unemployment Claims": ("richieste iniziali di sussidi di disoccupazione", "fp"),
+    "Unemployment Claims": ("richieste di sussidi di disoccupazione", "fp"),
+    "Corporate Profits": ("profitti aziendali", "mp"), "Goods Trade Deficit": ("deficit commerciale di beni", "ms"),
+    "Services Inflation": ("inflazione dei servizi", "fs"), "Manufacturing Index": ("indice manifatturiero", "ms"),
+    "1-Year Inflation Expectations": ("aspettative d'inflazione a 1 anno", "fp"),
+    "5-Year Inflation Expectations": ("aspettative d'inflazione a 5 anni", "fp"), "Loan Growth": ("crescita dei prestiti", "fs"),
+}
+
+# predicati: regex (inglese, minuscolo) -> (italiano con accordo {o}/{e}, direzione per "by X%")
+_VERBS: List[Tuple[str, str, int]] = [
+    (r"extends? (?:declines?|decreases?|falls?|losses|drops?|slide)", "ancora in calo", -1),
+    (r"extends? (?:gains|rises?|increases?|advances?|rebound|rally)", "ancora in aumento", +1),
+    (r"holds? (?:declines?|decreases?|losses|weekly declines?)", "{mantiene|mantengono} il calo", -1),
+    (r"holds? (?:gains|advances?|rebound|weekly gains?)", "{mantiene|mantengono} il rialzo", +1),
+    (r"(?:edges?|ticks?|inch(?:es)?|creeps?) (?:up|higher)(?: slightly)?|rises? (?:slightly|marginally|modestly)", "in lieve aumento", +1),
+    (r"(?:edges?|ticks?|inch(?:es)?|slips?) (?:down|lower)(?: slightly)?|(?:falls?|declines?) (?:slightly|marginally|modestly)|slightly down", "in lieve calo", -1),
+    (r"(?:rises?|increases?|climbs?) sharply|jumps?|surges?|soars?|spikes?|skyrockets?", "in forte aumento", +1),
+    (r"(?:falls?|declines?|drops?) sharply|plunges?|plummets?|tumbles?|sinks?|slumps?|collapses?", "in forte calo", -1),
+    (r"(?:rises?|increases?|climbs?|gains?|advances?) (?:again|further)", "ancora in aumento", +1),
+    (r"(?:falls?|declines?|drops?|decreases?|eases?) (?:again|further)|continues? to (?:fall|decline|drop)", "ancora in calo", -1),
+    (r"(?:rebounds?|recovers?) (?:again|further)", "ancora in ripresa", +1),
+    (r"(?:slows?|decelerates?|cools?) (?:again|further)", "ancora in rallentamento", -1),
+    (r"rebounds?|recovers?|bounces? back", "in ripresa", +1),
+    (r"accelerates?|picks? up|speeds? up", "in accelerazione", +1),
+    (r"slows?|decelerates?|cools?|moderates?", "in rallentamento", -1),
+    (r"narrows? sharply", "in forte riduzione", -1),
+    (r"widens? sharply", "in forte ampliamento", +1),
+    (r"narrows?", "in riduzione", -1),
+    (r"widens?", "in ampliamento", +1),
+    (r"rises?|rose|increases?|climbs?|goes up|moves? (?:up|higher)|grows?|expands?|advances?|gains?|up", "in aumento", +1),
+    (r"falls?|fell|declines?|decreases?|drops?|goes down|moves? (?:down|lower)|eases?|contracts?|shrinks?|dips?|slips?|retreats?|down", "in calo", -1),
+    (r"holds? steady|steadies|stabilizes?|stabilises?|(?:remains?|stays?|holds?) (?:steady|stable)|little changed|steady|stable", "stabil{e}", 0),
+    (r"(?:remains?|stays?|holds?|is) unchanged|unchanged|flat", "invariat{o}", 0),
+    (r"revised (?:sharply|significantly) (?:higher|up|upward)", "rivist{o} nettamente al rialzo", +1),
+    (r"revised (?:sharply|significantly) (?:lower|down|downward)", "rivist{o} nettamente al ribasso", -1),
+    (r"revised (?:slightly|marginally) (?:higher|up|upward)", "rivist{o} leggermente al rialzo", +1),
+    (r"revised (?:slightly|marginally) (?:lower|down|downward)", "rivist{o} leggermente al ribasso", -1),
+    (r"revised (?:higher|up|upward)", "rivist{o} al rialzo", +1),
+    (r"revised (?:lower|down|downward)", "rivist{o} al ribasso", -1),
+    (r"(?:beats?|tops?|exceeds?) (?:market )?(?:expectations|estimates|forecasts?)|above (?:market )?(?:expectations|estimates|forecasts?)", "sopra le attese", 0),
+    (r"miss(?:es)? (?:market )?(?:expectations|estimates|forecasts?)|below (?:market )?(?:expectations|estimates|forecasts?)", "sotto le attese", 0),
+    (r"(?:comes? in )?in line with (?:market )?(?:expectations|estimates|forecasts?)|match(?:es)? (?:market )?(?:expectations|estimates|forecasts?)", "in linea con le attese", 0),
+    (r"(?:is )?confirmed", "confermat{o}", 0),
+    (r"remains? in contraction|stays? in contraction", "ancora in contrazione", -1),
+    (r"remains? in expansion|stays? in expansion", "ancora in espansione", +1),
+    (r"returns? to (?:contraction|negative territory)", "{torna|tornano} in contrazione", -1),
+    (r"returns? to (?:expansion|growth|positive territory)", "{torna|tornano} in espansione", +1),
+    (r"hits?|reaches?|hovers? at|holds? at|stands? at|at", "", 0),   # solo livello: "at 3.1%", "hits 2-week low"
+    (r"holds? near|hovers? near|near", "vicino a", 0),
+]
+_VERB_RX = [(re.compile(rf"(?:{rx})(?=\s|$)", re.I), it, d) for rx, it, d in _VERBS]
+
+_MONTHS = {m: it for m, it in zip(
+    ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december"],
+    ["gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno", "luglio", "agosto", "settembre", "ottobre", "novembre", "dicembre"])}
+_MONTHS.update({m[:3]: it for m, it in list(_MONTHS.items())})
+_QUARTERS = {"q1": "primo", "q2": "secondo", "q3": "terzo", "q4": "quarto",
+             "first": "primo", "second": "secondo", "third": "terzo", "fourth": "quarto"}
+_WORDNUM = {w: i for i, w in enumerate(["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+                                        "ten", "eleven", "twelve"])}
+_ORDWORD = {"second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10}
+_UNITS_IT = {"day": ("giorno", "giorni", "m"), "week": ("settimana", "settimane", "f"), "month": ("mese", "mesi", "m"),
+             "quarter": ("trimestre", "trimestri", "m"), "year": ("anno", "anni", "m")}
+_NUM_UNIT_IT = {"billion": " miliardi", "bn": " miliardi", "million": " milioni", "trillion": " trilioni", "tn": " trilioni",
+                "thousand": " mila", "k": " mila", "m": " milioni", "b": " miliardi", "bps": " pb", "basis points": " punti base", "percent": "%", "pc": "%"}
+
+# ============= Parsing =============
+def _alt(words) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+_COUNTRY_RX = re.compile(rf"^(?:{_alt(COUNTRIES_IT)})(?=\s)", re.I)
+_COUNTRY_KEYS = {k.lower(): v for k, v in COUNTRIES_IT.items()}
+_IND_RX = re.compile(rf"^(?:{_alt(INDICATORS_IT)})(?=\s|$|:)", re.I)
+_IND_KEYS = {k.lower(): v for k, v in INDICATORS_IT.items()}
+_IND_NAMES = {k.lower(): k for k in INDICATORS_IT}
+_SOURCE_RX = re.compile(r":\s*((?:[A-Z0-9][\w&/.\-]*)(?:\s+(?:[A-Z0-9&][\w&/.\-]*)){0,3})\s*$")
+_NUM = r"(?P<num>[-+]?[$€£¥]?\d[\d,]*(?:\.\d+)?)\s?(?P<unit>%|percent|pc|K|M|B|bn|tn|billion|million|thousand|trillion|bps|basis points)?"
+_COUNT = r"(?P<n>\d+|an?|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)"
+_UNIT = r"(?P<u>day|week|month|quarter|year)s?"
+
+_END = {"ms": ("o", "e"), "fs": ("a", "e"), "mp": ("i", "i"), "fp": ("e", "i")}
+
+def _agree(s: str, gn: str) -> str:
+    o, e = _END[gn]
+    s = re.sub(r"\{([^|{}]*)\|([^|{}]*)\}", lambda m: m.group(2 if gn[1] == "p" else 1), s)   # {singolare|plurale}
+    return s.replace("{o}", o).replace("{e}", e)
+
+def _num_it(m) -> Tuple[str, bool]:
+    """Numero in formato italiano (virgola decimale, punto migliaia) e se è una percentuale."""
+    num = m.group("num").replace(",", "\0").replace(".", ",").replace("\0", ".")
+    unit = m.group("unit") or ""
+    pct = unit.lower() in ("%", "percent", "pc")
+    return num + (_NUM_UNIT_IT.get(unit.lower(), unit) if not pct else "%"), pct
+
+def _art(prep: str, num: str) -> str:
+    """Preposizione articolata davanti al numero: 'al 2%', 'all'8%', 'all'11%', 'allo 0,5%' (idem 'dal')."""
+    d = re.sub(r"[^\d,]", "", num).split(",")[0]
+    if d == "0": return f"{prep}llo "
+    return f"{prep}ll'" if d in ("1", "11") or d.startswith("8") else f"{prep}l "
+
+def _count(s: str) -> int:
+    return int(s) if s.isdigit() else 1 if s.lower() in ("a", "an") else _WORDNUM[s.lower()]
+
+def _span(n: int, u: str) -> str:
+    sing, plur, g = _UNITS_IT[u.lower()]
+    return f"{n} {plur}" if n != 1 else f"{'una' if g == 'f' else 'un'} {sing}"
+
+# modificatori: regex ancorata al resto del titolo -> funzione(match, direzione) -> testo italiano
+def _m_to(m, d):
+    v, pct = _num_it(m)
+    return f" {_art('a', v)}{v}" if pct else f" a {v}"
+def _m_from(m, d):
+    v, pct = _num_it(m)
+    return f" {_art('da', v)}{v}" if pct else f" da {v}"
+def _m_by(m, d):
+    if d == 0: return None
+    v, _ = _num_it(m)
+    return f" ({v})" if v.startswith(("-", "+")) else f" ({'+' if d > 0 else '-'}{v})"
+def _m_extreme(m, d):
+    what = "massimi" if m.group("hl").lower() in ("high", "highest") else "minimi"
+    prep = {"from": "dai", "toward": "verso i", "towards": "verso i"}.get((m.groupdict().get("prep") or "").lower(), "ai")
+    near = "vicino ai" if m.groupdict().get("near") else prep
+    over = "da oltre" if m.groupdict().get("over") else "di"
+    return f" {near} {what} {over} {_span(_count(m.group('n')), m.group('u'))}"
+def _m_record(m, d):
+    return f" ai {'massimi' if m.group('hl').lower() == 'high' else 'minimi'} storici"
+def _m_since(m, d):
+    what = "massimi" if m.group("hl").lower() == "highest" else "minimi"
+    if m.group("yr2"):  # solo anno: preposizione articolata ("dal 2021")
+        return f" ai {what} dal {m.group('yr2')}"
+    return f" ai {what} da {_MONTHS[m.group('mon').lower()]}" + (f" {m.group('yr')}" if m.group("yr") else "")
+def _m_pace(m, d):
+    rate = "più sostenuto" if m.group("fs").lower() == "fastest" else "più contenuto"
+    if m.group("mon"):
+        return f", ritmo {rate} da {_MONTHS[m.group('mon').lower()]}" + (f" {m.group('yr')}" if m.group("yr") else "")
+    return f", ritmo {rate} da {_span(_count(m.group('n')), m.group('u'))}"
+def _m_most(m, d):
+    rate = "più sostenuto" if m.group("ml").lower() == "most" else "più contenuto"
+    return f", ritmo {rate} da {_span(_count(m.group('n')), m.group('u'))}"
+def _m_streak(m, d):
+    n = _count(m.group("n")) if m.group("n") else _ORDWORD[m.group("ow").lower()]
+    sing, _, g = _UNITS_IT[m.group("u").lower()]
+    return f" per {'la' if g == 'f' else 'il'} {n}{'ª' if g == 'f' else 'º'} {sing} consecutiv{'a' if g == 'f' else 'o'}"
+def _m_month(m, d):
+    mon = _MONTHS[m.group("mon").lower()]
+    return f" {'ad' if mon[0] == 'a' else 'a'} {mon}" + (f" {m.group('yr')}" if m.group("yr") else "")
+def _m_quarter(m, d):
+    return f" nel {_QUARTERS[m.group('q').lower()]} trimestre" + (f" {m.group('yr')}" if m.group("yr") else "")
+def _m_expect(m, d):
+    return f" {'più' if m.group('ml').lower() == 'more' else 'meno'} del previsto"
+
+_MON = r"(?P<mon>" + _alt(_MONTHS) + r")\.?"
+_MODS = [(re.compile(rx, re.I), fn) for rx, fn in [
+    (r"\s+(?:(?P<prep>to|at|hits?|from|towards?)\s+)?(?:(?P<near>near|close to)\s+)?(?:a\s+|an\s+|(?P<over>over)\s+(?:a\s+)?)?" + _COUNT + r"[-\s]" + _UNIT + r"\s+(?P<hl>high|low)", _m_extreme),
+    (r"\s+(?:to|at)\s+(?:a\s+)?record\s+(?P<hl>high|low)", _m_record),
+    (r"\s+(?:(?:to|at)\s+)?(?:the\s+)?(?P<hl>highest|lowest)\s+in\s+" + _COUNT + r"\s+" + _UNIT, _m_extreme),
+    (r"\s+(?:(?:to|at)\s+)?(?:the\s+)?(?P<hl>highest|lowest)\s+since\s+(?:" + _MON + r"(?:\s+(?P<yr>\d{4}))?|(?P<yr2>\d{4}))", _m_since),
+    (r"\s+(?:the\s+)?(?P<ml>most|least)\s+in\s+" + _COUNT + r"\s+" + _UNIT, _m_most),
+    (r"\s+at\s+(?:the\s+|its\s+)?(?P<fs>fastest|slowest)\s+(?:pace|rate)\s+(?:since\s+" + _MON + r"(?:\s+(?P<yr>\d{4}))?|in\s+" + _COUNT + r"\s+" + _UNIT + r")", _m_pace),
+    (r"\s+(?:for|in)\s+(?:the\s+|a\s+)?(?:(?P<n>\d+)(?:st|nd|rd|th)|(?P<ow>second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth))\s+(?:straight\s+|consecutive\s+|successive\s+|running\s+)?" + _UNIT, _m_streak),
+    (r"\s+(?:more|less)\s+than\s+(?:expected|estimated|estimates|forecast|forecasts|anticipated)".replace("(?:more|less)", "(?P<ml>more|less)"), _m_expect),
+    (r"\s+(?:to|at)\s+" + _NUM, _m_to),
+    (r"\s+from\s+" + _NUM, _m_from),
+    (r"\s+(?:by\s+)?" + _NUM, _m_by),
+    (r"\s+in\s+" + _MON + r"(?:\s+(?P<yr>\d{4}))?", _m_month),
+    (r"\s+in\s+(?:the\s+)?(?P<q>q[1-4]|first|second|third|fourth)(?:\s+quarter)?(?:\s+(?:of\s+)?(?P<yr>\d{4}))?", _m_quarter),
+    (r"\s+(?:mom|m/m|month-over-month|on month)", lambda m, d: " su base mensile"),
+    (r"\s+(?:yoy|y/y|year-on-year|year-over-year|on year)", lambda m, d: " su base annua"),
+    (r"\s+(?:qoq|q/q|quarter-on-quarter)", lambda m, d: " su base trimestrale"),
+    (r"\s+of\s+" + _NUM, lambda m, d: f" ({_num_it(m)[0]})"),
+    (r"\s+(?:as|in line with)\s+(?:expected|forecast|anticipated|estimated)", lambda m, d: " come previsto"),
+    (r"\s+(?:last|this)\s+week", lambda m, d: " nell'ultima settimana"),
+    (r"\s+unexpectedly", lambda m, d: " a sorpresa"),
+]]
+_UNEXPECTED_RX = re.compile(r"^unexpectedly\s+", re.I)
+
+def _parse_rest(rest: str) -> Optional[str]:
+    """Predicato + modificatori; None se resta testo non riconosciuto."""
+    rest = rest.strip()
+    surprise = ""
+    m = _UNEXPECTED_RX.match(rest)
+    if m: surprise, rest = " a sorpresa", rest[m.end():]
+    pred, d = "", 0
+    rest = rest.lstrip()
+    for rx, it, dd in _VERB_RX:
+        m = rx.match(rest)
+        if m:
+            pred, d, rest = it, dd, rest[m.end():]
+            break
+    else:
+        if surprise: return None
+    out = [pred + surprise] if pred or surprise else []
+    rest, level = " " + rest.strip(), False
+    while rest.strip():
+        for rx, fn in _MODS:
+            m = rx.match(rest)
+            if m and m.end() > 0:
+                txt = fn(m, d)
+                if txt is None: return None
+                out.append(txt); rest = rest[m.end():]
+                level = level or fn in (_m_to, _m_extreme, _m_record, _m_since)
+                break
+        else:
+            return None
+    if not pred and not level:   # né verbo né livello: non è un titolo a formula
+        return None
+    return "".join(out).strip()
+
+@lru_cache(maxsize=4096)
+def _translate(title: str) -> Optional[str]:
+    t = re.sub(r"\s+", " ", (title or "").strip())
+    if not t: return None
+    source = ""
+    m = _SOURCE_RX.search(t)
+    if m:
+        source, t = f" ({m.group(1)})", t[:m.start()].strip()
+    country = ""
+    m = _COUNTRY_RX.match(t)
+    if m:
+        country, t = _COUNTRY_KEYS[m.group(0).lower()], t[m.end():].strip()
+    m = _IND_RX.match(t)
+    if not m: return None
+    name, gn = _IND_KEYS[m.group(0).lower()]
+    rest = _parse_rest(t[m.end():])
+    if rest is None: return None
+    pred = _agree(rest, gn)
+    body = f"{name} {pred}".strip() if not pred.startswith(",") else f"{name}{pred}"
+    body = re.sub(r" a (?=ai |al |allo |all')", " ", body)   # "vicino a" + "al 4,3%"
+    if country:
+        return f"{country}: {body}{source}"
+    return body[:1].upper() + body[1:] + source
+
+# ============= API =============
+_lock = threading.Lock()
+_stats = {"template": 0, "llm": 0}
+
+def translate_headline(title: str) -> Optional[str]:
+    """Titolo IT dal template oppure None (il chiamante usa il LLM); conteggia l'esito per l'hit rate."""
+    out = _translate(title or "")
+    src = "template" if out else "llm"
+    with _lock: _stats[src] += 1
+    tr.add("headline_translations", 1, source=src)
+    return out
+
+def match_indicator(title: str) -> Optional[str]:
+    """Nome inglese dell'indicatore in testa al titolo (dopo l'eventuale paese), come nel dizionario; None se assente."""
+    t = re.sub(r"\s+", " ", (title or "").strip())
+    m = _COUNTRY_RX.match(t)
+    if m: t = t[m.end():].strip()
+    m = _IND_RX.match(t)
+    return _IND_NAMES[m.group(0).lower()] if m else None
+
+def stats() -> Dict[str, float]:
+    with _lock:
+        hit, miss = _stats["template"], _stats["llm"]
+    return {"template": hit, "llm": miss, "hit_rate": hit / (hit + miss) if hit + miss else 0.0}
+
+# casi di controllo per --check: titolo -> traduzione attesa
+_CHECKS = [
+    ("Italy Inflation Rate Lowest Since 2021", "Italia: inflazione ai minimi dal 2021"),
+    ("US Mortgage Rates Highest Since March 2020", "USA: tassi sui mutui ai massimi da marzo 2020"),
+]
+
+def check() -> int:
+    """Confronta i casi di _CHECKS con la traduzione; ritorna il numero di discrepanze."""
+    bad = [(t, want, got) for t, want in _CHECKS if (got := _translate(t)) != want]
+    for t, want, got in bad: print(f"✗ {t}\n    atteso:  {want}\n    ottenuto: {got}")
+    print(f"Check: {len(_CHECKS) - len(bad)}/{len(_CHECKS)} ok")
+    return len(bad)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Hit rate dei template sui titoli del DB")
+    ap.add_argument("--db", default=None, help="default: Config.DB_PATH")
+    ap.add_argument("--misses", type=int, default=30, help="titoli non riconosciuti da mostrare")
+    ap.add_argument("--hits", type=int, default=30, help="traduzioni da mostrare")
+    ap.add_argument("--check", action="store_true", help="verifica i casi noti (_CHECKS) ed esce")
+    args = ap.parse_args(argv)
+    if args.check:
+        return 1 if check() else 0
+    import te_macro_agent_final_multi as ag
+    conn = ag.db_connect_ro(args.db or ag.Config.DB_PATH)
+    try:
+        titles = [r[0] for r in conn.execute("SELECT DISTINCT title FROM te_items")]
+    finally:
+        conn.close()
+    res = [(t, _translate(t)) for t in titles]
+    hits = [(t, o) for t, o in res if o]
+    for t, o in hits[:args.hits]: print(f"✓ {t}\n    {o}")
+    for t, _ in [r for r in res if not r[1]][:args.misses]: print(f"✗ {t}")
+    print(f"Template: {len(hits)}/{len(res)} titoli distinti ({len(hits)/max(1, len(res)):.0%})")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,255 @@
+# te_jobs.py — esecuzione della pipeline in background (worker pool + job store condiviso)
+# - I job girano in un ThreadPoolExecutor con concorrenza configurabile (Config.JOB_CONCURRENCY)
+# - Ogni stadio pubblica progressi e risultati parziali nel JobStore (items, ES, selezione, DOCX)
+# - La UI fa polling sullo store: i rerun di Streamlit non interrompono né rieseguono il job
+# - Con Config.PROFILE / TE_PROFILE=1 la run è profilata (te_profile): file accanto al DOCX e testo hotspot nello store
+
+import json, time, uuid, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+
+QUEUED, RUNNING, DONE, ERROR, CANCELLED = "queued", "running", "done", "error", "cancelled"
+FINAL_STATES = {DONE, ERROR, CANCELLED}
+
+class JobCancelled(Exception):
+    pass
+
+@dataclass
+class Job:
+    id: str
+    owner: str
+    countries: List[str]
+    days: int
+    status: str = QUEUED
+    stage: str = "In coda"
+    progress: float = 0.0
+    error: str = ""
+    created_ts: float = field(default_factory=time.time)
+    started_ts: Optional[float] = None
+    finished_ts: Optional[float] = None
+    cancel_requested: bool = False
+    # risultati parziali: context_count, es_text, es_error, selection, docx_bytes, filename, out_path, traces
+    result: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINAL_STATES
+
+class JobStore:
+    """Store thread-safe dei job; le letture restituiscono copie per il rendering."""
+    def __init__(self, ttl_s: int = 3600):
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, Job] = {}
+        self.ttl_s = ttl_s
+
+    def create(self, owner: str, countries: List[str], days: int) -> Job:
+        job = Job(id=uuid.uuid4().hex[:12], owner=owner, countries=list(countries), days=int(days))
+        with self._lock:
+            self._evict_expired()
+            self._jobs[job.id] = job
+        return job
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None: return
+            for k, v in fields.items(): setattr(job, k, v)
+
+    def set_result(self, job_id: str, **values):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None: job.result.update(values)
+
+    def selection_copies(self, job_id: str) -> List[Dict[str, Any]]:
+        """Copie private degli item della selezione per il worker (li completa e li ripubblica con set_selection_item)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return [it.copy() for it in job.result.get("selection") or []] if job is not None else []
+
+    def set_selection_item(self, job_id: str, i: int, it: Dict[str, Any]):
+        """Pubblica l'item i completato: il worker lavora su copie private e non lo tocca più, così get() non copia
+        mai un item mentre viene scritto."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            sel = job.result.get("selection") if job is not None else None
+            if sel is not None and i < len(sel): sel[i] = it
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None: return None
+            snap = Job(**{k: getattr(job, k) for k in job.__dataclass_fields__})
+            snap.result = dict(job.result)
+            if "selection" in snap.result:
+                snap.result["selection"] = [dict(it) for it in snap.result["selection"]]
+            return snap
+
+    def list(self, owner: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            ids = [j.id for j in self._jobs.values() if owner is None or j.owner == owner]
+        return [j for j in (self.get(i) for i in ids) if j is not None]
+
+    def queue_position(self, job_id: str) -> int:
+        with self._lock:
+            queued = sorted((j for j in self._jobs.values() if j.status == QUEUED), key=lambda j: j.created_ts)
+            for i, j in enumerate(queued, 1):
+                if j.id == job_id: return i
+        return 0
+
+    def is_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return bool(job and job.cancel_requested)
+
+    def _evict_expired(self):
+        now = time.time()
+        for jid in [j.id for j in self._jobs.values()
+                    if j.finished and j.finished_ts and now - j.finished_ts > self.ttl_s]:
+            del self._jobs[jid]
+
+def build_docx(job: Job, partial: bool = False, output_dir: Optional[str] = None) -> Dict[str, Any]:
+    """DOCX in memoria dallo snapshot del job (item non ancora tradotti: testo originale); su disco solo se output_dir."""
+    ts = datetime.now().strftime("%Y%m%d_%H%M")
+    suffix = "_parziale" if partial else ""
+    filename = f"MacroAnalysis_AutoSelect_{job.days}days_{ts}{suffix}.docx"
+    res = job.result
+    data = ag.render_report_docx(res.get("es_text", ""), res.get("selection") or [], job.countries,
+                                 job.days, int(res.get("context_count", 0)))
+    out_path = ""
+    if output_dir:
+        out_path = str(Path(output_dir) / filename)
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        Path(out_path).write_bytes(data)
+    return {"filename": filename, "out_path": out_path, "docx_bytes": data}
+
+def _enrich_and_render(store: JobStore, job_id: str, cfg: "ag.Config", summarizer, stage, only_missing: bool = False):
+    stage("Traduco titoli e genero riassunti in italiano…", 0.50)
+    work = store.selection_copies(job_id)
+    total = max(1, len(work))
+    done = [sum(1 for it in work if ag.is_enriched_it(it))]
+    def _on_item(i, it):
+        if not it.get("summary_it") or len(it["summary_it"].strip()) < 30:
+            it["summary_it"] = (it.get("description","") or "")
+        store.set_selection_item(job_id, i, it)
+        done[0] += 1
+        store.update(job_id, progress=0.50 + 0.45 * done[0] / total)
+    ag.enrich_selection_it(summarizer, work, cfg, delay_s=0.4, on_item=_on_item,
+                           should_stop=lambda: store.is_cancelled(job_id),
+                           workers=cfg.ENRICH_WORKERS, only_missing=only_missing)
+
+    stage("Genero il report DOCX…", 0.95)
+    store.set_result(job_id, **build_docx(store.get(job_id), output_dir=cfg.OUTPUT_DIR if cfg.PERSIST_REPORTS else None))
+
+def _execute(store: JobStore, job_id: str, cfg: "ag.Config", body, accept_status: str = QUEUED):
+    """Esegue body(job, stage) con stato/errori/annullamento gestiti e trace della run nello store."""
+    job = store.get(job_id)
+    if job is None or job.status != accept_status:  # es. annullato mentre era in coda
+        return
+    def stage(label: str, progress: float):
+        if store.is_cancelled(job_id): raise JobCancelled()
+        store.update(job_id, stage=label, progress=progress)
+
+    store.update(job_id, status=RUNNING, started_ts=time.time())
+    from te_profile import maybe_profile
+    with tr.run("job", job_id=job_id, countries=",".join(job.countries), days=job.days) as trace, \
+            maybe_profile(cfg) as prof:
+        try:
+            body(job, stage)
+            status, label, error = DONE, "Pipeline completata.", ""
+        except JobCancelled:
+            status, label, error = CANCELLED, "Annullato.", ""
+        except Exception as e:
+            logging.exception("Job %s fallito: %s", job_id, e)
+            status, label, error = ERROR, "Errore.", str(e)
+    traces = dict(store.get(job_id).result.get("traces") or {})
+    traces[f"{len(traces)+1}"] = {"breakdown": trace.stage_breakdown(), "json": trace.to_json(), "prom": trace.to_prometheus()}
+    store.set_result(job_id, traces=traces)
+    if cfg.TRACE_EXPORT:
+        try: trace.export(str(Path(cfg.OUTPUT_DIR) / "traces"), f"job_{job_id}_{len(traces)}")
+        except Exception as e: logging.warning("Trace non salvato: %s", e)
+    if prof is not None:
+        fn = store.get(job_id).result.get("filename")
+        stem = Path(fn).stem if fn else f"job_{job_id}_{len(traces)}"
+        try:
+            paths = prof.write(cfg.OUTPUT_DIR, stem, cfg.PROFILE_TOP_N)
+        except Exception as e:
+            logging.warning("Profilo non salvato: %s", e); paths = {}
+        store.set_result(job_id, profile={"hotspots": prof.hotspots(cfg.PROFILE_TOP_N), "paths": paths,
+                                          "speedscope": json.dumps(prof.speedscope(stem)), "stem": stem})
+    fields = dict(status=status, stage=label, error=error, finished_ts=time.time())
+    if status == DONE: fields["progress"] = 1.0
+    store.update(job_id, **fields)
+
+def run_pipeline_job(store: JobStore, job_id: str, cfg: "ag.Config", prefetch=None):
+    """Pipeline completa (come main()) con progressi e risultati parziali nello store."""
+    def body(job: Job, stage):
+        stage("Carico/aggiorno notizie (DB + stream)…", 0.05)
+        # contesto/selezione già preparati dalla UI (te_prefetch) se il DB non è cambiato nel frattempo
+        pre = prefetch.take(cfg, job.countries, job.days) if prefetch is not None else None
+        items_ctx, selection = pre if pre is not None else (ag.load_context_items(cfg, job.countries), None)
+        tr.add("prefetch", 1, outcome="hit" if selection is not None else "context" if pre is not None else "miss")
+        store.set_result(job_id, context_count=len(items_ctx))
+        if not items_ctx:
+            raise RuntimeError("Nessuna notizia disponibile entro la finestra.")
+
+        stage("Genero l’Executive Summary…", 0.30)
+        summarizer = ag.MacroSummarizer(cfg.ANTHROPIC_API_KEY, cfg.MODEL, cfg.MODEL_TEMP, cfg.MAX_TOKENS)
+        try:
+            es_text = summarizer.executive_summary(items_ctx, cfg, job.countries, fallback=False)
+        except Exception as e:
+            store.set_result(job_id, es_error=str(e))
+            es_text = "Executive Summary non disponibile per errore di generazione."
+        store.set_result(job_id, es_text=es_text)
+
+        stage(f"Costruisco la selezione (ultimi {job.days} giorni)…", 0.45)
+        if selection is None:
+            selection = ag.build_selection(items_ctx, job.days, cfg, expand1_days=10, expand2_days=30)
+        # la UI vede ogni item in IT appena il worker lo ripubblica nello store (set_selection_item)
+        store.set_result(job_id, selection=list(selection))
+
+        # item già tradotti in llm_cache (lookup del prefetch): solo i mancanti vanno al modello
+        _enrich_and_render(store, job_id, cfg, summarizer, stage, only_missing=True)
+    _execute(store, job_id, cfg, body)
+
+def resume_enrichment_job(store: JobStore, job_id: str, cfg: "ag.Config"):
+    def body(job: Job, stage):
+        summarizer = ag.MacroSummarizer(cfg.ANTHROPIC_API_KEY, cfg.MODEL, cfg.MODEL_TEMP, cfg.MAX_TOKENS)
+        _enrich_and_render(store, job_id, cfg, summarizer, stage, only_missing=True)
+    _execute(store, job_id, cfg, body)
+
+class JobRunner:
+    """Coda FIFO di job con al massimo `concurrency` pipeline attive contemporaneamente."""
+    def __init__(self, concurrency: int = 2, ttl_s: int = 3600, prefetch=None):
+        self.store = JobStore(ttl_s=ttl_s)
+        self.prefetch = prefetch   # te_prefetch.PrefetchManager opzionale
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(concurrency)), thread_name_prefix="te-job")
+
+    def submit(self, cfg: "ag.Config", countries: List[str], days: int, owner: str = "") -> str:
+        job = self.store.create(owner, countries, days)
+        self._pool.submit(run_pipeline_job, self.store, job.id, cfg, self.prefetch)
+        return job.id
+
+    def cancel(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None or job.finished: return
+        if job.status == QUEUED:
+            self.store.update(job_id, cancel_requested=True, status=CANCELLED, stage="Annullato.", finished_ts=time.time())
+        else:
+            self.store.update(job_id, cancel_requested=True)
+
+    def finish_remaining(self, job_id: str, cfg: "ag.Config") -> bool:
+        """Riprende traduzioni/riassunti dei soli item mancanti (job annullato o fallito) e rigenera il DOCX."""
+        job = self.store.get(job_id)
+        if job is None or not job.finished or not job.result.get("selection"): return False
+        self.store.update(job_id, status=QUEUED, stage="In coda", cancel_requested=False, error="", finished_ts=None)
+        self._pool.submit(resume_enrichment_job, self.store, job_id, cfg)
+        return True
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
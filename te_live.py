@@ -0,0 +1,90 @@
+# te_live.py — live tail dello stream TE: le card nuove arrivano nel DB in pochi secondi, senza scroll periodici
+# - TEStreamScraper.live_tail: testa dello stream ogni LIVE_TAIL_INTERVAL_S (GET condizionale, motore HTTP)
+#   oppure una pagina aperta con MutationObserver (SCRAPE_ENGINE="browser")
+# - Solo le fingerprint nuove (mai viste dal tail e assenti da te_items) vanno al writer del processo (te_writer)
+# - Heartbeat in te_meta (live_tail_ts) dopo ogni giro riuscito se il tail copre tutti i paesi: load_context_items
+#   salta i delta scrape finché è recente
+# - Notizie rosse (importanza 3): log e, se richiesto, comando esterno con l'item in JSON su stdin
+# Uso:
+#   python te_live.py [--interval 15] [--engine http|browser] [--countries "Italy,Germany"]
+#                     [--on-red-cmd "python notify.py"] [--max-polls N]
+
+import argparse, json, logging, signal, subprocess, threading, time
+from typing import List, Dict, Optional, Any, Callable, Set
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+
+def run_live_tail(cfg: "ag.Config", countries: Optional[List[str]] = None,
+                  on_red: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  should_stop: Optional[Callable[[], bool]] = None, max_polls: Optional[int] = None,
+                  scraper=None) -> Dict[str, int]:
+    """Tail fino a should_stop()/max_polls; ritorna le statistiche del tail (giri, card, nuove, rosse)."""
+    from te_writer import get_writer
+    if scraper is None:
+        from te_scraper import TEStreamScraper
+        scraper = TEStreamScraper(cfg)
+    writer = get_writer(cfg.DB_PATH)
+    conn = ag.db_connect_ro(cfg.DB_PATH)
+
+    def known(keys: List[str]) -> Set[str]:
+        out: Set[str] = set()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i+500]
+            out.update(r[0] for r in conn.execute(
+                f"SELECT key FROM te_items WHERE key IN ({','.join('?'*len(chunk))})", chunk))
+        return out
+
+    def on_poll(stats: Dict[str, Any]):
+        # heartbeat solo se lo stream è coperto per intero e il giro l'ha letto davvero (304 compreso):
+        # con la rete giù load_context_items deve tornare ai delta scrape
+        if countries is None and stats.get("ok"):
+            writer.submit_meta(live_tail_ts=int(time.time()))
+
+    try:
+        with tr.run("live_tail", countries=",".join(countries or []) or "all"):
+            return scraper.live_tail(lambda items: writer.upsert(items), countries=countries, on_red=on_red,
+                                     known=known, on_poll=on_poll, should_stop=should_stop, max_polls=max_polls)
+    finally:
+        conn.close()
+
+def _red_command(cmd: str) -> Callable[[Dict[str, Any]], None]:
+    def _run(it: Dict[str, Any]):
+        try:
+            subprocess.run(cmd, shell=True, input=json.dumps(dict(it), ensure_ascii=False), text=True, timeout=30)
+        except Exception as e:
+            logging.warning("Comando notizia rossa fallito: %s", e)
+    return _run
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Live tail dello stream TradingEconomics nel DB")
+    ap.add_argument("--interval", type=float, default=None, help="secondi fra due giri (default LIVE_TAIL_INTERVAL_S)")
+    ap.add_argument("--engine", choices=["http", "browser"], default="")
+    ap.add_argument("--countries", default="", help="solo questi paesi (niente heartbeat per load_context_items)")
+    ap.add_argument("--on-red-cmd", default="", help="comando per ogni notizia rossa nuova (item JSON su stdin)")
+    ap.add_argument("--max-polls", type=int, default=None)
+    args = ap.parse_args(argv)
+    ag.setup_logging(logging.INFO)
+    cfg = ag.Config()
+    if args.interval is not None: cfg.LIVE_TAIL_INTERVAL_S = args.interval
+    if args.engine: cfg.SCRAPE_ENGINE = args.engine
+    countries = [ag.normalize_country(c.strip()) for c in args.countries.split(",") if c.strip()] or None
+    cmd = _red_command(args.on_red_cmd) if args.on_red_cmd else None
+
+    def on_red(it: Dict[str, Any]):
+        logging.warning("🔴 %s — %s (%s)", it.get("country", ""), it.get("title", ""), it.get("time", ""))
+        if cmd is not None: cmd(it)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    logging.info("Live tail su %s ogni %.0fs (%s)", ", ".join(countries) if countries else "tutti i paesi",
+                 cfg.LIVE_TAIL_INTERVAL_S, cfg.SCRAPE_ENGINE)
+    try:
+        stats = run_live_tail(cfg, countries, on_red=on_red, should_stop=stop.is_set, max_polls=args.max_polls)
+    except KeyboardInterrupt:
+        stop.set(); stats = {}
+    print(f"Live tail terminato: {stats}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,24 +5,52 @@
 # fill-up a MIN_TARGET=12 (prima ≤N giorni, poi estendi a N+10 e fino a 30 giorni dal DB),
 # ordinamento finale Colore ↓, Score ↓, Recency ↑.
 # DB/Delta Mode (SQLite) con prune 60gg. Navigazione TE robusta (www + retry) e scroll via window.scrollBy.
+# Avvio rapido: scraper (te_scraper), client LLM (te_summarizer) e report (te_report) caricati su richiesta.
 
-import os, re, time, logging, unicodedata, sqlite3, hashlib
+import os, re, sys, time, logging, unicodedata, sqlite3, hashlib, threading, contextvars
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from difflib import SequenceMatcher
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 
-from dotenv import load_dotenv
-from dateutil import parser as dtparser
-from playwright.sync_api import sync_playwright
-from docx import Document
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+import te_trace as tr
 
 # ============= Setup & Config =============
 script_dir = Path(__file__).parent.absolute()
 env_path = script_dir / ".env"
-load_dotenv(env_path)
+_env_loaded = False
+
+def load_env():
+    """Carica .env una sola volta (al primo Config(), non all'import)."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(env_path)
+        _env_loaded = True
+
+# Menu paesi (costante: la UI lo legge senza istanziare Config)
+DEFAULT_COUNTRIES_MENU = [
+    "United States", "Euro Area", "Germany", "United Kingdom",
+    "Italy", "France", "China", "Japan", "Spain", "Netherlands", "European Union"
+]
+
+# Nomi definiti nei moduli caricati su richiesta (ag.TEStreamScraper, ag.MacroSummarizer, ...)
+_LAZY_MODULES = {
+    "te_scraper": ("TEStreamScraper", "USER_AGENT", "IMPORTANCE_MARKERS", "BLOCKED_URL_PARTS",
+                   "SCROLL_DRIVER_JS", "EXTRACT_FILTERED_JS", "_extract_cards_html", "_extract_cards_json"),
+    "te_summarizer": ("MacroSummarizer", "LLM_PRICES_USD_PER_MTOK", "_record_usage"),
+}
+_LAZY_ATTRS = {name: mod for mod, names in _LAZY_MODULES.items() for name in names}
+
+def __getattr__(name: str):
+    mod = _LAZY_ATTRS.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(mod), name)
 
 def setup_logging(level=logging.INFO):
     logging.basicConfig(level=level,
@@ -44,6 +72,13 @@ class Config:
     MODEL: str = "claude-3-haiku-20240307"
     MODEL_TEMP: float = 0.2
     MAX_TOKENS: int = 1500
+    # per task (es / summary / translate): modello, timeout della chiamata, budget p95 (SLO)
+    LLM_TASK_MODELS: Dict[str, str] = field(default_factory=dict)             # assente: MODEL
+    LLM_TASK_TIMEOUT_S: Dict[str, float] = field(default_factory=lambda: {"es": 120.0, "summary": 45.0, "translate": 20.0})
+    LLM_SLO_P95_S: Dict[str, float] = field(default_factory=lambda: {"es": 40.0, "summary": 10.0, "translate": 4.0})
+    LLM_HEDGE: bool = True                      # oltre il p95 del task parte una copia della richiesta, vince la prima risposta
+    LLM_HEDGE_MODELS: Dict[str, str] = field(default_factory=dict)            # modello della copia (assente: lo stesso)
+    LLM_HEDGE_MIN_SAMPLES: int = 20             # latenze osservate prima di usarne il p95 (prima: LLM_SLO_P95_S)
 
     # Limiti testo
     SUMMARY_WORDS: int = 100
@@ -52,25 +87,74 @@ class Config:
 
     # TradingEconomics
     BASE_URL: str = "https://www.tradingeconomics.com/stream?i=economy"
+    SCRAPE_ENGINE: str = "auto"                 # auto (HTTP, Playwright se vuoto) | http | browser
+    STREAM_PAGE_PATH: str = "/ws/stream.ashx"   # endpoint chiamato dal bottone "More"
+    HTTP_PAGE_SIZE: int = 20
+    HTTP_MAX_PAGES: int = 100
+    HTTP_TIMEOUT: float = 20.0
+    SCROLL_MAX_ITER: int = 100                  # motore browser: tetto di iterazioni scroll/"More"
+    SCROLL_BUDGET_S: float = 60.0               # tetto di tempo del controller di scroll (retry: un sesto)
+    SCROLL_IDLE_MS: int = 250                   # rete ferma da tanto senza card nuove = niente in arrivo
+    SCROLL_WAIT_MAX_MS: int = 3000              # attesa massima di un segnale (card, risposta "More", rete ferma)
+    LIVE_TAIL_INTERVAL_S: float = 15.0          # live tail (te_live.py): intervallo fra due giri sulla testa dello stream
+    LIVE_TAIL_MAX_PAGES: int = 5                # pagine "More" seguite in un giro se sono tutte nuove (raffiche)
+    LIVE_TAIL_RELOAD_S: float = 300.0           # motore browser: reload della pagina (il MutationObserver viene reinstallato)
 
     # Menu paesi
-    DEFAULT_COUNTRIES_MENU: List[str] = field(default_factory=lambda: [
-        "United States", "Euro Area", "Germany", "United Kingdom",
-        "Italy", "France", "China", "Japan", "Spain", "Netherlands", "European Union"
-    ])
+    DEFAULT_COUNTRIES_MENU: List[str] = field(default_factory=lambda: list(DEFAULT_COUNTRIES_MENU))
 
     # Finestra ES
     CONTEXT_DAYS: int = 60  # <– esteso a 60 giorni
 
+    # ---- Archivio catture grezze (ri-estrazione offline con te_archive.py) ----
+    ARCHIVE_RAW: bool = False                   # salva le card grezze di ogni scrape (JSONL compresso, per giorno)
+    ARCHIVE_HTML: bool = False                  # motore HTTP: salva anche l'HTML delle pagine
+    ARCHIVE_DIR: str = str(script_dir / "archive")
+    ARCHIVE_CODEC: str = "gzip"                 # gzip | zstd (se è installato zstandard)
+
     # ---- Delta Mode / DB ----
     DELTA_MODE: bool = True
     SCRAPE_HORIZON_DAYS: int = 7                # scraping ridotto per paesi già "caldi"
     WARMUP_NEW_COUNTRY_MIN: int = 40            # soglia elementi in DB per considerare "caldo"
     DB_PATH: str = str(script_dir / "news_cache.sqlite")
     PRUNE_DAYS: int = 60                        # <– prune DB a 60 giorni
-    
+    LAZY_DESCRIPTIONS: bool = True              # contesto senza descrizioni: lette per chiave solo dove servono
+    SINGLE_WRITER: bool = True                  # scritture via te_writer (un thread per processo), letture read-only
+    COLD_STORAGE: bool = True                   # prune: righe scadute archiviate in Parquet (te_cold) invece di eliminate
+    COLD_DIR: str = str(script_dir / "cold")    # partizioni day=YYYY-MM-DD; CONTEXT_DAYS > PRUNE_DAYS le rilegge
+    SCRAPE_FRESH_S: int = 180                   # paesi caldi visti da uno scrape più recente di così: niente delta scrape
+
+    # ---- Job in background (UI) ----
+    JOB_CONCURRENCY: int = 2                    # pipeline eseguite in parallelo (le altre restano in coda)
+    JOB_TTL_S: int = 3600                       # job conclusi tenuti in memoria per il download
+    ENRICH_WORKERS: int = 3                     # traduzioni/riassunti IT in parallelo (ordine di completamento)
+    HEADLINE_TEMPLATES: bool = True             # titoli "a formula" tradotti in locale (te_headlines), LLM solo per gli altri
+    ES_INPUT_MODE: str = "text"                 # text = titolo+descrizione per item | table = tabella valori per paese (te_numeric)
+    LLM_BATCH_POLL_S: float = 15.0              # Message Batches (te_batch --message-batch): intervallo di polling
+    LLM_BATCH_TIMEOUT_S: float = 6 * 3600       # oltre: batch annullata, il resto con chiamate dirette
+    PERSIST_REPORTS: bool = True                # UI: salva anche su OUTPUT_DIR (il DOCX resta comunque in memoria)
+    PREFETCH: bool = True                       # UI: contesto/selezione preparati in background al cambio dei paesi
+    PREFETCH_DEBOUNCE_S: float = 1.5            # attesa dopo l'ultimo click prima di partire
+    PREFETCH_CONCURRENCY: int = 1               # prefetch attivi nel processo (gli altri attendono, annullabili)
+    PREFETCH_TTL_S: int = 300                   # prefetch riusabile dal job entro questo tempo (e se il DB non è cambiato)
+
+    # ---- Servizio HTTP (te_service.py) ----
+    SERVICE_HOST: str = "127.0.0.1"
+    SERVICE_PORT: int = 8080
+    SERVICE_WORKERS: int = 4                    # stadi CPU/DB (selezione, letture) in parallelo
+    SERVICE_MAX_PENDING: int = 64               # calcoli in corso oltre cui si risponde 503 (la cache risponde sempre)
+    SERVICE_CACHE_ENTRIES: int = 128            # risposte del fast path in cache (LRU, invalidate dalla firma del DB)
+
+    # ---- Strumentazione ----
+    TRACE_EXPORT: bool = True                   # trace JSON + snapshot Prometheus per ogni run in OUTPUT_DIR/traces
+    PROFILE: bool = False                       # profilo della run (te_profile; anche TE_PROFILE=1 o --profile):
+                                                # speedscope + hotspot per stage accanto al DOCX in OUTPUT_DIR
+    PROFILE_INTERVAL_MS: int = 10               # intervallo del campionatore
+    PROFILE_TOP_N: int = 30                     # righe delle tabelle hotspot
+
     def __post_init__(self):
         # Ricarica la chiave dopo l'inizializzazione
+        load_env()
         if not self.ANTHROPIC_API_KEY:
             self.ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
             if not self.ANTHROPIC_API_KEY:
@@ -79,7 +163,7 @@ class Config:
 # ============= Utilità tempo/recency =============
 REL_RX = re.compile(r"\b(\d+)\s*(minute|hour|day|week|month)s?\s+ago\b", re.I)
 
-def parse_age_days_from_text(time_text: str) -> Optional[float]:
+def parse_age_days_from_text(time_text: str, now: Optional[datetime] = None) -> Optional[float]:
     if not time_text: return None
     m = REL_RX.search(time_text or "")
     if m:
@@ -90,8 +174,9 @@ def parse_age_days_from_text(time_text: str) -> Optional[float]:
         if unit.startswith("week"):   return float(q)*7.0
         if unit.startswith("month"):  return 30.0
     try:
+        from dateutil import parser as dtparser
         dt = dtparser.parse(time_text, fuzzy=True)
-        delta = datetime.now() - dt
+        delta = (now or datetime.now()) - dt
         return max(0.0, delta.total_seconds()/86400.0)
     except Exception:
         return None
@@ -124,12 +209,196 @@ def _norm_for_fp(s: str) -> str:
     return re.sub(r"\s+", " ", s).strip()
 
 def _fp(it: dict) -> str:
+    if type(it) is NewsItem:
+        return it.fp
     base = f"{it.get('country','')}|{_norm_for_fp(it.get('title',''))}|{_norm_for_fp((it.get('description') or '')[:200])}"
     return hashlib.sha1(base.encode("utf-8","ignore")).hexdigest()
 
+# ============= NewsItem (record compatto della pipeline) =============
+_UNSET = object()
+
+class NewsItem(MutableMapping):
+    """
+    Item con __slots__ e vista dict-compatibile (it["title"], it.get(), "summary_it" in it, dict(it), update).
+    Paese/categorie/tempo internati; titolo normalizzato (dedup) e fingerprint calcolati una volta e invalidati
+    se cambiano paese/titolo/descrizione. Il testo "titolo descrizione" non è trattenuto (raddoppierebbe le
+    descrizioni in memoria): _enrich_items lo costruisce una volta per item. Chiavi non previste in un dict a parte.
+    Descrizione lazy: letta da DB (DescriptionSource, per chiave) al primo accesso se l'item è stato caricato
+    senza; fill_descriptions/iter_descriptions la leggono a blocchi.
+    Classificazione salvata in te_items (categoria, topic, risultato) in _dcols, fuori dalla vista dict:
+    _enrich_items la riusa invece di ripassare i regex sul testo.
+    """
+    FIELDS = ("country", "title", "description", "time", "importance", "category_raw", "age_days",
+              "category_mapped", "score", "is_preview", "is_result", "topic_sig", "pce_headline", "pce_core",
+              "day_bucket", "merged_from", "title_it", "summary_it")
+    __slots__ = FIELDS + ("_extra", "_norm_title", "_fpv", "_key", "_src", "_dcols")
+    _FIELD_SET = frozenset(FIELDS)
+    _INTERNED = frozenset(("country", "time", "category_raw", "category_mapped", "topic_sig"))
+    _TEXT_KEYS = frozenset(("country", "title", "description"))
+
+    def __init__(self, data=None, **kw):
+        self._extra = self._norm_title = self._fpv = self._key = self._src = self._dcols = None
+        for src in (data, kw):
+            if src:
+                for k, v in (src.items() if hasattr(src, "items") else src):
+                    self[k] = v
+
+    # ---- vista mapping ----
+    def _load_description(self) -> str:
+        d = self.description = self._src.load(self._key)
+        return d
+
+    def __getitem__(self, k):
+        if k in self._FIELD_SET:
+            try: return getattr(self, k)
+            except AttributeError:
+                if k == "description" and self._src is not None: return self._load_description()
+                raise KeyError(k) from None
+        if self._extra is None: raise KeyError(k)
+        return self._extra[k]
+
+    def __setitem__(self, k, v):
+        if k in self._FIELD_SET:
+            if k in self._INTERNED and type(v) is str: v = sys.intern(v)
+            setattr(self, k, v)
+            if k in self._TEXT_KEYS: self._norm_title = self._fpv = self._dcols = None
+        else:
+            if self._extra is None: self._extra = {}
+            self._extra[k] = v
+
+    def __delitem__(self, k):
+        if k in self._FIELD_SET:
+            try: delattr(self, k)
+            except AttributeError: raise KeyError(k) from None
+            if k in self._TEXT_KEYS: self._norm_title = self._fpv = self._dcols = None
+        elif self._extra is not None and k in self._extra:
+            del self._extra[k]
+        else:
+            raise KeyError(k)
+
+    def _has(self, k: str) -> bool:
+        return hasattr(self, k) or (k == "description" and self._src is not None)
+
+    def __iter__(self):
+        for k in self.FIELDS:
+            if self._has(k): yield k
+        if self._extra: yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for k in self.FIELDS if self._has(k)) + len(self._extra or ())
+
+    def __contains__(self, k) -> bool:
+        if k in self._FIELD_SET: return self._has(k)
+        return bool(self._extra) and k in self._extra
+
+    def get(self, k, default=None):
+        if k in self._FIELD_SET:
+            v = getattr(self, k, _UNSET)
+            if v is _UNSET:
+                return self._load_description() if k == "description" and self._src is not None else default
+            return v
+        return self._extra.get(k, default) if self._extra else default
+
+    def copy(self) -> "NewsItem":
+        new = NewsItem.__new__(NewsItem)
+        for k in self.__slots__:
+            v = getattr(self, k, self)
+            if v is not self: setattr(new, k, v)
+        new._extra = dict(self._extra) if self._extra else None
+        return new
+
+    def __repr__(self) -> str:
+        return f"NewsItem({dict(self)!r})"
+
+    # ---- derivati in cache ----
+    @property
+    def norm_title(self) -> str:
+        t = self._norm_title
+        if t is None:
+            t = self._norm_title = _norm_for_fp(self.get("title", ""))
+        return t
+
+    @property
+    def key(self) -> str:
+        """Chiave di te_items: quella letta dal DB/archivio se presente, altrimenti il fingerprint."""
+        return self._key or self.fp
+
+    @property
+    def fp(self) -> str:
+        f = self._fpv
+        if f is None:
+            base = f"{self.get('country','')}|{self.norm_title}|{_norm_for_fp((self.get('description') or '')[:200])}"
+            f = self._fpv = hashlib.sha1(base.encode("utf-8","ignore")).hexdigest()
+        return f
+
+class DescriptionSource:
+    """Descrizioni di te_items per chiave, da una connessione read-only per thread (item caricati senza)."""
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = db_connect_ro(self.db_path)
+        return conn
+
+    def fetch(self, keys: List[str], chunk: int = 500) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        conn = self._conn()
+        for i in range(0, len(keys), chunk):
+            part = keys[i:i+chunk]
+            qs = ",".join("?" * len(part))
+            out.update((k, d or "") for k, d in conn.execute(f"SELECT key,description FROM te_items WHERE key IN ({qs})", part))
+        tr.add("db_descriptions_loaded", len(out))
+        return out
+
+    def load(self, key: str) -> str:
+        return self.fetch([key]).get(key, "")
+
+def _pending_descriptions(items) -> Dict[DescriptionSource, List[NewsItem]]:
+    by_src: Dict[DescriptionSource, List[NewsItem]] = {}
+    for it in items:
+        if type(it) is NewsItem and it._src is not None and not hasattr(it, "description"):
+            by_src.setdefault(it._src, []).append(it)
+    return by_src
+
+def fill_descriptions(items, chunk: int = 500) -> int:
+    """Carica a blocchi (query IN per chiave) le descrizioni mancanti e le assegna agli item."""
+    n = 0
+    for src, todo in _pending_descriptions(items).items():
+        for i in range(0, len(todo), chunk):
+            part = todo[i:i+chunk]
+            got = src.fetch([it._key for it in part], chunk)
+            for it in part:
+                it.description = got.get(it._key, "")
+            n += len(part)
+    return n
+
+def iter_descriptions(items, chunk: int = 500):
+    """(item, descrizione) senza trattenerla sugli item lazy: letture a blocchi, memoria limitata al blocco."""
+    items = list(items)
+    for i in range(0, len(items), chunk):
+        part = items[i:i+chunk]
+        got: Dict[str, str] = {}
+        for src, todo in _pending_descriptions(part).items():
+            got.update(src.fetch([it._key for it in todo], chunk))
+        for it in part:
+            d = getattr(it, "description", _UNSET) if type(it) is NewsItem else it.get("description", "")
+            yield it, (got.get(it._key, "") if d is _UNSET else d)
+
+def _item_text(it: Dict[str, Any]) -> str:
+    return f"{it.get('title','')} {it.get('description','')}"
+
+def _item_norm_title(it: Dict[str, Any]) -> str:
+    return it.norm_title if type(it) is NewsItem else _norm_text(it.get("title",""))
+
 def db_init(path: str):
-    conn = sqlite3.connect(path)
+    conn = sqlite3.connect(path, timeout=30.0)
     cur = conn.cursor()
+    # WAL: i lettori (UI, te_service) non bloccano lo scrittore e viceversa
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA recursive_triggers=ON")   # anche le righe sostituite da INSERT OR REPLACE aggiornano i rollup
     cur.execute("""
         CREATE TABLE IF NOT EXISTS te_items (
             key TEXT PRIMARY KEY,
@@ -139,257 +408,455 @@ def db_init(path: str):
         )
     """)
     cur.execute("CREATE INDEX IF NOT EXISTS idx_country_seen ON te_items(country, last_seen_ts)")
+    cur.execute("CREATE TABLE IF NOT EXISTS te_meta (k TEXT PRIMARY KEY, v INTEGER)")
+    _db_migrate_rollups(conn)
+    _db_migrate_values(conn)
+    cur.execute(_LLM_CACHE_DDL)
     conn.commit()
     return conn
 
-def db_upsert(conn, items: list):
+# ---- Rollup (aggiornati da trigger nella stessa transazione di upsert/prune) ----
+# te_rollup: conteggi per paese × giorno (di first_seen) × categoria × importanza × risultato
+# te_latest: ultimo item "risultato" per paese × topic_sig (first_seen più recente, a parità la chiave maggiore)
+DERIVED_COLUMNS = ("category_mapped", "topic_sig", "is_result")
+_DAY_SQL = "date({}.first_seen_ts,'unixepoch','localtime')"
+_ROLLUP_DEC = """
+    UPDATE te_rollup SET n=n-1 WHERE country IS old.country AND day={d} AND category IS old.category_mapped
+      AND importance IS old.importance AND is_result IS old.is_result;
+    DELETE FROM te_rollup WHERE n<=0 AND country IS old.country AND day={d};
+""".format(d=_DAY_SQL.format("old"))
+# nei trigger niente OR IGNORE/ON CONFLICT: la politica di conflitto dello statement esterno (upsert, REPLACE)
+# prevarrebbe su quella interna; inserimenti solo se la riga manca (NOT EXISTS)
+_ROLLUP_INC = """
+    INSERT INTO te_rollup(country,day,category,importance,is_result,n)
+      SELECT new.country,{d},new.category_mapped,new.importance,new.is_result,0
+      WHERE NOT EXISTS (SELECT 1 FROM te_rollup WHERE country IS new.country AND day={d}
+        AND category IS new.category_mapped AND importance IS new.importance AND is_result IS new.is_result);
+    UPDATE te_rollup SET n=n+1 WHERE country IS new.country AND day={d} AND category IS new.category_mapped
+      AND importance IS new.importance AND is_result IS new.is_result;
+""".format(d=_DAY_SQL.format("new"))
+_LATEST_RECOMPUTE = """
+    DELETE FROM te_latest WHERE country IS old.country AND topic_sig IS old.topic_sig AND key=old.key;
+    INSERT INTO te_latest(country,topic_sig,key,category,title,seen_ts)
+      SELECT country,topic_sig,key,category_mapped,title,first_seen_ts FROM te_items
+      WHERE old.is_result=1 AND country IS old.country AND topic_sig IS old.topic_sig AND is_result=1
+        AND NOT EXISTS (SELECT 1 FROM te_latest WHERE country IS old.country AND topic_sig IS old.topic_sig)
+      ORDER BY first_seen_ts DESC, key DESC LIMIT 1;
+"""
+_ROLLUP_DDL = (
+    """CREATE TABLE IF NOT EXISTS te_rollup (
+        country TEXT, day TEXT, category TEXT, importance INTEGER, is_result INTEGER, n INTEGER,
+        PRIMARY KEY (country, day, category, importance, is_result)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS te_latest (
+        country TEXT, topic_sig TEXT, key TEXT, category TEXT, title TEXT, seen_ts REAL,
+        PRIMARY KEY (country, topic_sig)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_result_topic ON te_items(country, topic_sig, first_seen_ts) WHERE is_result=1",
+    f"""CREATE TRIGGER IF NOT EXISTS te_items_rollup_ins AFTER INSERT ON te_items BEGIN
+        {_ROLLUP_INC}
+        DELETE FROM te_latest WHERE new.is_result=1 AND country IS new.country AND topic_sig IS new.topic_sig
+          AND (seen_ts, key) < (new.first_seen_ts, new.key);
+        INSERT INTO te_latest(country,topic_sig,key,category,title,seen_ts)
+          SELECT new.country,new.topic_sig,new.key,new.category_mapped,new.title,new.first_seen_ts WHERE new.is_result=1
+          AND NOT EXISTS (SELECT 1 FROM te_latest WHERE country IS new.country AND topic_sig IS new.topic_sig);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS te_items_rollup_upd AFTER UPDATE OF importance, first_seen_ts ON te_items
+      WHEN old.importance IS NOT new.importance OR old.first_seen_ts IS NOT new.first_seen_ts BEGIN
+        {_ROLLUP_DEC}{_ROLLUP_INC}{_LATEST_RECOMPUTE}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS te_items_rollup_del AFTER DELETE ON te_items BEGIN
+        {_ROLLUP_DEC}{_LATEST_RECOMPUTE}
+    END""",
+)
+
+def _derive_columns(it: Dict[str, Any], t: Optional[str] = None) -> tuple:
+    """Colonne derivate di te_items (stabili per chiave: titolo/descrizione non cambiano negli upsert)."""
+    if type(it) is NewsItem and it._dcols is not None: return it._dcols
+    t = _item_text(it) if t is None else t
+    return detect_category_from_text(t), _topic_signature(it, t), int(_is_result_data(it, t))
+
+ROLLUP_SCHEMA = 2   # versione di tabelle/trigger dei rollup: se cambia, trigger ricreati e rollup ricostruiti
+
+def _db_migrate_rollups(conn):
+    """Colonne derivate + tabelle/trigger di rollup; DB esistenti: backfill e ricostruzione una tantum."""
+    have = {r[1] for r in conn.execute("PRAGMA table_info(te_items)")}
+    for c, typ in zip(DERIVED_COLUMNS, ("TEXT", "TEXT", "INTEGER")):
+        if c not in have: conn.execute(f"ALTER TABLE te_items ADD COLUMN {c} {typ}")
+    r = conn.execute("SELECT v FROM te_meta WHERE k='rollup_schema'").fetchone()
+    if r and r[0] == ROLLUP_SCHEMA and set(DERIVED_COLUMNS) <= have: return
+    with tr.span("db.migrate_rollups") as sp:
+        rows = conn.execute("SELECT key,title,description FROM te_items WHERE category_mapped IS NULL").fetchall()
+        conn.executemany("UPDATE te_items SET category_mapped=?, topic_sig=?, is_result=? WHERE key=?",
+                         [(*_derive_columns({"title": t or "", "description": d or ""}), k) for k, t, d in rows])
+        for name in ("te_items_rollup_ins", "te_items_rollup_upd", "te_items_rollup_del"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for ddl in _ROLLUP_DDL: conn.execute(ddl)
+        db_rollup_rebuild(conn, commit=False)
+        conn.execute("INSERT OR REPLACE INTO te_meta(k,v) VALUES ('rollup_schema',?)", (ROLLUP_SCHEMA,))
+        sp.set(rows_backfilled=len(rows))
+
+# ---- Valori estratti (te_numeric) per item: attuale/precedente/consenso, chiave = fingerprint di te_items ----
+VALUES_SCHEMA = 1
+_VALUES_COLUMNS = ("indicator", "period", "basis", "actual", "change", "change_unit", "previous", "consensus", "unit",
+                   "direction")
+_VALUES_DDL = (
+    """CREATE TABLE IF NOT EXISTS te_values (
+        key TEXT PRIMARY KEY, country TEXT, indicator TEXT, period TEXT, basis TEXT,
+        actual REAL, change REAL, change_unit TEXT, previous REAL, consensus REAL, unit TEXT, direction INTEGER,
+        seen_ts REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_values_ind ON te_values(indicator, basis, country, seen_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_values_country ON te_values(country, seen_ts)",
+    """CREATE TRIGGER IF NOT EXISTS te_items_values_del AFTER DELETE ON te_items BEGIN
+        DELETE FROM te_values WHERE key=old.key;
+    END""",
+)
+
+def _values_rows(rows) -> List[tuple]:
+    """(key, country, title, description, seen_ts) -> righe di te_values (solo gli item con un dato riconosciuto)."""
+    from te_numeric import extract_values
+    out = []
+    for k, country, title, desc, ts in rows:
+        v = extract_values(title or "", desc or "") if desc else None
+        if v: out.append((k, country, *(v[c] for c in _VALUES_COLUMNS), ts))
+    return out
+
+def _values_insert(conn, rows: List[tuple]):
+    conn.executemany(f"INSERT OR REPLACE INTO te_values(key,country,{','.join(_VALUES_COLUMNS)},seen_ts) "
+                     f"VALUES ({','.join('?' * (len(_VALUES_COLUMNS) + 3))})", rows)
+
+def _db_migrate_values(conn):
+    """Tabella te_values + trigger di cancellazione; DB esistenti: estrazione una tantum da te_items."""
+    r = conn.execute("SELECT v FROM te_meta WHERE k='values_schema'").fetchone()
+    if r and r[0] == VALUES_SCHEMA: return
+    with tr.span("db.migrate_values") as sp:
+        conn.execute("DROP TABLE IF EXISTS te_values")
+        conn.execute("DROP TRIGGER IF EXISTS te_items_values_del")
+        for ddl in _VALUES_DDL: conn.execute(ddl)
+        rows = _values_rows(conn.execute("SELECT key,country,title,description,first_seen_ts FROM te_items"))
+        _values_insert(conn, rows)
+        conn.execute("INSERT OR REPLACE INTO te_meta(k,v) VALUES ('values_schema',?)", (VALUES_SCHEMA,))
+        sp.set(rows_extracted=len(rows))
+
+def db_latest_values(conn, countries: Optional[list] = None, indicator: Optional[str] = None,
+                     basis: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Ultimo valore per paese × indicatore × base (es. "Inflation Rate", "yoy": ultimo CPI annuo per paese)."""
+    where, args = [], []
+    if countries:
+        where.append(f"country IN ({','.join('?' * len(countries))})"); args += list(countries)
+    if indicator:
+        where.append("indicator=?"); args.append(indicator)
+    if basis is not None:
+        where.append("basis=?"); args.append(basis)
+    cols = ("country", *_VALUES_COLUMNS, "seen_ts")
+    with tr.span("db.latest_values") as sp:
+        rows = conn.execute(f"""SELECT {','.join(cols)} FROM (
+              SELECT *, ROW_NUMBER() OVER (PARTITION BY country,indicator,basis ORDER BY seen_ts DESC, key DESC) AS rn
+              FROM te_values {'WHERE ' + ' AND '.join(where) if where else ''}) WHERE rn=1
+            ORDER BY country, indicator, basis""", args).fetchall()
+        sp.set(rows=len(rows))
     now = time.time()
-    cur = conn.cursor()
-    for it in items:
-        k = _fp(it)
-        cur.execute("""
-            INSERT INTO te_items(key,country,title,description,time_text,importance,category_raw,first_seen_ts,last_seen_ts)
-            VALUES (?,?,?,?,?,?,?, ?, ?)
+    out = []
+    for r in rows:
+        d = dict(zip(cols, r))
+        d["age_days"] = (now - d.pop("seen_ts")) / 86400.0
+        out.append(d)
+    return out
+
+def db_rollup_rebuild(conn, commit: bool = True):
+    """Ricostruisce te_rollup/te_latest da te_items (migrazione o riparazione)."""
+    conn.execute("DELETE FROM te_rollup")
+    conn.execute(f"""INSERT INTO te_rollup(country,day,category,importance,is_result,n)
+        SELECT country,{_DAY_SQL.format('te_items')},category_mapped,importance,is_result,COUNT(*) FROM te_items
+        GROUP BY 1,2,3,4,5""")
+    conn.execute("DELETE FROM te_latest")
+    conn.execute("""INSERT INTO te_latest(country,topic_sig,key,category,title,seen_ts)
+        SELECT country,topic_sig,key,category_mapped,title,first_seen_ts FROM (
+          SELECT *, ROW_NUMBER() OVER (PARTITION BY country,topic_sig ORDER BY first_seen_ts DESC, key DESC) AS rn
+          FROM te_items WHERE is_result=1) WHERE rn=1""")
+    if commit: conn.commit()
+
+def _bump_data_version(cur):
+    cur.execute("INSERT INTO te_meta(k,v) VALUES ('data_version',1) ON CONFLICT(k) DO UPDATE SET v=v+1")
+
+def db_data_version(conn) -> int:
+    """Contatore delle scritture (upsert/prune) committate: chiave di validità per cache e lettori."""
+    try:
+        r = conn.execute("SELECT v FROM te_meta WHERE k='data_version'").fetchone()
+    except sqlite3.OperationalError:   # DB non ancora inizializzato
+        return 0
+    return int(r[0]) if r else 0
+
+def db_get_meta(conn, key: str, default: int = 0) -> int:
+    try:
+        r = conn.execute("SELECT v FROM te_meta WHERE k=?", (key,)).fetchone()
+    except sqlite3.OperationalError:
+        return default
+    return int(r[0]) if r and r[0] is not None else default
+
+# ---- Cache LLM di te_batch (titolo/riassunto IT per fingerprint + modello), letta anche dal prefetch ----
+_LLM_CACHE_DDL = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT, model TEXT, title_it TEXT, summary_it TEXT, created_ts REAL,
+        PRIMARY KEY (key, model)
+    )
+"""
+
+def llm_cache_model(cfg: "Config") -> str:
+    """Chiave "modello" di llm_cache: modello dei riassunti, più quello delle traduzioni se diverso."""
+    summary = cfg.LLM_TASK_MODELS.get("summary") or cfg.MODEL
+    translate = cfg.LLM_TASK_MODELS.get("translate") or cfg.MODEL
+    return summary if translate == summary else f"{summary}|{translate}"
+
+def db_llm_cache_put(conn, rows: List[tuple], commit: bool = True):
+    """Righe (key, model, title_it, summary_it, created_ts) in llm_cache."""
+    conn.executemany("INSERT OR REPLACE INTO llm_cache(key,model,title_it,summary_it,created_ts) VALUES (?,?,?,?,?)", rows)
+    if commit: conn.commit()
+
+def db_llm_cache_prune(conn, max_age_days: int, commit: bool = True):
+    conn.execute("DELETE FROM llm_cache WHERE created_ts < ?", (time.time() - max_age_days * 86400,))
+    if commit: conn.commit()
+
+def db_set_meta(conn, key: str, value: int, commit: bool = True):
+    """Valore in te_meta (es. heartbeat del live tail); non tocca data_version."""
+    conn.execute("INSERT INTO te_meta(k,v) VALUES (?,?) ON CONFLICT(k) DO UPDATE SET v=excluded.v", (key, int(value)))
+    if commit: conn.commit()
+
+def db_connect_ro(path: str, check_same_thread: bool = True):
+    """Connessione in sola lettura (nessun CREATE/lock di scrittura): per i lettori concorrenti."""
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=30.0, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA query_only=1")
+    return conn
+
+def _known_keys(conn, keys) -> set:
+    known = set()
+    keys = list(keys)
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i+500]
+        known.update(r[0] for r in conn.execute(f"SELECT key FROM te_items WHERE key IN ({','.join('?'*len(chunk))})", chunk))
+    return known
+
+def _prepare_row(k: str, it) -> tuple:
+    v = _values_rows([(k, it.get("country",""), it.get("title",""), it.get("description",""), 0.0)])
+    return _derive_columns(it), (v[0][2:-1] if v else None)
+
+def db_upsert_prepare(conn, items: list, keys: Optional[List[str]] = None) -> Dict[str, tuple]:
+    """
+    Parte CPU dell'upsert, fuori dal lock di scrittura (conn anche in sola lettura; None = DB vuoto):
+    chiave -> (colonne derivate, campi te_values o None) per le sole chiavi non ancora in te_items.
+    keys: fingerprint degli item se già calcolati.
+    """
+    with tr.span("db.upsert_prepare", rows=len(items)) as sp:
+        byk = dict(zip(keys if keys is not None else map(_fp, items), items))
+        known = _known_keys(conn, byk) if conn is not None else set()
+        prepared = {k: _prepare_row(k, it) for k, it in byk.items() if k not in known}
+        sp.set(rows_new=len(prepared))
+    return prepared
+
+def db_upsert(conn, items: list, now: Optional[float] = None, commit: bool = True,
+              prepared: Optional[Dict[str, tuple]] = None, keys: Optional[List[str]] = None):
+    """
+    now = istante di osservazione (default: adesso; la ri-estrazione passa quello della cattura).
+    Le colonne derivate (rollup) e i valori te_values servono solo per le chiavi nuove: calcolati da
+    db_upsert_prepare prima del lock (prepared, es. dal chiamante di te_writer); sotto lock solo la verifica
+    delle chiavi già note e gli executemany. Una chiave nuova assente da prepared è preparata al momento.
+    keys: fingerprint degli item (_fp) se già calcolati, altrimenti calcolati anch'essi prima del lock.
+    commit=False: la transazione resta aperta (te_writer unisce più job in un solo commit).
+    """
+    with tr.span("db.upsert", rows_written=len(items)) as sp:
+        now = time.time() if now is None else float(now)
+        if keys is None: keys = [_fp(it) for it in items]
+        if prepared is None and not conn.in_transaction:
+            prepared = db_upsert_prepare(conn, items, keys)
+        prepared = prepared or {}
+        cur = conn.cursor()
+        if not conn.in_transaction: cur.execute("BEGIN IMMEDIATE")
+        known = _known_keys(cur, keys)
+        sp.set(rows_new=len(set(keys) - known))
+        rows, values = [], []
+        for k, it in zip(keys, items):
+            dcols = vals = None
+            if k not in known:
+                dcols, vals = prepared[k] if k in prepared else _prepare_row(k, it)
+                if vals: values.append((k, it.get("country",""), *vals, now))
+                known.add(k)
+            rows.append((k, it.get("country",""), it.get("title",""), it.get("description",""),
+                         it.get("time",""), int(it.get("importance",0)), it.get("category_raw",""),
+                         now, now, *(dcols or (None, None, None))))
+        cur.executemany("""
+            INSERT INTO te_items(key,country,title,description,time_text,importance,category_raw,first_seen_ts,last_seen_ts,
+                                 category_mapped,topic_sig,is_result)
+            VALUES (?,?,?,?,?,?,?, ?, ?, ?,?,?)
             ON CONFLICT(key) DO UPDATE SET
-              last_seen_ts=excluded.last_seen_ts,
-              time_text=excluded.time_text,
-              importance=excluded.importance
-        """, (k, it.get("country",""), it.get("title",""), it.get("description",""),
-              it.get("time",""), int(it.get("importance",0)), it.get("category_raw",""),
-              now, now))
-    conn.commit()
+              first_seen_ts=MIN(first_seen_ts, excluded.first_seen_ts),
+              time_text=CASE WHEN excluded.last_seen_ts >= last_seen_ts THEN excluded.time_text ELSE time_text END,
+              importance=CASE WHEN excluded.last_seen_ts >= last_seen_ts THEN excluded.importance ELSE importance END,
+              last_seen_ts=MAX(last_seen_ts, excluded.last_seen_ts)
+        """, rows)
+        if values:
+            _values_insert(cur, values)
+            sp.set(values_extracted=len(values))
+        if items: _bump_data_version(cur)
+        if commit: conn.commit()
 
 def db_count_by_country(conn, country: str) -> int:
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM te_items WHERE country=?", (country,))
-    r = cur.fetchone()
+    with tr.span("db.count_by_country"):
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM te_items WHERE country=?", (country,))
+        r = cur.fetchone()
     return int(r[0] or 0)
 
-def db_load_recent(conn, countries: list, max_age_days: int = 60) -> list:
-    """Carica fino a max_age_days dal DB; età = parse(time_text) se possibile, altrimenti delta da last_seen_ts"""
-    if not countries: return []
-    cutoff = time.time() - max_age_days*86400
-    qs = ",".join("?"*len(countries))
-    cur = conn.cursor()
-    cur.execute(f"""
-        SELECT country,title,description,time_text,importance,category_raw,last_seen_ts
-        FROM te_items
-        WHERE last_seen_ts >= ? AND country IN ({qs})
-    """, [cutoff, *countries])
-    out=[]
-    now = time.time()
-    for c,t,d,tt,imp,cat,seen in cur.fetchall():
-        age_tt = parse_age_days_from_text(tt or "")
-        age_db = max(0.0, (now - float(seen)) / 86400.0)
-        age_days = age_tt if (age_tt is not None and age_tt <= 90.0) else age_db
-        out.append({
-            "country": c, "title": t or "", "description": d or "",
-            "time": tt or "", "importance": int(imp or 0),
-            "category_raw": cat or "", "age_days": age_days
-        })
+def db_last_seen_by_country(conn, countries: List[str]) -> Dict[str, float]:
+    """Ultimo last_seen per paese (≈ istante dell'ultimo scrape che lo ha coperto); paesi assenti esclusi."""
+    if not countries: return {}
+    with tr.span("db.last_seen_by_country", countries=len(countries)):
+        qs = ",".join("?" * len(countries))
+        return {c: float(ts) for c, ts in conn.execute(
+            f"SELECT country, MAX(last_seen_ts) FROM te_items WHERE country IN ({qs}) GROUP BY country", list(countries))}
+
+# ---- Query sui rollup (nessuna scansione di te_items) ----
+CORE_CATEGORIES = ("crescita", "inflazione", "lavoro", "pmi")
+
+def _since_day(days: float, now: Optional[float] = None) -> str:
+    return datetime.fromtimestamp((time.time() if now is None else now) - max(0.0, days - 1) * 86400).strftime("%Y-%m-%d")
+
+def db_rollup_counts(conn, countries: Optional[list] = None, days: float = 7, by=("country", "category"),
+                     min_importance: int = 0, results_only: bool = False) -> List[Dict[str, Any]]:
+    """Conteggi dagli aggregati giornalieri per le dimensioni in by (country, day, category, importance, is_result)."""
+    dims = [d for d in by if d in ("country", "day", "category", "importance", "is_result")]
+    where, args = ["day >= ?", "importance >= ?"], [_since_day(days), int(min_importance)]
+    if countries:
+        where.append(f"country IN ({','.join('?' * len(countries))})"); args += list(countries)
+    if results_only: where.append("is_result=1")
+    sel = ",".join(dims + ["SUM(n)"])
+    group = f" GROUP BY {','.join(dims)} ORDER BY {','.join(dims)}" if dims else ""
+    with tr.span("db.rollup_counts", countries=len(countries or [])):
+        rows = conn.execute(f"SELECT {sel} FROM te_rollup WHERE {' AND '.join(where)}{group}", args).fetchall()
+    return [dict(zip(dims + ["n"], r)) for r in rows]
+
+def db_coverage(conn, countries: list, days: float = 7, categories=CORE_CATEGORIES) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Per paese × categoria: item, item rossi, risultati pubblicati e ultimo giorno con un risultato."""
+    out = {c: {cat: {"items": 0, "red": 0, "results": 0, "last_result_day": None} for cat in categories} for c in countries}
+    if not countries: return out
+    qs = ",".join("?" * len(countries)); qc = ",".join("?" * len(categories))
+    with tr.span("db.coverage", countries=len(countries), days=days):
+        rows = conn.execute(f"""
+            SELECT country, category, SUM(n), SUM(CASE WHEN importance=3 THEN n ELSE 0 END),
+                   SUM(CASE WHEN is_result=1 THEN n ELSE 0 END), MAX(CASE WHEN is_result=1 THEN day END)
+            FROM te_rollup WHERE day >= ? AND country IN ({qs}) AND category IN ({qc})
+            GROUP BY country, category""", [_since_day(days), *countries, *categories]).fetchall()
+    for c, cat, n, red, res, last in rows:
+        out[c][cat] = {"items": int(n), "red": int(red), "results": int(res), "last_result_day": last}
     return out
 
-def db_prune(conn, max_age_days: int = 60):
-    cutoff = time.time() - max_age_days*86400
-    cur = conn.cursor()
-    cur.execute("DELETE FROM te_items WHERE last_seen_ts < ?", (cutoff,))
-    conn.commit()
+def db_latest_results(conn, countries: list, topics: Optional[list] = None) -> List[Dict[str, Any]]:
+    """Ultimo risultato per paese × topic_sig (freschezza: età in giorni dalla prima osservazione)."""
+    if not countries: return []
+    where, args = f"country IN ({','.join('?' * len(countries))})", list(countries)
+    if topics:
+        where += f" AND topic_sig IN ({','.join('?' * len(topics))})"; args += list(topics)
+    now = time.time()
+    rows = conn.execute(f"SELECT country,topic_sig,category,title,seen_ts FROM te_latest WHERE {where} "
+                        f"ORDER BY country, seen_ts DESC", args).fetchall()
+    return [{"country": c, "topic_sig": t, "category": cat, "title": title, "age_days": (now - ts) / 86400.0}
+            for c, t, cat, title, ts in rows]
 
-# ============= Scraper TradingEconomics =============
-class TEStreamScraper:
-    def __init__(self, cfg: Config): self.cfg = cfg
+DB_COLUMNS = ("country", "title", "description", "time_text", "importance", "category_raw", "first_seen_ts", "last_seen_ts")
+CONTEXT_COLUMNS = ("country", "title", "description", "time_text", "importance", "category_raw")
 
-    @staticmethod
-    def _map_color_to_importance(class_text: str, style_text: str) -> int:
-        t = (class_text or "").lower() + " " + (style_text or "").lower()
-        if any(k in t for k in ["high-impact","impact-high","text-danger","badge-danger","#dc3545"]): return 3
-        if any(k in t for k in ["text-primary","badge-primary","#0d6efd"]): return 2
-        if any(k in t for k in ["text-info","badge-info","#0dcaf0"]): return 1
-        return 0
+def _db_file(conn) -> str:
+    return conn.execute("PRAGMA database_list").fetchone()[2]
 
-    def scrape_30d(self, chosen_countries: List[str], max_days: int = 60) -> List[Dict[str, Any]]:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.cfg.HEADLESS, slow_mo=self.cfg.SLOW_MO,
-                args=["--disable-blink-features=AutomationControlled","--disable-gpu"])
-            context = browser.new_context(
-                user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                            "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"),
-                viewport={"width":1440,"height":900}, locale="en-US")
-            def _block(route):
-                try:
-                    url = route.request.url
-                    if any(x in url for x in [".png",".jpg",".jpeg",".gif",".webp",".svg",".woff",".woff2",".ttf",
-                                              ".mp4",".avi",".webm",".css?","doubleclick","googletag","analytics"]):
-                        return route.abort()
-                except Exception: pass
-                return route.continue_()
-            try: context.route("**/*", _block)
-            except Exception: pass
-
-            page = context.new_page()
-
-            # Navigazione robusta (www + retry)
-            def safe_goto():
-                candidates = []
-                u = self.cfg.BASE_URL.strip()
-                candidates.append(u)
-                if "://www." not in u: candidates.append(u.replace("://", "://www.", 1))
-                if "://www." in u: candidates.append(u.replace("://www.", "://", 1))
-                last_err = None
-                for url in dict.fromkeys(candidates):
-                    try:
-                        page.goto(url, wait_until="domcontentloaded", timeout=self.cfg.NAV_TIMEOUT)
-                        return True
-                    except Exception as e:
-                        last_err = e
-                        continue
-                raise last_err if last_err else RuntimeError("Impossibile raggiungere TradingEconomics")
+def db_iter_recent(conn, countries: list, max_age_days: int = 60, columns=CONTEXT_COLUMNS,
+                   page_size: int = 1000, now: Optional[float] = None, derived: bool = False):
+    """
+    Generatore di NewsItem dal cursore a pagine di page_size righe, con le sole colonne richieste
+    (time_text -> "time"; age_days sempre calcolata). Senza "description" gli item la leggono su richiesta.
+    derived=True: anche la classificazione salvata (NewsItem._dcols), riusata dalla selezione.
+    """
+    if not countries: return
+    bad = set(columns) - set(DB_COLUMNS)
+    if bad: raise ValueError(f"Colonne sconosciute: {sorted(bad)}")
+    src = None if "description" in columns else DescriptionSource(_db_file(conn))
+    cols = list(dict.fromkeys((["key"] if src else []) + [*columns, "time_text", "last_seen_ts"]
+                              + (list(DERIVED_COLUMNS) if derived else [])))
+    # per tipo (indice, nome): testo internato, testo, intero, valore così com'è (extra)
+    f_int = [(i, "time" if c == "time_text" else c) for i, c in enumerate(cols)
+             if c in columns and c in ("country", "time_text", "category_raw")]
+    f_txt = [(i, c) for i, c in enumerate(cols) if c in columns and c in ("title", "description")]
+    f_num = [(i, c) for i, c in enumerate(cols) if c in columns and c == "importance"]
+    f_raw = [(i, c) for i, c in enumerate(cols) if c in columns and c in ("first_seen_ts", "last_seen_ts")]
+    i_tt, i_seen = cols.index("time_text"), cols.index("last_seen_ts")
+    i_cat = cols.index("category_mapped") if derived else None
+    now = time.time() if now is None else now
+    # età da time_text memorizzata per testo: pochi valori distinti ("5 days ago", date) su migliaia di righe
+    now_dt, ages = datetime.fromtimestamp(now), {}
+    qs = ",".join("?"*len(countries))
+    cur = conn.cursor()
+    cur.execute(f"SELECT {','.join(cols)} FROM te_items WHERE last_seen_ts >= ? AND country IN ({qs})",
+                [now - max_age_days*86400, *countries])
+    new, intern = NewsItem.__new__, sys.intern
+    while True:
+        rows = cur.fetchmany(page_size)
+        if not rows: break
+        for row in rows:
+            it = new(NewsItem)
+            it._extra = it._norm_title = it._fpv = it._dcols = None
+            it._key, it._src = (row[0], src) if src else (None, None)
+            if derived and row[i_cat] is not None:
+                it._dcols = (intern(row[i_cat]), intern(row[i_cat+1] or ""), row[i_cat+2])
+            for i, name in f_int: setattr(it, name, intern(row[i] or ""))
+            for i, name in f_txt: setattr(it, name, row[i] or "")
+            for i, name in f_num: setattr(it, name, int(row[i] or 0))
+            for i, name in f_raw: it[name] = row[i]
+            tt = row[i_tt] or ""
+            age_tt = ages.get(tt, _UNSET)
+            if age_tt is _UNSET: age_tt = ages[tt] = parse_age_days_from_text(tt, now_dt)
+            it.age_days = age_tt if (age_tt is not None and age_tt <= 90.0) else max(0.0, (now - float(row[i_seen])) / 86400.0)
+            yield it
+
+def db_load_recent(conn, countries: list, max_age_days: int = 60, lazy_descriptions: bool = False,
+                   derived: bool = False) -> list:
+    """Carica fino a max_age_days dal DB; età = parse(time_text) se possibile, altrimenti delta da last_seen_ts"""
+    if not countries: return []
+    cols = tuple(c for c in CONTEXT_COLUMNS if not (lazy_descriptions and c == "description"))
+    with tr.span("db.load_recent", countries=len(countries), max_age_days=max_age_days) as sp:
+        out = list(db_iter_recent(conn, countries, max_age_days, columns=cols, derived=derived))
+        sp.set(rows_read=len(out))
+    return out
 
-            try:
-                safe_goto()
-            except Exception as nav_err:
-                logging.error("Navigazione fallita verso TradingEconomics: %s", nav_err)
-                try: browser.close()
-                except Exception: pass
-                return []  # fallback al DB nel chiamante
-
-            # Cookie
-            for sel in ['#onetrust-accept-btn-handler', 'button:has-text("Accept")', '[class*="cookie"] button']:
-                try:
-                    b = page.locator(sel).first
-                    if b and b.is_visible(): b.click(timeout=1000); page.wait_for_timeout(200); break
-                except Exception: pass
-
-            # Aspetta almeno una card
-            try:
-                page.wait_for_selector('li.te-stream-item, div.stream-item, article', timeout=10_000)
-            except Exception:
-                logging.warning("Nessuna card visibile entro 10s; continuo comunque.")
-
-            # Scroll con early-stop (robusto, senza mouse.wheel)
-            older_hits = 0
-            for _ in range(100):
-                try:
-                    if page.is_closed():
-                        break
-                except Exception:
-                    break
-
-                try:
-                    page.evaluate("window.scrollBy(0, 1600);")
-                except Exception:
-                    break
-
-                page.wait_for_timeout(350)
-
-                for sel in ['#stream-btn:has-text("More")','button:has-text("More")','a:has-text("More")']:
+def db_prune(conn, max_age_days: int = 60, cold_dir: Optional[str] = None, commit: bool = True):
+    """
+    Toglie da te_items le righe più vecchie di max_age_days. Con cold_dir le righe vengono prima
+    archiviate in Parquet (te_cold) nella stessa transazione: se l'archiviazione fallisce restano nel DB.
+    commit=False: dentro una transazione del chiamante (te_writer); gli errori vengono rilanciati.
+    """
+    cutoff = time.time() - max_age_days*86400
+    with tr.span("db.prune", max_age_days=max_age_days, cold=int(bool(cold_dir))) as sp:
+        cur = conn.cursor()
+        if commit and conn.in_transaction: conn.commit()
+        if not conn.in_transaction: cur.execute("BEGIN IMMEDIATE")
+        try:
+            if cold_dir:
+                rows = cur.execute(f"SELECT key,{','.join(DB_COLUMNS)} FROM te_items WHERE last_seen_ts < ?",
+                                   (cutoff,)).fetchall()
+                if rows:
                     try:
-                        btn = page.locator(sel).first
-                        if btn and btn.is_visible():
-                            btn.click()
-                            page.wait_for_timeout(420)
-                    except Exception:
-                        pass
-
-                try:
-                    tails = page.evaluate("""() => {
-                        const nodes = Array.from(document.querySelectorAll('li.te-stream-item, div.stream-item, article'));
-                        return nodes.slice(-25).map(n => (n.querySelector('small')?.textContent || '').trim());
-                    }""") or []
-                    ages = []
-                    for tx in tails:
-                        a = parse_age_days_from_text(tx)
-                        if a is not None:
-                            ages.append(a)
-                    if ages and min(ages) > max_days:
-                        older_hits += 1
+                        from te_cold import archive_rows
+                    except ImportError as e:
+                        logging.warning("Archivio freddo non disponibile (%s): righe scadute eliminate", e)
                     else:
-                        older_hits = 0
-                    if older_hits >= 2:
-                        break
-                except Exception:
-                    pass
-
-            # Estrazione (no filtro paese in JS)
-            def _extract_all():
-                return page.evaluate(
-                    """() => {
-                        const pick = (el, sels) => {
-                          for (const s of sels) { const n = el.querySelector(s); if (n) { const t=(n.textContent||'').trim(); if (t) return t; } }
-                          return '';
-                        };
-                        const selsCountry = [
-                          'a.te-stream-country', '.te-stream-country',
-                          'a[href*="/country/"]', 'a[href*="/countries/"]',
-                          '.country a', '[data-entity="country"]', '[data-country]'
-                        ];
-                        const selsTitle = ['a.te-stream-title', 'h3', 'h2', 'a', '.te-title', 'strong'];
-                        const nodes = Array.from(document.querySelectorAll('li.te-stream-item, div.stream-item, article'));
-                        return nodes.map((el) => {
-                          const country = pick(el, selsCountry);
-                          const title   = pick(el, selsTitle);
-                          const desc    = (el.querySelector('span.te-stream-item-description')?.textContent
-                                           || el.querySelector('.desc')?.textContent
-                                           || el.querySelector('p')?.textContent
-                                           || el.textContent || '').trim();
-                          const time    = (el.querySelector('small')?.textContent || '').trim();
-                          const c_blob  = [el.getAttribute('class')||'',
-                                           el.querySelector('.te-stream-impact')?.getAttribute('class')||'',
-                                           el.querySelector('small')?.getAttribute('class')||'',
-                                           el.querySelector('.te-stream-title')?.getAttribute('class')||''].join(' ');
-                          const s_blob  = [el.getAttribute('style')||'',
-                                           el.querySelector('.te-stream-impact')?.getAttribute('style')||'',
-                                           el.querySelector('small')?.getAttribute('style')||''].join(' ');
-                          const cat     = (el.querySelector('a.te-stream-category')?.textContent||'').trim();
-                          return {country, title, description: desc.slice(0,2000), time_text: time, class_blob: c_blob, style_blob: s_blob, category_raw: cat};
-                        });
-                    }"""
-                ) or []
-
-            raw = _extract_all()
-            if not raw:
-                for _ in range(12):
-                    try:
-                        page.evaluate("window.scrollBy(0, 1800);")
-                    except Exception:
-                        break
-                    page.wait_for_timeout(380)
-                    for s in ['#stream-btn:has-text("More")','button:has-text("More")','a:has-text("More")']:
-                        try:
-                            btn = page.locator(s).first
-                            if btn and btn.is_visible():
-                                btn.click()
-                                page.wait_for_timeout(420)
-                        except Exception:
-                            pass
-                raw = _extract_all()
-
-            browser.close()
-
-        # Post-process & filtro Paesi in Python
-        items: List[Dict[str, Any]] = []
-        chosen_set = set(normalize_country(c) for c in chosen_countries)
-        for r in raw:
-            country_raw = (r.get("country") or "").strip()
-            country = normalize_country(country_raw)
-            if not country or country not in chosen_set:
-                continue
-            age_days = parse_age_days_from_text(r.get("time_text","")) or parse_age_days_from_text(r.get("description",""))
-            if age_days is None or age_days > float(max_days):
-                continue
-            importance = self._map_color_to_importance(r.get("class_blob",""), r.get("style_blob",""))
-            items.append({
-                "country": country,
-                "title": (r.get("title","") or "").strip(),
-                "description": (r.get("description","") or "").strip(),
-                "time": (r.get("time_text","") or "").strip(),
-                "age_days": age_days,
-                "importance": importance,
-                "category_raw": (r.get("category_raw","") or "").strip(),
-            })
-        logging.info("Scraper: notizie raccolte (<=%sgg) paesi=%s -> %d",
-                     max_days, ",".join(chosen_countries), len(items))
-        return items
+                        sp.set(rows_archived=archive_rows(cold_dir, rows))
+            cur.execute("DELETE FROM te_items WHERE last_seen_ts < ?", (cutoff,))
+            sp.set(rows_deleted=max(0, cur.rowcount))
+            if cur.rowcount: _bump_data_version(cur)
+            if commit: conn.commit()
+        except Exception as e:
+            if not commit: raise
+            conn.rollback()
+            logging.error("Prune DB annullato, righe scadute mantenute: %s", e)
 
 # ============= Classificazione & Score (NOTIZIE) =============
 GDP_RX  = re.compile(r"\b(gdp|gross domestic product|gdp growth rate|growth)\b", re.I)
@@ -437,9 +904,9 @@ def detect_category_from_text(text: str) -> str:
 def has_numbers(text: str) -> bool:
     return bool(re.search(r"\d+(?:[.,]\d+)?\s*%?", text or ""))
 
-def score_item(it: Dict[str, Any]) -> int:
-    text = f"{it.get('title','')} {it.get('description','')}"
-    cat = detect_category_from_text(text)
+def score_item(it: Dict[str, Any], text: Optional[str] = None, cat: Optional[str] = None) -> int:
+    text = _item_text(it) if text is None else text
+    cat = detect_category_from_text(text) if cat is None else cat
     base = CATEGORY_WEIGHTS.get(cat, 0.10)
     rb = 0.16 * recency_weight(it.get("age_days"))
     nb = 0.12 if has_numbers(text) else 0.0
@@ -462,20 +929,46 @@ def _normalize_spaces_in_perc(text: str) -> str:
     t = re.sub(r"\s{2,}", " ", t)
     return t.strip()
 
-def build_es_input_text(context_items: List[Dict[str, Any]]) -> str:
-    def is_gdp(it: Dict[str, Any]) -> bool:
-        t = (it.get("title","")+" "+it.get("description","")).lower()
-        return bool(re.search(r"\b(gdp|gross domestic product|gdp growth rate)\b", t))
-    gdp_items=[x for x in context_items if is_gdp(x)]
-    other_items=[x for x in context_items if not is_gdp(x)]
+def build_es_input_text(context_items: List[Dict[str, Any]], mode: str = "text") -> str:
+    """
+    mode="text": una riga "paese: titolo. descrizione" per item.
+    mode="table": per paese la tabella dei valori estratti (te_numeric; per indicatore × base × periodo il più
+    recente) e i soli titoli delle notizie senza dato; stesso ordine (GDP prima, poi importanza e recency).
+    """
+    # descrizioni lette a blocchi (item lazy): finiscono solo nelle righe del prompt, non sugli item
     def sort_key(x): return (-int(x.get("importance",0)), x.get("age_days",999), (x.get("title","") or "")[:60])
-    gdp_items.sort(key=sort_key); other_items.sort(key=sort_key)
-    ordered = gdp_items + other_items
-    blocks=[]
-    for it in ordered:
-        line=f"{it.get('country','')}: {it.get('title','')}. {it.get('description','')}".strip()
-        blocks.append(_normalize_spaces_in_perc(line))
-    return "\n".join(blocks)
+    table = mode == "table"
+    if table: from te_numeric import extract_values, format_values_table
+    rows=[]
+    for it, desc in iter_descriptions(context_items):
+        is_gdp = bool(re.search(r"\b(gdp|gross domestic product|gdp growth rate)\b", f"{it.get('title','')} {desc}".lower()))
+        if table:
+            rows.append((not is_gdp, sort_key(it), it.get("country",""), extract_values(it.get("title",""), desc), it))
+            continue
+        line=f"{it.get('country','')}: {it.get('title','')}. {desc}".strip()
+        rows.append((not is_gdp, sort_key(it), _normalize_spaces_in_perc(line)))
+    rows.sort(key=lambda r: (r[0], r[1]))
+    if not table:
+        return "\n".join(r[2] for r in rows)
+    # stesso dato (paese × indicatore × base × periodo) da più item: resta il più recente
+    fresh: Dict[tuple, Any] = {}
+    for r in rows:
+        if r[3] is None: continue
+        k = (r[2], r[3]["indicator"], r[3]["basis"], r[3]["period"])
+        if k not in fresh or r[4].get("age_days",999) < fresh[k][4].get("age_days",999): fresh[k] = r
+    keep = {id(r) for r in fresh.values()}
+    values: Dict[str, List[Dict[str, Any]]] = {}
+    others: Dict[str, List[str]] = {}
+    for r in rows:
+        values.setdefault(r[2], []); others.setdefault(r[2], [])
+        if r[3] is None: others[r[2]].append(r[4].get("title",""))
+        elif id(r) in keep: values[r[2]].append(r[3])
+    out = []
+    for country in values:
+        if values[country]: out.append(format_values_table((country, rec) for rec in values[country]))
+        titles = list(dict.fromkeys(t for t in others[country] if t))
+        if titles: out.append(f"{country} — altre notizie: " + "; ".join(titles))
+    return "\n".join(out)
 
 PROMPT_ES = (
     "sei un analista macroeconomico e devi scrivere un report macroeconomico narrativo e coerente, "
@@ -512,101 +1005,6 @@ def _strip_generic_intro(text: str) -> str:
     return t.strip()
 
 
-class MacroSummarizer:
-    def __init__(self, api_key: str, model: str, temp: float, max_tokens: int):
-        import anthropic
-        if not api_key: raise RuntimeError("ANTHROPIC_API_KEY non impostata nel .env")
-        self.client = anthropic.Anthropic(api_key=api_key)
-        self.model, self.temp, self.max_tokens = model, temp, max_tokens
-
-    def _call_with_retry(self, messages, temperature, max_tokens, max_retries=5):
-        """Chiama l'API con retry automatico in caso di rate limit"""
-        for attempt in range(max_retries):
-            try:
-                return self.client.messages.create(
-                    model=self.model,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    messages=messages
-                )
-            except Exception as e:
-                error_str = str(e)
-                # Verifica se è un rate limit error (429)
-                if "rate_limit" in error_str.lower() or "429" in error_str:
-                    if attempt < max_retries - 1:
-                        # Backoff esponenziale: 2^attempt secondi
-                        wait_time = 2 ** attempt
-                        logging.warning(f"Rate limit raggiunto. Attendo {wait_time}s prima del retry {attempt+1}/{max_retries}...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        logging.error("Rate limit: tutti i tentativi falliti")
-                        raise
-                else:
-                    # Se non è un rate
-                    raise
-            return None
-
-    def executive_summary(self, context_items: List[Dict[str, Any]], cfg: Config, chosen_countries: List[str]) -> str:
-        extra = max(0, len(chosen_countries)-1)
-        target_words = cfg.ES_WORD_MIN + cfg.ES_WORD_PER_EXTRA_COUNTRY * extra
-        content_text = build_es_input_text(context_items) if context_items else "Nessun contenuto."
-        try:
-            resp = self._call_with_retry(
-                messages=[{"role":"user","content":f"{PROMPT_ES}\n\nLunghezza obiettivo: circa {target_words} parole.\n\nTESTO DA RIELABORARE:\n{content_text}"}],
-                temperature=self.temp,
-                max_tokens=min(cfg.MAX_TOKENS,1600)
-            )
-            text = (resp.content[0].text if resp and resp.content else "").strip()
-            text = _normalize_spaces_in_perc(text)
-            text = _strip_generic_intro(text)
-            return text or "Executive Summary non disponibile."
-        except Exception as e:
-            logging.error("Errore ES: %s", e)
-            return "Executive Summary non disponibile per errore di generazione."
-
-    def summarize_item_it(self, item: Dict[str, Any], cfg: Config) -> str:
-        title = (item.get("title","") or "").strip()
-        desc  = (item.get("description","") or "").strip()
-        country = (item.get("country","") or "").strip()
-        text_in = f"TITOLO: {title}\nPAESE: {country}\nTESTO: {desc}"
-        prompt = (
-            "Scrivi un riassunto in ITALIANO della seguente notizia economica. "
-            "Usa 100–120 parole, tono professionale e chiaro, senza elenchi puntati né sezioni. "
-            "Mantieni tutti i dati numerici presenti nel testo (percentuali, livelli, variazioni) senza introdurne di nuovi. "
-            "Evidenzia il messaggio macro principale e l'eventuale implicazione di policy. "
-            "Inizia direttamente con il contenuto.\n\n"
-            f"CONTENUTO:\n{text_in}"
-        )
-        try:
-            resp = self._call_with_retry(
-                messages=[{"role":"user","content":prompt}],
-                temperature=min(self.temp,0.3),
-                max_tokens=500
-            )
-            out = (resp.content[0].text if resp and resp.content else "").strip()
-            out = _normalize_spaces_in_perc(out)
-            return out
-        except Exception as e:
-            logging.error("Errore summarize_item_it: %s", e)
-            return (title if title else "")[:180]
-
-    def translate_it(self, text: str, cfg: Config) -> str:
-        if not text: return ""
-        prompt = "Traduci in ITALIANO il seguente titolo. Rispondi SOLO con il titolo tradotto, senza frasi introduttive.\n\n" + text
-        try:
-            resp = self._call_with_retry(
-                messages=[{"role":"user","content":prompt}],
-                temperature=min(self.temp,0.2),
-                max_tokens=120
-            )
-            out = (resp.content[0].text if resp and resp.content else "").strip()
-            out = _strip_translation_preambles(_normalize_spaces_in_perc(out))
-            return out
-        except Exception as e:
-            logging.error("Errore translate_it: %s", e)
-            return text
-
 # ============= Pulizie testuali =============
 def _strip_translation_preambles(text: str) -> str:
     if not text: return ""
@@ -643,15 +1041,32 @@ def _token_key(s: str) -> List[str]:
     s = _norm_text(s)
     return [t for t in s.split() if t not in STOPWORDS_IT_EN and not re.fullmatch(r"\d+([.,]\d+)?%?", t)][:18]
 
+# memo delle coppie già confrontate, attivo solo durante build_selection_sweep (finestre annidate: stesse coppie)
+_NEAR_DUP_MEMO: "contextvars.ContextVar[Optional[Dict[tuple, bool]]]" = contextvars.ContextVar("te_near_dup_memo", default=None)
+
+def _near_dup(a: str, b: str, threshold: float = 0.92) -> bool:
+    """ratio() >= soglia, scartando prima con i limiti superiori economici (stesso esito)."""
+    memo = _NEAR_DUP_MEMO.get()
+    if memo is not None:
+        r = memo.get((a, b, threshold))
+        if r is None:
+            r = memo[(a, b, threshold)] = _near_dup_ratio(a, b, threshold)
+        return r
+    return _near_dup_ratio(a, b, threshold)
+
+def _near_dup_ratio(a: str, b: str, threshold: float) -> bool:
+    sm = SequenceMatcher(None, a, b)
+    return sm.real_quick_ratio() >= threshold and sm.quick_ratio() >= threshold and sm.ratio() >= threshold
+
 def _similar(a: str, b: str) -> float:
     return SequenceMatcher(None, _norm_text(a), _norm_text(b)).ratio()
 
-def _is_preview_or_calendar(it: Dict[str, Any]) -> bool:
-    t = f"{it.get('title','')} {it.get('description','')}"
+def _is_preview_or_calendar(it: Dict[str, Any], t: Optional[str] = None) -> bool:
+    t = _item_text(it) if t is None else t
     return bool(PREVIEW_PAT.search(t))
 
-def _is_result_data(it: Dict[str, Any]) -> bool:
-    t = f"{it.get('title','')} {it.get('description','')}"
+def _is_result_data(it: Dict[str, Any], t: Optional[str] = None) -> bool:
+    t = _item_text(it) if t is None else t
     tn = _norm_text(t)
     if PREVIEW_PAT.search(t): return False
     if re.search(r"\b(sara|saranno|verra|verranno|will\s+be|to\s+be\s+released|expected\s+to|is\s+expected|are\s+expected)\b", tn):
@@ -660,8 +1075,8 @@ def _is_result_data(it: Dict[str, Any]) -> bool:
     if re.search(r"\b(e|e')\s+(salit[oaie]|sc[eè]s[oaie]|aumentat[oaie]|diminuit[oaie]|accelerat[oaie]|rallentat[oaie]|rivist[oaie]|stabilizzat[oaie]|pubblicat[oaie]|attestat[oaie])\b", tn): return True
     return False
 
-def _theme_is_rendimenti(it: Dict[str, Any]) -> bool:
-    t = f"{it.get('title','')} {it.get('description','')}"
+def _theme_is_rendimenti(it: Dict[str, Any], t: Optional[str] = None) -> bool:
+    t = _item_text(it) if t is None else t
     return bool(RENDITI_KEYS.search(t))
 
 def _is_pce_headline(text: str) -> bool:
@@ -679,9 +1094,10 @@ def _is_pce_core(text: str) -> bool:
         "prezzo" in tl or "prezzi" in tl or "deflatore" in tl or "indice" in tl
     )
 
-def _topic_signature(it: Dict[str, Any]) -> str:
-    if _theme_is_rendimenti(it): return "yields"
-    t = (it.get("title","")+" "+it.get("description","") or "").lower()
+def _topic_signature(it: Dict[str, Any], text: Optional[str] = None) -> str:
+    text = _item_text(it) if text is None else text
+    if _theme_is_rendimenti(it, text): return "yields"
+    t = text.lower()
     if _is_pce_headline(t) or _is_pce_core(t): return "pce"
     if "gdp" in t or "gross domestic product" in t or GROWTH_EXTRAS.search(t): return "gdp"
     if any(k in t for k in ["nonfarm","jobless","unemployment","payroll","claims"]): return "labour"
@@ -697,17 +1113,20 @@ def _day_bucket(it: Dict[str, Any]) -> int:
 
 def _enrich_items(cands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     out=[]
+    # copie (titolo normalizzato/fingerprint restano validi); descrizioni lazy caricate a blocchi solo sulle copie
+    cands = [it.copy() if type(it) is NewsItem else NewsItem(it) for it in cands]
+    fill_descriptions(cands)
     for it in cands:
-        it = dict(it)  # copia
-        score_item(it)
-        t = f"{it.get('title','')} {it.get('description','')}"
-        it["is_preview"]   = _is_preview_or_calendar(it)
-        it["is_result"]    = _is_result_data(it)
-        it["topic_sig"]    = _topic_signature(it)
+        t = _item_text(it)   # una volta per item, condiviso dai classificatori
+        cat, sig, res = _derive_columns(it, t)   # salvati in te_items per gli item dal DB
+        score_item(it, t, cat)
+        it["is_preview"]   = _is_preview_or_calendar(it, t)
+        it["is_result"]    = bool(res)
+        it["topic_sig"]    = sig
         it["pce_headline"] = _is_pce_headline(t)
         it["pce_core"]     = _is_pce_core(t)
         it["day_bucket"]   = _day_bucket(it)
-        if _theme_is_rendimenti(it):
+        if _theme_is_rendimenti(it, t):
             it["category_mapped"] = "rendimenti"
         # Fallback impatto/colore quando manca il flag TE
         if int(it.get("importance", 0)) == 0:
@@ -737,7 +1156,7 @@ def _group_and_clean(arr: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             head = next((x for x in base_sorted if x.get("pce_headline")), None)
             core = next((x for x in base_sorted if x.get("pce_core")), None)
             if head and core:
-                merged = dict(head)
+                merged = head.copy()
                 desc = (head.get("description","") or "")
                 more = core.get("description","") or ""
                 if more and SequenceMatcher(None, _norm_text(more), _norm_text(desc)).ratio() < 0.92:
@@ -750,7 +1169,7 @@ def _group_and_clean(arr: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         kept: List[Dict[str, Any]] = []
         for cand in sorted(base, key=lambda i: (-int(i.get("score",0)), i.get("age_days",999))):
             if not kept: kept.append(cand); continue
-            if any(SequenceMatcher(None, _norm_text(cand.get("title","")), _norm_text(k.get("title",""))).ratio() >= 0.92 for k in kept):
+            if any(_near_dup(_item_norm_title(cand), _item_norm_title(k)) for k in kept):
                 continue
             kept.append(cand)
         cleaned.extend(kept)
@@ -759,10 +1178,10 @@ def _group_and_clean(arr: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 def _filter_nonreds_base(nonreds: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     filtered=[]
     for it in nonreds:
-        if it.get("category_mapped") == "pmi" and PMI_REGIONAL.search(f"{it.get('title','')} {it.get('description','')}"):
+        if it.get("category_mapped") == "pmi" and PMI_REGIONAL.search(_item_text(it)):
             continue
         if it.get("category_mapped") == "altro":
-            if not has_numbers(f"{it.get('title','')} {it.get('description','')}"):
+            if not has_numbers(_item_text(it)):
                 continue
         filtered.append(it)
     return filtered
@@ -790,7 +1209,7 @@ def _take_nonreds_with_caps(nonreds_sorted, cap_total=16, cap_per_day=6, quota=N
 
     chosen = []
     def _dup(cand):
-        return any(SequenceMatcher(None, _norm_text(cand.get("title","")), _norm_text(s.get("title",""))).ratio() >= 0.92 for s in already+chosen)
+        return any(_near_dup(_item_norm_title(cand), _item_norm_title(s)) for s in already+chosen)
 
     count_total = 0
     for it in nonreds_sorted:
@@ -830,36 +1249,73 @@ def build_selection(items_ctx: List[Dict[str, Any]], days: int, cfg: Config,
     Selezione: pool primario ≤N giorni; se <12 o mancano categorie core,
     estendi fino a N+10 e poi fino a 30 giorni (dal DB) rispettando cap/quote.
     """
+    with tr.span("selection", items_in=len(items_ctx), days=days) as sp:
+        final_list = _build_selection(items_ctx, days, expand1_days, expand2_days)
+        sp.set(items_out=len(final_list))
+    return final_list
+
+def build_selection_sweep(items_ctx: List[Dict[str, Any]], cfg: Config, days_list=range(1, 31),
+                          expand1_days: int = 10, expand2_days: int = 30) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Selezione per ogni finestra di days_list in un solo passaggio (stesso esito di build_selection per finestra).
+    Il contesto ≤30gg è arricchito una volta e le finestre annidate condividono i confronti di dedup già fatti.
+    Gli item sono condivisi fra le finestre: copiarli prima di modificarli (es. enrichment IT).
+    """
+    days_list = sorted(set(int(d) for d in days_list))
+    if not days_list: return {}
+    horizon = max(30, days_list[-1])
+    with tr.span("selection.sweep", items_in=len(items_ctx), windows=len(days_list)) as sp:
+        pool = [x for x in items_ctx if x.get("age_days") is not None and x["age_days"] <= float(horizon)]
+        enriched = dict(zip(map(id, pool), _enrich_items(pool)))
+        shared = lambda cands: [enriched[id(x)] for x in cands]
+        memo: Dict[tuple, bool] = {}
+        tok = _NEAR_DUP_MEMO.set(memo)
+        try:
+            out = {d: _build_selection(items_ctx, d, expand1_days, expand2_days, enrich=shared) for d in days_list}
+        finally:
+            _NEAR_DUP_MEMO.reset(tok)
+        sp.set(enriched=len(enriched), dedup_pairs=len(memo))
+    return out
+
+def selection_diff(before: List[Dict[str, Any]], after: List[Dict[str, Any]]):
+    """(entrati, usciti) passando da una selezione all'altra, per fingerprint; ordine di ciascuna lista."""
+    kb, ka = {_fp(it) for it in before}, {_fp(it) for it in after}
+    return [it for it in after if _fp(it) not in kb], [it for it in before if _fp(it) not in ka]
+
+def _build_selection(items_ctx: List[Dict[str, Any]], days: int,
+                     expand1_days: int, expand2_days: int, enrich=_enrich_items) -> List[Dict[str, Any]]:
     MIN_TARGET = 12
     # --- POOL 0: ≤ N giorni
-    pool0 = [x for x in items_ctx if x.get("age_days") is not None and x["age_days"] <= float(days)]
-    if not pool0: pool0=[]
-    pool0 = _enrich_items(pool0)
-
-    reds0    = [x for x in pool0 if int(x.get("importance",0)) == 3]
-    nonreds0 = [x for x in pool0 if int(x.get("importance",0)) != 3]
-    reds0    = _group_and_clean(reds0)
-    nonreds0 = _group_and_clean(nonreds0)
-    nonreds0 = _filter_nonreds_base(nonreds0)
-    nonreds0.sort(key=lambda i: (-int(i.get("score",0)), i.get("age_days",999)))
-
-    final_list: List[Dict[str, Any]] = []
-    final_list.extend(reds0)
-    chosen_nonreds0 = _take_nonreds_with_caps(nonreds0, already=final_list)
-    final_list.extend(chosen_nonreds0)
+    with tr.span("selection.pool0") as sp0:
+        pool0 = [x for x in items_ctx if x.get("age_days") is not None and x["age_days"] <= float(days)]
+        if not pool0: pool0=[]
+        pool0 = enrich(pool0)
+
+        reds0    = [x for x in pool0 if int(x.get("importance",0)) == 3]
+        nonreds0 = [x for x in pool0 if int(x.get("importance",0)) != 3]
+        reds0    = _group_and_clean(reds0)
+        nonreds0 = _group_and_clean(nonreds0)
+        nonreds0 = _filter_nonreds_base(nonreds0)
+        nonreds0.sort(key=lambda i: (-int(i.get("score",0)), i.get("age_days",999)))
+
+        final_list: List[Dict[str, Any]] = []
+        final_list.extend(reds0)
+        chosen_nonreds0 = _take_nonreds_with_caps(nonreds0, already=final_list)
+        final_list.extend(chosen_nonreds0)
+        sp0.set(pool=len(pool0), chosen=len(final_list))
 
     # copertura categorie core (crescita, inflazione, lavoro, pmi)
     macro_core = ["crescita","inflazione","lavoro","pmi"]
-    present_core = set([it.get("category_mapped") for it in final_list if it.get("category_mapped") in macro_core and it.get("is_result")])
-
-    need_fill = (len(final_list) < MIN_TARGET) or any(c not in present_core for c in macro_core)
+    # il fill aggiunge solo sotto MIN_TARGET (anche per le core mancanti): a lista piena arricchire il pool
+    # esteso non cambierebbe nulla. La copertura core per paese si legge dai rollup (db_coverage)
+    need_fill = len(final_list) < MIN_TARGET
 
     # --- helper per fill-up con priorità risultato > preview > altro con numeri
     def _fill_from_pool(pool_all: List[Dict[str, Any]], min_age_exclusive: float, max_age_inclusive: float, target: int, ensure_core: bool):
         nonlocal final_list
         pool = [x for x in pool_all if x.get("age_days") is not None and min_age_exclusive < x["age_days"] <= max_age_inclusive]
         if not pool: return
-        pool = _enrich_items(pool)
+        pool = enrich(pool)
         reds    = [x for x in pool if int(x.get("importance",0)) == 3]
         nonreds = [x for x in pool if int(x.get("importance",0)) != 3]
         reds    = _group_and_clean(reds)
@@ -903,7 +1359,7 @@ def build_selection(items_ctx: List[Dict[str, Any]], days: int, cfg: Config,
 
         # 3) Se ancora sotto, prendo "altro con numeri"
         if len(final_list) < target:
-            altri = [x for x in nonreds if x.get("category_mapped")=="altro" and has_numbers(f"{x.get('title','')} {x.get('description','')}")]
+            altri = [x for x in nonreds if x.get("category_mapped")=="altro" and has_numbers(_item_text(x))]
             altri.sort(key=lambda i: (-int(i.get("score",0)), i.get("age_days",999)))
             for c in altri:
                 if len(final_list) >= target: break
@@ -913,12 +1369,18 @@ def build_selection(items_ctx: List[Dict[str, Any]], days: int, cfg: Config,
     if need_fill:
         # Fase 1: estendi a N + 10 (entro 30gg max)
         up1 = min(days + expand1_days, 30)
-        _fill_from_pool(items_ctx, min_age_exclusive=days, max_age_inclusive=up1, target=MIN_TARGET, ensure_core=True)
+        with tr.span("selection.fill1") as sp1:
+            n0 = len(final_list)
+            _fill_from_pool(items_ctx, min_age_exclusive=days, max_age_inclusive=up1, target=MIN_TARGET, ensure_core=True)
+            sp1.set(added=len(final_list) - n0)
 
     if len(final_list) < MIN_TARGET:
         # Fase 2: estendi fino a 30 gg
         if days < 30:
-            _fill_from_pool(items_ctx, min_age_exclusive=min(days+expand1_days,30), max_age_inclusive=30, target=MIN_TARGET, ensure_core=True)
+            with tr.span("selection.fill2") as sp2:
+                n0 = len(final_list)
+                _fill_from_pool(items_ctx, min_age_exclusive=min(days+expand1_days,30), max_age_inclusive=30, target=MIN_TARGET, ensure_core=True)
+                sp2.set(added=len(final_list) - n0)
 
     # Ordinamento finale
     final_list.sort(key=_sort_final_key)
@@ -935,54 +1397,153 @@ def trim_words(text: str, max_words: int) -> str:
         if tmp: return tmp + "."
     return cut
 
+def render_report_docx(es_text: str, selection: List[Dict[str, Any]],
+                       countries: List[str], days: int, context_count: int) -> bytes:
+    """DOCX in memoria (blocchi item in cache nel renderer condiviso)."""
+    from te_report import DEFAULT_RENDERER
+    with tr.span("report.render_docx", items=len(selection)) as sp:
+        data = DEFAULT_RENDERER.render_docx(es_text, selection, countries, days, context_count)
+        sp.set(bytes=len(data))
+    return data
+
 def save_report(filename: str, es_text: str, selection: List[Dict[str, Any]],
                 countries: List[str], days: int, context_count: int, output_dir: str) -> str:
-    doc = Document()
-    title = doc.add_heading('MACRO MARKETS ANALYSIS – Selezione Automatica', 0)
-    title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-    doc.add_paragraph(f"Executive Summary basato su {context_count} notizie (DB+stream) degli ultimi 60 giorni.")
-    doc.add_paragraph(f"Paesi considerati (60gg): {', '.join(countries)}")
-    doc.add_paragraph(f"Selezione mostrata: ultimi {days} giorni (ordinata per impatto, score, recency)")
-    doc.add_paragraph(f"Data Report: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-    doc.add_paragraph("Fonte: TradingEconomics (Stream) + cache locale")
-    doc.add_paragraph("_" * 60)
-
-    doc.add_heading('EXECUTIVE SUMMARY', level=1)
-    doc.add_paragraph(es_text or "(non disponibile)")
-    doc.add_paragraph("_" * 60)
-
-    doc.add_heading('NOTIZIE SELEZIONATE', level=1)
-    by_country: Dict[str, List[Dict[str, Any]]] = {}
-    for it in selection:
-        by_country.setdefault(it.get("country","Unknown"), []).append(it)
-    for country, arr in by_country.items():
-        doc.add_heading(country.upper(), level=2)
-        for i, it in enumerate(arr, 1):
-            head_raw = it.get('title_it') or it.get('title','')
-            head = f"{i}. {_fix_glued_numbers(_strip_translation_preambles(head_raw))}"
-            p = doc.add_paragraph(); p.add_run(head).bold = True
-
-            meta = []
-            if it.get('time'): meta.append(f"⏰ {it['time']}")
-            if it.get('category_mapped'): meta.append(f"🏷 {it['category_mapped']}")
-            if it.get('score') is not None: meta.append(f"⭐ {it['score']}")
-            if it.get('importance') is not None: meta.append(f"🎯 {it['importance']}")
-            if it.get('merged_from') and it.get('topic_sig','') == 'pce':
-                meta.append("🧩 pce: headline+core")
-            if meta: doc.add_paragraph("   " + "  ·  ".join(meta))
-
-            text_it = it.get('summary_it') or it.get('description','')
-            text_it = _fix_glued_numbers(_strip_translation_preambles(text_it))
-            doc.add_paragraph(trim_words(text_it, 120))
-            doc.add_paragraph("")
-
+    data = render_report_docx(es_text, selection, countries, days, context_count)
     out_dir = Path(output_dir); out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / filename
-    doc.save(out_path)
+    out_path.write_bytes(data)
     logging.info("Report salvato: %s", out_path)
     return str(out_path)
 
+# ============= Pipeline dati (Delta Mode) =============
+def load_context_items(cfg: Config, chosen_countries: List[str],
+                       scraper: Optional["TEStreamScraper"] = None) -> List[Dict[str, Any]]:
+    """Contesto ES: DB (Delta Mode) + scrape incrementale; fallback scrape completo se la base è scarsa."""
+    if scraper is None:
+        from te_scraper import TEStreamScraper
+        scraper = TEStreamScraper(cfg)
+    if not cfg.DELTA_MODE:
+        return scraper.scrape_30d(chosen_countries, max_days=cfg.CONTEXT_DAYS)
+
+    if cfg.SINGLE_WRITER:
+        from te_writer import get_writer
+        writer = get_writer(cfg.DB_PATH)   # crea schema/migrazioni prima della connessione read-only
+        conn = db_connect_ro(cfg.DB_PATH)
+        upsert = writer.upsert
+        prune = lambda: writer.prune(cfg.PRUNE_DAYS, cfg.COLD_DIR if cfg.COLD_STORAGE else None)
+    else:
+        conn = db_init(cfg.DB_PATH)
+        upsert = lambda items: db_upsert(conn, items)
+        prune = lambda: db_prune(conn, max_age_days=cfg.PRUNE_DAYS, cold_dir=cfg.COLD_DIR if cfg.COLD_STORAGE else None)
+    try:
+        warm, fresh = [], []
+        for c in chosen_countries:
+            cnt = db_count_by_country(conn, c)
+            (warm if cnt >= cfg.WARMUP_NEW_COUNTRY_MIN else fresh).append(c)
+        # live tail attivo (te_live.py): le card nuove sono già nel DB, niente delta scrape dei paesi caldi
+        if warm and cfg.SCRAPE_FRESH_S > 0 and time.time() - db_get_meta(conn, "live_tail_ts") < cfg.SCRAPE_FRESH_S:
+            logging.info("Live tail attivo: niente delta scrape per %s", ", ".join(warm))
+            warm = []
+        # paesi appena aggiornati (altra sessione, prefetch della UI): il delta scrape non porterebbe nulla
+        if warm and cfg.SCRAPE_FRESH_S > 0:
+            last = db_last_seen_by_country(conn, warm)
+            recent = [c for c in warm if time.time() - last.get(c, 0.0) < cfg.SCRAPE_FRESH_S]
+            if recent:
+                logging.info("Paesi aggiornati da meno di %ss, niente delta scrape: %s", cfg.SCRAPE_FRESH_S, ", ".join(recent))
+                warm = [c for c in warm if c not in recent]
+
+        items_new = []
+        if fresh:
+            logging.info("Warm-up paesi nuovi (<=%sgg): %s", cfg.CONTEXT_DAYS, ", ".join(fresh))
+            items_new += scraper.scrape_30d(fresh, max_days=cfg.CONTEXT_DAYS)
+        if warm:
+            logging.info("Delta scrape paesi noti (<=%sgg): %s", cfg.SCRAPE_HORIZON_DAYS, ", ".join(warm))
+            items_new += scraper.scrape_30d(warm, max_days=min(cfg.SCRAPE_HORIZON_DAYS, cfg.CONTEXT_DAYS))
+
+        if items_new:
+            upsert(items_new)
+            prune()
+
+        items_ctx = db_load_recent(conn, chosen_countries, max_age_days=cfg.CONTEXT_DAYS, lazy_descriptions=cfg.LAZY_DESCRIPTIONS, derived=True)
+
+        # fallback: base scarsa → scrape completo finestra ES
+        if len(items_ctx) < 20:
+            logging.info("Base DB scarsa (%d). Fallback scrape <=%sgg per tutti i paesi scelti.", len(items_ctx), cfg.CONTEXT_DAYS)
+            items_all = scraper.scrape_30d(chosen_countries, max_days=cfg.CONTEXT_DAYS)
+            if items_all:
+                upsert(items_all)
+                items_ctx = db_load_recent(conn, chosen_countries, max_age_days=cfg.CONTEXT_DAYS, lazy_descriptions=cfg.LAZY_DESCRIPTIONS, derived=True)
+
+        # finestra oltre PRUNE_DAYS: la parte più vecchia viene dall'archivio freddo
+        if cfg.COLD_STORAGE and cfg.CONTEXT_DAYS > cfg.PRUNE_DAYS and os.path.isdir(cfg.COLD_DIR):
+            try:
+                from te_cold import load_items
+                now = time.time()
+                # dedup per chiave, non per titolo: i titoli ricorrono a ogni uscita ("Inflation Rate" di ogni mese)
+                seen, cold = {it.key for it in items_ctx}, []
+                for it in load_items(cfg.COLD_DIR, chosen_countries, since=now - cfg.CONTEXT_DAYS*86400, now=now):
+                    if it.age_days <= cfg.CONTEXT_DAYS and it.key not in seen:
+                        seen.add(it.key); cold.append(it)
+                logging.info("Archivio freddo: %d item oltre %sgg", len(cold), cfg.PRUNE_DAYS)
+                items_ctx += cold
+            except ImportError as e:
+                logging.warning("Archivio freddo non leggibile (%s): contesto limitato a %sgg", e, cfg.PRUNE_DAYS)
+        return items_ctx
+    finally:
+        conn.close()
+
+def _enrich_one_it(summarizer: "MacroSummarizer", it: Dict[str, Any], cfg: Config) -> Dict[str, Any]:
+    it.pop("llm_fallback", None)
+    summarizer.enrich_item_it(it, cfg, "translate")
+    summarizer.enrich_item_it(it, cfg, "summary")
+    return it
+
+def is_enriched_it(it: Dict[str, Any]) -> bool:
+    """Riassunto IT presente e non di ripiego (gli item con llm_fallback tornano al modello con only_missing)."""
+    return "summary_it" in it and not it.get("llm_fallback")
+
+def enrich_selection_it(summarizer: "MacroSummarizer", selection_items: List[Dict[str, Any]], cfg: Config,
+                        delay_s: float = 0.5, on_item=None, should_stop=None,
+                        workers: int = 1, only_missing: bool = False) -> int:
+    """
+    Titolo IT + riassunto IT per ogni item (in place). Ritorna il numero di item completati.
+    Con workers>1 gli item sono lavorati in parallelo e on_item(i, it) arriva in ordine di completamento;
+    delay_s resta l'intervallo minimo fra l'avvio di due item (levigatura del rate).
+    """
+    todo = [(i, it) for i, it in enumerate(selection_items) if not (only_missing and is_enriched_it(it))]
+    if not todo: return 0
+
+    pace_lock = threading.Lock()
+    last_start = [0.0]
+    def _task(i, it):
+        if should_stop and should_stop():
+            return None
+        # Aggiungi un piccolo delay tra le richieste (tranne la prima)
+        with pace_lock:
+            wait = last_start[0] + delay_s - time.monotonic() if last_start[0] else 0.0
+            if wait > 0: time.sleep(wait)
+            last_start[0] = time.monotonic()
+        return _enrich_one_it(summarizer, it, cfg)
+
+    done = 0
+    with tr.span("llm.enrich", items=len(todo), workers=workers):   # attesa del chiamante (pacing incluso) nello stage LLM
+        if workers <= 1:
+            for i, it in todo:
+                if _task(i, it) is None: break
+                done += 1
+                if on_item: on_item(i, it)
+            return done
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="te-enrich") as pool:
+            # ogni task gira in una copia del contesto: span/contatori finiscono nella run del chiamante
+            futs = {pool.submit(contextvars.copy_context().run, _task, i, it): i for i, it in todo}
+            for fut in as_completed(futs):
+                it = fut.result()
+                if it is None: continue
+                done += 1
+                if on_item: on_item(futs[fut], it)
+    return done
+
 # ============= Input & Main =============
 def prompt_days() -> int:
     while True:
@@ -1022,9 +1583,14 @@ def get_or_prompt_anthropic_key(cfg: Config) -> str:
         logging.warning("Impossibile salvare .env: %s", e)
     return key
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    ap = argparse.ArgumentParser(description="TE Macro Agent (CLI interattiva)")
+    ap.add_argument("--profile", action="store_true", help="profilo della run (speedscope + hotspot in OUTPUT_DIR)")
+    args = ap.parse_args(argv)
     setup_logging(logging.INFO)
     cfg = Config()
+    if args.profile: cfg.PROFILE = True
     print("="*100)
     print("🏦 TE Macro Agent – ES 60gg (invariato) | Delta Mode (DB) + Selezione con Fill-Up")
     print("="*100)
@@ -1042,47 +1608,37 @@ def main():
     chosen_countries = ["Euro Area" if x=="European Union" else x for x in chosen_countries]
     print(f"\n▶ Contesto ES: {cfg.CONTEXT_DAYS} giorni | Selezione: {selection_days} giorni | Paesi: {', '.join(chosen_countries)}")
 
-    scraper = TEStreamScraper(cfg)
-
-    # ==== Pipeline dati con DB (Delta Mode) ====
-    items_ctx: List[Dict[str, Any]] = []
-    if cfg.DELTA_MODE:
-        conn = db_init(cfg.DB_PATH)
-
-        warm, fresh = [], []
-        for c in chosen_countries:
-            cnt = db_count_by_country(conn, c)
-            (warm if cnt >= cfg.WARMUP_NEW_COUNTRY_MIN else fresh).append(c)
-
-        items_new = []
-        if fresh:
-            logging.info("Warm-up paesi nuovi (<=%sgg): %                    s", cfg.CONTEXT_DAYS, ", ".join(fresh))
-            items_new += scraper.scrape_30d(fresh, max_days=cfg.CONTEXT_DAYS)
-        if warm:
-            logging.info("Delta scrape paesi noti (<=%sgg): %s", cfg.SCRAPE_HORIZON_DAYS, ", ".join(warm))
-            items_new += scraper.scrape_30d(warm, max_days=min(cfg.SCRAPE_HORIZON_DAYS, cfg.CONTEXT_DAYS))
-
-        if items_new:
-            db_upsert(conn, items_new)
-            db_prune(conn, max_age_days=cfg.PRUNE_DAYS)
+    from te_profile import maybe_profile
+    with tr.run("cli", countries=",".join(chosen_countries), days=selection_days) as trace, maybe_profile(cfg) as prof:
+        out_path, items_ctx, selection_items = _run_cli_pipeline(cfg, chosen_countries, selection_days)
+    if cfg.TRACE_EXPORT and out_path:
+        paths = trace.export(str(Path(cfg.OUTPUT_DIR) / "traces"), Path(out_path).stem)
+        logging.info("Trace salvato: %s", paths["json"])
+    if prof is not None and out_path:
+        paths = prof.write(cfg.OUTPUT_DIR, Path(out_path).stem, cfg.PROFILE_TOP_N)
+        logging.info("Profilo salvato: %s (%s)", paths["speedscope"], paths["hotspots"])
+    if not out_path:
+        return
 
-        items_ctx = db_load_recent(conn, chosen_countries, max_age_days=cfg.CONTEXT_DAYS)
+    print("\n" + "="*80)
+    print("✅ COMPLETATO")
+    print("="*80)
+    print(f"• Report salvato in: {out_path}")
+    print(f"• Notizie totali (DB, ultimi {cfg.CONTEXT_DAYS} gg): {len(items_ctx)}")
+    print(f"• Notizie selezionate (ultimi {selection_days} gg + fill-up): {len(selection_items)}")
+    for row in trace.stage_breakdown()[:12]:
+        print(f"  ⏱ {row['stage']:<28} {row['total_ms']:>10.1f} ms  ×{row['calls']}")
 
-        # fallback: base scarsa → scrape completo finestra ES
-        if len(items_ctx) < 20:
-            logging.info("Base DB scarsa (%d). Fallback scrape <=%sgg per tutti i paesi scelti.", len(items_ctx), cfg.CONTEXT_DAYS)
-            items_all = scraper.scrape_30d(chosen_countries, max_days=cfg.CONTEXT_DAYS)
-            if items_all:
-                db_upsert(conn, items_all)
-                items_ctx = db_load_recent(conn, chosen_countries, max_age_days=cfg.CONTEXT_DAYS)
-    else:
-        items_ctx = scraper.scrape_30d(chosen_countries, max_days=cfg.CONTEXT_DAYS)
+def _run_cli_pipeline(cfg: Config, chosen_countries: List[str], selection_days: int):
+    # ==== Pipeline dati con DB (Delta Mode) ====
+    items_ctx = load_context_items(cfg, chosen_countries)
 
     if not items_ctx:
         print("\n❌ Nessuna notizia disponibile (entro la finestra).")
-        return
+        return None, items_ctx, []
 
     # ==== ES (60gg) – invariato (solo fix "%") ====
+    from te_summarizer import MacroSummarizer
     summarizer = MacroSummarizer(cfg.ANTHROPIC_API_KEY, cfg.MODEL, cfg.MODEL_TEMP, cfg.MAX_TOKENS)
     es_text = summarizer.executive_summary(items_ctx, cfg, chosen_countries)
 
@@ -1090,34 +1646,13 @@ def main():
     selection_items = build_selection(items_ctx, selection_days, cfg, expand1_days=10, expand2_days=30)
 
     # ==== Traduzione titoli + riassunti IT con delay tra le chiamate ====
-    for i, it in enumerate(selection_items):
-        # Aggiungi un piccolo delay tra le richieste (tranne la prima)
-        if i > 0:
-            time.sleep(0.5)  # Pausa di 500ms tra una richiesta e l'altra
-        
-        try:
-            it["title_it"] = summarizer.translate_it(it.get("title", ""), cfg)
-        except Exception as e:
-            logging.warning("Titolo non tradotto: %s", e)
-            it["title_it"] = it.get("title", "")
-        
-        try:
-            it["summary_it"] = summarizer.summarize_item_it(it, cfg)
-        except Exception as e:
-            logging.warning("Riassunto IT non disponibile: %s", e)
-            it["summary_it"] = (it.get("description","") or "")
+    enrich_selection_it(summarizer, selection_items, cfg, delay_s=0.5, workers=cfg.ENRICH_WORKERS)
 
     # ==== Report ====
     ts = datetime.now().strftime("%Y%m%d_%H%M")
     filename = f"MacroAnalysis_AutoSelect_{selection_days}days_{ts}.docx"
     out_path = save_report(filename, es_text, selection_items, chosen_countries, selection_days, len(items_ctx), cfg.OUTPUT_DIR)
-
-    print("\n" + "="*80)
-    print("✅ COMPLETATO")
-    print("="*80)
-    print(f"• Report salvato in: {out_path}")
-    print(f"• Notizie totali (DB, ultimi {cfg.CONTEXT_DAYS} gg): {len(items_ctx)}")
-    print(f"• Notizie selezionate (ultimi {selection_days} gg + fill-up): {len(selection_items)}")
+    return out_path, items_ctx, selection_items
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,210 @@
+# te_numeric.py — estrazione strutturata dei valori dalle descrizioni TE (all'ingest, senza LLM)
+# - Prima frase della descrizione: verbo di variazione/livello -> valore attuale (livello "to/at X", variazione "by X"),
+#   precedente ("from X", "after a revised X fall", "vs X"), consenso ("market expectations of X"), periodo, base
+#   (mom/yoy/qoq/wow), unità e direzione
+# - Indicatore: nome del dizionario di te_headlines in testa al titolo (alias unificati), altrimenti il soggetto della frase
+# - Record salvati in te_values (db_upsert, chiave = fingerprint dell'item); query con db_latest_values
+# - format_values_table: tabella compatta per paese dell'ES (Config.ES_INPUT_MODE="table")
+# Uso: python te_numeric.py [--db news_cache.sqlite] [--countries "United States"] [--indicator "Inflation Rate"] [--basis yoy]
+
+import argparse, re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from te_headlines import COUNTRIES_IT, match_indicator
+
+# stesso indicatore con nomi diversi nei titoli TE
+INDICATOR_ALIASES = {
+    "Annual Inflation Rate": "Inflation Rate", "Jobless Rate": "Unemployment Rate", "Nonfarm Payrolls": "Non Farm Payrolls",
+    "Home Prices": "House Prices", "Crude Inventories": "Crude Oil Inventories", "Crude Oil Stocks": "Crude Oil Inventories",
+    "Crude Stocks": "Crude Oil Inventories", "Gasoline Stocks": "Gasoline Inventories", "GDP Growth Rate": "GDP Growth",
+    "Industrial Output": "Industrial Production", "Homebuilder Sentiment": "Homebuilder Confidence",
+    "Natural Gas Storage": "Natural Gas Stocks", "Natural Gas Stockpiles": "Natural Gas Stocks",
+    "UMich Consumer Sentiment": "Michigan Consumer Sentiment", "UMich Consumer Confidence": "Michigan Consumer Sentiment",
+    "Initial Unemployment Claims": "Initial Jobless Claims", "Unemployment Claims": "Jobless Claims",
+    "10-Year Treasury Yield": "10-Year Yield", "Manufacturing Production": "Manufacturing Output",
+    "Services Sector": "Service Sector", "Factory Activity": "Manufacturing Activity",
+}
+
+_NUM = (r"(?P<{p}neg>[-−])?(?P<{p}cur>\$|USD ?|€|EUR ?|£)?(?P<{p}num>\d{{1,3}}(?:,\d{{3}})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+        r"(?!\d|st\b|nd\b|rd\b|th\b)(?:(?:\s?|-)(?P<{p}unit>%|percent\b|bps\b|basis points\b|trillion\b|billion\b|million\b|"
+        r"thousand\b|bcf\b|points?\b|k\b))?")
+def _num(prefix: str) -> str:
+    return _NUM.format(p=prefix)
+
+_UP = (r"rose|increased|climbed|jumped|surged|soared|advanced|grew|expanded|went up|ticked up|edged up|inched up|"
+       r"moved up|picked up|accelerated|rebounded|gained|added|widened|spiked|rallied")
+_DOWN = (r"fell|decreased|declined|dropped|eased|slipped|contracted|shrank|slowed|edged down|ticked down|inched down|"
+         r"moved down|plunged|tumbled|slumped|sank|sunk|retreated|dipped|cooled|decelerated|narrowed|slid|plummeted")
+_FLAT = (r"held steady|held|was unchanged|remained unchanged|remained|stood|came in|was little changed|was|"
+         r"steadied|stayed|stabilized|hovered|registered|reached|hit")
+_VERB_RX = re.compile(rf"\b(?P<up>{_UP})\b|\b(?P<down>{_DOWN})\b|\b(?P<flat>{_FLAT})\b", re.I)
+_BY_RX = re.compile(r"\s+(?:by\s+)?(?:an?\s+|a\s+further\s+)?" + _num(""), re.I)
+_TO_RX = re.compile(r"\b(?:to|at|near|around|above|below)\s+(?:the\s+|an?\s+)?"
+                    r"(?:(?!expectations|forecasts?|estimates|consensus|upwardly|downwardly|revised)[\w-]+\s+){0,5}?(?:of\s+)?" + _num("") +
+                    r"(?=[\s,;.)]|$)", re.I)
+_PREV_RXS = [re.compile(rx, re.I) for rx in (
+    r"\bfrom\s+(?:an?\s+|the\s+)?(?:upwardly\s+|downwardly\s+)?(?:revised\s+)?(?:[^\s\d]+\s+){0,3}?(?:of\s+)?" + _num(""),
+    r"\bafter\s+(?:holding|standing|remaining|rising|falling|increasing|declining|easing|being)\s+(?:at\s+|to\s+|by\s+)?"
+    r"(?:an?\s+)?(?:upwardly\s+|downwardly\s+)?(?:revised\s+)?" + _num(""),
+    r"\bafter\s+(?:an?\s+|the\s+)?(?:upwardly\s+|downwardly\s+)?(?:revised\s+)?" + _num("") +
+    r"(?:[- ]barrels?)?\s+(?P<pw>rise|increase|gain|advance|growth|expansion|build|fall|decrease|decline|drop|contraction|draw)",
+    r"\b(?:trimming|following|reversing)\s+(?:an?\s+|the\s+)?(?:upwardly\s+|downwardly\s+)?(?:revised\s+)?" + _num("") +
+    r"(?:[- ]barrels?)?(?:\s+(?P<pw>rise|increase|gain|advance|growth|expansion|build|fall|decrease|decline|drop|contraction|draw))?",
+    r"\b(?:below|above|under|over)\s+(?:an?\s+|the\s+)?(?:upwardly\s+|downwardly\s+)?revised\s+" + _num(""),
+    r"\b(?:compared (?:to|with)|vs\.?|versus)\s+(?:an?\s+|the\s+)?(?:upwardly\s+|downwardly\s+)?(?:revised\s+)?" + _num(""),
+)]
+_CONS_RX = re.compile(
+    r"\b(?:(?:market|analysts?'?)\s+(?:expectations|forecasts?|consensus|estimates)|expectations|forecasts?|consensus)"
+    r"\s+(?:of|for|at)?\s*(?:an?\s+)?(?:[a-z-]+\s+)?" + _num("") +
+    r"(?:[- ]barrels?)?\s*(?P<cw>increase|rise|gain|build|decrease|decline|drop|fall|draw)?", re.I)
+_GENERIC = {"Economy"}
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+           "November", "December")
+_MON = "|".join(_MONTHS)
+_PERIOD_RX = re.compile(
+    rf"\b(?:in|for|on|during)\s+(?:the\s+)?(?:"
+    rf"(?:week|period)\s+(?:ending|ended)\s+(?P<wk>(?:{_MON})\s+\d{{1,2}})(?:st|nd|rd|th)?|"
+    rf"(?P<qw>first|second|third|fourth)\s+quarter(?:\s+of)?(?:\s+(?P<qy>\d{{4}}))?|"
+    rf"(?P<q>Q[1-4])(?:\s+(?:of\s+)?(?P<qy2>\d{{4}}))?|"
+    rf"(?:\w+\s+week\s+of\s+)?(?P<mon>{_MON})(?:\s+of)?(?:\s+(?P<my>\d{{4}}))?)\b", re.I)
+_BASIS = (("mom", r"month-over-month|month-on-month|from the previous month|from a month earlier|\bmom\b|\bm/m\b|monthly"),
+          ("yoy", r"year-on-year|year-over-year|from a year earlier|from the same (?:month|period|quarter) (?:a|of the previous|of last|last) year|\byoy\b|\by/y\b|\bannual\b"),
+          ("qoq", r"quarter-on-quarter|quarter-over-quarter|from the previous quarter|\bqoq\b|\bq/q\b|annualized (?:growth|pace)"),
+          ("wow", r"from the previous week|week-over-week|\bweekly\b"))
+_BASIS_RX = [(b, re.compile(rx, re.I)) for b, rx in _BASIS]
+_QUART = {"first": "Q1", "second": "Q2", "third": "Q3", "fourth": "Q4"}
+_UNITS = {"%": "%", "percent": "%", "bps": "bps", "basis points": "bps", "trillion": "tn", "billion": "bn",
+          "million": "mn", "thousand": "k", "k": "k", "bcf": "bcf", "point": "pts", "points": "pts"}
+_COUNTRY_PAT = "|".join(re.escape(c) for c in sorted(COUNTRIES_IT, key=len, reverse=True))
+_SUBJ_STRIP = [re.compile(rx, re.I) for rx in (
+    rf"\s+(?:in|for|of)\s+(?:the\s+)?(?:{_COUNTRY_PAT})\b", rf"^(?:the\s+)?(?:{_COUNTRY_PAT})(?:-based)?\s+", r"^the\s+")]
+_REVISION_RX = re.compile(r"^\s+(?:fewer|more|less)\b", re.I)   # "added 911K fewer jobs": revisione, non un dato
+_PREVIEW_RX = re.compile(r"\b(?:expected|forecast|projected|set|likely|seen|poised)\s+to\b|\bwill\b|\bwould\b", re.I)
+_SENT_RX = re.compile(r"(?<![A-Z]\.[A-Z])(?<!\bvs)\.(?=\s+[A-Z“\"])")
+
+def _value(m, p: str = "") -> Tuple[float, str]:
+    v = float(m.group(p + "num").replace(",", ""))
+    if m.group(p + "neg"): v = -v
+    unit = _UNITS.get((m.group(p + "unit") or "").lower(), "")
+    if m.group(p + "cur"): unit = ("USD " if "$" in m.group(p + "cur") or "USD" in m.group(p + "cur") else
+                                   "EUR " if "€" in m.group(p + "cur") or "EUR" in m.group(p + "cur") else "GBP ") + unit
+    return v, unit.strip()
+
+def _sign(word: Optional[str]) -> int:
+    return -1 if (word or "").lower() in ("fall", "decrease", "decline", "drop", "contraction", "draw") else 1
+
+def _first_sentence(desc: str) -> str:
+    return _SENT_RX.split(re.sub(r"\s+", " ", desc or "").strip(), maxsplit=1)[0]
+
+def _indicator(title: str, subject: str) -> str:
+    # titolo o soggetto della frase; nomi generici solo in mancanza d'altro ("US Economy Adds 22K Jobs": payrolls)
+    names = [n for n in (match_indicator(title), match_indicator(re.sub(r"^the\s+", "", subject.strip(), flags=re.I))) if n]
+    name = next((n for n in names if n not in _GENERIC), names[0] if names else None)
+    if name: return INDICATOR_ALIASES.get(name, name)
+    for rx in _SUBJ_STRIP: subject = rx.sub(" " if rx.pattern.startswith(r"\s") else "", subject).strip()
+    subject = re.sub(r"\s+", " ", subject).strip(" ,’'")
+    return (subject[:1].upper() + subject[1:])[:60] if 2 < len(subject) <= 80 else ""
+
+_SINCE_RX = re.compile(r"\b(?:since|the (?:highest|lowest|sharpest|strongest|weakest|biggest|largest|fastest))\b", re.I)
+
+def _period(s: str) -> str:
+    m = _PERIOD_RX.search(_SINCE_RX.split(s, maxsplit=1)[0])   # "since March 2020" non è il periodo del dato
+    if not m: return ""
+    if m.group("wk"): return "week ending " + m.group("wk")[:3].title() + m.group("wk")[m.group("wk").index(" "):]
+    if m.group("qw"): return " ".join(x for x in (_QUART[m.group("qw").lower()], m.group("qy")) if x)
+    if m.group("q"): return " ".join(x for x in (m.group("q").upper(), m.group("qy2")) if x)
+    return " ".join(x for x in (m.group("mon")[:3].title(), m.group("my")) if x)
+
+def extract_values(title: str, description: str) -> Optional[Dict[str, Any]]:
+    """
+    Record {indicator, period, basis, actual, change, change_unit, previous, consensus, unit, direction} o None se la
+    prima frase non riporta un dato pubblicato. actual è il livello ("to X") se c'è, altrimenti la variazione ("by X").
+    """
+    s = _first_sentence(description)
+    if not s: return None
+    vm = _VERB_RX.search(s)
+    if not vm or vm.start() == 0 or _PREVIEW_RX.search(s[:vm.end()]): return None   # anteprime: nessun dato pubblicato
+    rest = s[vm.end():]
+    direction = 1 if vm.group("up") else -1 if vm.group("down") else 0
+    by = _BY_RX.match(rest)
+    to = _TO_RX.search(re.split(r"[,;]", rest[:160], maxsplit=1)[0])   # livello nella stessa proposizione del verbo
+    if by and to and by.start("num") == to.start("num"): by = None   # "rose to 54.5": livello, non variazione
+    if by and _REVISION_RX.match(rest[by.end():]): return None
+    if to and not to.group("unit") and not to.group("cur") and re.fullmatch(r"(?:19|20)\d\d", to.group("num")):
+        to = None   # "since at least 2000": anno, non livello
+    if to is None and by is None: return None
+    change, actual, change_unit, unit = None, None, "", ""
+    if by is not None:
+        change, change_unit = _value(by)
+        if direction < 0 and change > 0: change = -change
+    if to is not None:
+        actual, unit = _value(to)
+    else:
+        actual, unit = change, change_unit
+    indicator = _indicator(title, s[:vm.start()])
+    if not indicator: return None
+    tail_from = (to.end() if to is not None else by.end())
+    tail = rest[tail_from:]
+    previous = None
+    best = None
+    for rx in _PREV_RXS:
+        m = rx.search(tail)
+        if m and (best is None or m.start() < best.start()): best = m
+    if best is not None:
+        previous, pu = _value(best)
+        if "pw" in best.re.groupindex and best.group("pw") and to is None and previous > 0:
+            previous *= _sign(best.group("pw"))
+        if pu != unit: previous = None   # es. livello attuale e variazione precedente: non confrontabili
+    consensus = None
+    cm = _CONS_RX.search(s)
+    if cm:
+        consensus, cu = _value(cm)
+        if cm.group("cw") and to is None and consensus > 0: consensus *= _sign(cm.group("cw"))
+        if cu != unit: consensus = None
+    basis = next((b for b, rx in _BASIS_RX if rx.search(s[:vm.end() + 120])), "")
+    if direction == 0 and previous is not None and actual is not None and to is not None:
+        direction = (actual > previous) - (actual < previous)
+    return {"indicator": indicator, "period": _period(s[vm.start():]) or _period(s), "basis": basis,
+            "actual": actual, "change": change, "change_unit": change_unit, "previous": previous,
+            "consensus": consensus, "unit": unit, "direction": direction}
+
+# ============= Tabella compatta per l'ES =============
+def _fmt(v: Optional[float], unit: str) -> str:
+    if v is None: return "–"
+    s = f"{v:,.3f}".rstrip("0").rstrip(".")
+    if unit == "%": return s + "%"
+    return f"{s} {unit}".strip()
+
+def format_values_table(rows: Iterable[Tuple[str, Dict[str, Any]]]) -> str:
+    """Righe 'indicatore | periodo | base | attuale | precedente | consenso' per paese da (paese, record)."""
+    by_country: Dict[str, List[Dict[str, Any]]] = {}
+    for country, rec in rows: by_country.setdefault(country, []).append(rec)
+    out = []
+    for country, recs in by_country.items():
+        out.append(f"{country} — indicatore | periodo | base | attuale | precedente | consenso")
+        for r in recs:
+            chg = f" ({'+' if r['change'] > 0 else ''}{_fmt(r['change'], r.get('change_unit') or '')})" \
+                if r.get("change") is not None and r["actual"] != r["change"] else ""
+            out.append(f"{r['indicator']} | {r['period'] or '–'} | {r['basis'] or '–'} | {_fmt(r['actual'], r['unit'])}{chg} | "
+                       f"{_fmt(r['previous'], r['unit'])} | {_fmt(r['consensus'], r['unit'])}")
+    return "\n".join(out)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import te_macro_agent_final_multi as ag
+    ap = argparse.ArgumentParser(description="Ultimi valori estratti per paese/indicatore (te_values)")
+    ap.add_argument("--db", default=ag.Config.DB_PATH)
+    ap.add_argument("--countries", default="", help="paesi separati da virgola (default: tutti)")
+    ap.add_argument("--indicator", default="")
+    ap.add_argument("--basis", default=None, help="mom | yoy | qoq | wow | '' (livello)")
+    args = ap.parse_args(argv)
+    conn = ag.db_connect_ro(args.db)
+    try:
+        countries = [ag.normalize_country(c.strip()) for c in args.countries.split(",") if c.strip()] or None
+        rows = ag.db_latest_values(conn, countries, indicator=args.indicator or None, basis=args.basis)
+    finally:
+        conn.close()
+    print(format_values_table((r["country"], r) for r in rows) or "Nessun valore.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,220 @@
+# te_prefetch.py — prefetch speculativo della UI: contesto e selezione pronti prima del click su "Esegui pipeline"
+# - request(sessione, cfg, paesi, giorni) a ogni cambio della scelta: debounce per sessione (PREFETCH_DEBOUNCE_S);
+#   una scelta nuova annulla quella precedente della stessa sessione (timer o prefetch in corso, al confine di stadio)
+# - Al più PREFETCH_CONCURRENCY prefetch attivi nel processo; quelli in attesa restano annullabili
+# - Stadi: freschezza/delta scrape dei soli paesi non aggiornati di recente (load_context_items, scritture via
+#   te_writer), contesto dal DB, selezioni per tutte le finestre 1–30gg (build_selection_sweep), lookup dei testi IT
+#   nella cache LLM (llm_cache)
+# - Cambio dei soli giorni con selezioni pronte: nessun nuovo prefetch, peek() dà subito la selezione della finestra
+# - take(): il job riusa contesto e selezione se il DB non è cambiato (data_version) e il prefetch è entro PREFETCH_TTL_S
+
+import logging, sqlite3, threading, time, contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any, Tuple
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+
+MAX_ENTRIES = 4   # contesti tenuti in memoria (LRU per insieme di paesi)
+
+class PrefetchCancelled(Exception):
+    pass
+
+@dataclass
+class Prefetch:
+    countries: Tuple[str, ...]
+    data_version: int
+    ts: float
+    items_ctx: List[Dict[str, Any]] = field(repr=False)
+    selections: Dict[int, List[Dict[str, Any]]] = field(default_factory=dict, repr=False)   # giorni -> selezione (item condivisi)
+    llm_hits: int = 0
+
+@dataclass
+class _Task:
+    session: str
+    cfg: "ag.Config"
+    countries: Tuple[str, ...]
+    days: int
+    cancel: threading.Event = field(default_factory=threading.Event)
+    timer: Optional[threading.Timer] = None
+    state: str = "pending"           # pending | queued | running | ready | cancelled | error
+    error: str = ""
+
+def _key(cfg: "ag.Config", countries) -> Tuple[str, Tuple[str, ...]]:
+    return cfg.DB_PATH, tuple(sorted(countries))
+
+def _data_version(cfg: "ag.Config") -> int:
+    conn = ag.db_connect_ro(cfg.DB_PATH)
+    try: return ag.db_data_version(conn)
+    finally: conn.close()
+
+def lookup_llm_cache(cfg: "ag.Config", items: List[Dict[str, Any]]) -> int:
+    """Copia negli item titolo/riassunto IT già in llm_cache (stesso modello); ritorna gli hit. Sola lettura."""
+    keys: Dict[str, List[Dict[str, Any]]] = {}
+    for it in items: keys.setdefault(ag._fp(it), []).append(it)
+    if not keys: return 0
+    conn = ag.db_connect_ro(cfg.DB_PATH)
+    try:
+        hits, ks = 0, list(keys)
+        for i in range(0, len(ks), 500):
+            chunk = ks[i:i+500]
+            qs = ",".join("?" * len(chunk))
+            try:
+                rows = conn.execute(f"SELECT key,title_it,summary_it FROM llm_cache WHERE model=? AND key IN ({qs})",
+                                    [ag.llm_cache_model(cfg), *chunk]).fetchall()
+            except sqlite3.OperationalError:
+                return 0   # DB creato da una versione senza llm_cache e non ancora migrato
+            for k, t, s in rows:
+                if t and s:
+                    for it in keys[k]: it.update(title_it=t, summary_it=s)
+                    hits += 1
+        return hits
+    finally:
+        conn.close()
+
+class PrefetchManager:
+    """Prefetch per sessione, condiviso nel processo (st.cache_resource). Metodi thread-safe."""
+    def __init__(self, max_concurrent: int = 1, debounce_s: float = 1.5, ttl_s: int = 300):
+        self.debounce_s = float(debounce_s)
+        self.ttl_s = int(ttl_s)
+        self.stats = {"requested": 0, "started": 0, "ready": 0, "cancelled": 0, "reused": 0, "stale": 0}
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, _Task] = {}
+        self._entries: "OrderedDict[Tuple[str, Tuple[str, ...]], Prefetch]" = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_concurrent)), thread_name_prefix="te-prefetch")
+
+    # ---- API ----
+    def request(self, session: str, cfg: "ag.Config", countries: List[str], days: int) -> str:
+        """Nuova scelta della sessione: riparte il debounce; stessa scelta già in corso o pronta → nulla."""
+        countries_t, days = tuple(sorted(countries)), int(days)
+        with self._lock:
+            cur = self._tasks.get(session)
+            if cur is not None and cur.countries == countries_t:
+                e = self._entries.get(_key(cfg, countries_t))
+                fresh = e is not None and time.time() - e.ts <= self.ttl_s
+                if cur.state == "ready" and fresh and days in e.selections:
+                    cur.days = days   # solo i giorni cambiati: selezione già nella sweep
+                    return cur.state
+                if cur.days == days and (cur.state in ("pending", "queued", "running") or (cur.state == "ready" and fresh)):
+                    return cur.state
+            if cur is not None: self._cancel(cur)
+            if not countries_t: return "idle"
+            self.stats["requested"] += 1
+            task = self._tasks[session] = _Task(session, cfg, countries_t, days)
+            task.timer = threading.Timer(self.debounce_s, self._enqueue, args=(task,))
+            task.timer.daemon = True
+            task.timer.start()
+            return task.state
+
+    def cancel(self, session: str):
+        with self._lock:
+            cur = self._tasks.pop(session, None)
+            if cur is not None: self._cancel(cur)
+
+    def status(self, session: str) -> Dict[str, Any]:
+        with self._lock:
+            t = self._tasks.get(session)
+            if t is None: return {"state": "idle"}
+            e = self._entries.get(_key(t.cfg, t.countries))
+            out = {"state": t.state, "countries": list(t.countries), "days": t.days, "error": t.error}
+            if t.state == "ready" and e is not None:
+                out.update(age_s=time.time() - e.ts, context=len(e.items_ctx), llm_hits=e.llm_hits,
+                           selection=len(e.selections.get(t.days, ())))
+            return out
+
+    def peek(self, cfg: "ag.Config", countries: List[str], days: int) -> Optional[List[Dict[str, Any]]]:
+        """Selezione prefetchata per la finestra (sola lettura, senza verificare la data_version), o None."""
+        with self._lock:
+            e = self._entries.get(_key(cfg, countries))
+            if e is None or time.time() - e.ts > self.ttl_s: return None
+            return e.selections.get(int(days))
+
+    def take(self, cfg: "ag.Config", countries: List[str], days: int) -> Optional[Tuple[List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]]:
+        """
+        (contesto, selezione) prefetchati se ancora validi, altrimenti None. La selezione (se c'è per quei giorni)
+        è una copia degli item della sweep, modificabile dal chiamante; il contesto resta condiviso (sola lettura).
+        """
+        key = _key(cfg, countries)
+        with self._lock:
+            e = self._entries.get(key)
+        if e is None: return None
+        try: dv = _data_version(cfg)
+        except Exception: dv = -1
+        with self._lock:
+            if self._entries.get(key) is not e: return None
+            if dv != e.data_version or time.time() - e.ts > self.ttl_s:
+                del self._entries[key]; self.stats["stale"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["reused"] += 1
+            sel = e.selections.get(int(days))
+            return e.items_ctx, None if sel is None else [it.copy() for it in sel]
+
+    def shutdown(self):
+        with self._lock:
+            for t in self._tasks.values(): self._cancel(t)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---- interni ----
+    def _cancel(self, task: _Task):
+        task.cancel.set()
+        if task.timer is not None: task.timer.cancel()
+        if task.state in ("pending", "queued", "running"):
+            task.state = "cancelled"; self.stats["cancelled"] += 1
+
+    def _enqueue(self, task: _Task):
+        with self._lock:
+            if task.cancel.is_set(): return
+            task.state = "queued"
+        self._pool.submit(contextvars.copy_context().run, self._run, task)
+
+    def _check(self, task: _Task):
+        if task.cancel.is_set(): raise PrefetchCancelled()
+
+    def _run(self, task: _Task):
+        with self._lock:
+            if task.cancel.is_set(): return
+            task.state = "running"; self.stats["started"] += 1
+        cfg, key = task.cfg, _key(task.cfg, task.countries)
+        t0, sweep, hits = time.perf_counter(), None, 0
+        try:
+            with tr.run("prefetch", countries=",".join(task.countries), days=task.days):
+                entry = self._valid_entry(key, cfg)
+                if entry is None:
+                    self._check(task)
+                    items_ctx = ag.load_context_items(cfg, list(task.countries))   # freschezza + delta scrape + DB
+                    self._check(task)
+                    entry = Prefetch(task.countries, _data_version(cfg), time.time(), items_ctx)
+                if task.days not in entry.selections and entry.items_ctx:
+                    self._check(task)
+                    sweep = ag.build_selection_sweep(entry.items_ctx, cfg, range(1, 31), expand1_days=10, expand2_days=30)
+                    self._check(task)
+                    union = list({id(it): it for sel in sweep.values() for it in sel}.values())
+                    with tr.span("prefetch.llm_cache", items=len(union)) as sp:
+                        hits = lookup_llm_cache(cfg, union)
+                        sp.set(hits=hits)
+            with self._lock:
+                if sweep is not None:
+                    entry.selections = sweep; entry.llm_hits = hits
+                self._entries[key] = entry; self._entries.move_to_end(key)
+                while len(self._entries) > MAX_ENTRIES: self._entries.popitem(last=False)
+                if not task.cancel.is_set():
+                    task.state = "ready"; self.stats["ready"] += 1
+            logging.info("Prefetch pronto: %s, %dgg, contesto=%d, cache LLM=%d (%.0f ms)", ",".join(task.countries),
+                         task.days, len(entry.items_ctx), entry.llm_hits, (time.perf_counter() - t0) * 1000)
+        except PrefetchCancelled:
+            logging.info("Prefetch annullato: %s", ",".join(task.countries))
+        except Exception as e:
+            logging.warning("Prefetch fallito (%s): %s", ",".join(task.countries), e)
+            with self._lock:
+                task.state, task.error = "error", str(e)
+
+    def _valid_entry(self, key, cfg: "ag.Config") -> Optional[Prefetch]:
+        """Entry riusabile per un'altra scelta di giorni (o da un'altra sessione con gli stessi paesi)."""
+        with self._lock:
+            e = self._entries.get(key)
+        if e is None or time.time() - e.ts > self.ttl_s: return None
+        try: return e if _data_version(cfg) == e.data_version else None
+        except Exception: return None
@@ -0,0 +1,221 @@
+# te_profile.py — profilo opzionale di una run: campionatore a bassa frequenza + cProfile del thread della pipeline
+# - Attivo con Config.PROFILE, variabile d'ambiente TE_PROFILE=1, `--profile` da CLI o toggle nella UI
+# - Campionatore: sys._current_frames() ogni PROFILE_INTERVAL_MS sui soli thread che lavorano per la run
+#   (stage pubblicati da te_trace); ogni campione ha in radice lo stage (scrape/db/selection/llm/render) e lo span
+#   aperto, in foglia "[attesa]" se il thread non ha usato CPU (clock CPU per thread: I/O, lock, GIL, sleep)
+# - cProfile sul thread della pipeline per il dettaglio delle funzioni CPU (regex, SequenceMatcher, dateutil, docx)
+# - Output accanto al DOCX in OUTPUT_DIR: <stem>.speedscope.json (https://www.speedscope.app), <stem>.hotspots.txt
+#   (tempo per stage CPU/attesa, top-N funzioni campionate e cProfile), <stem>.pstats
+# Uso: python te_profile.py <file.speedscope.json> [--top 30]   # riepilogo di un profilo salvato
+
+import argparse, cProfile, io, json, logging, os, pstats, sys, threading, time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import te_trace as tr
+
+# prefisso dello span -> stage del profilo
+STAGE_PREFIXES = (
+    ("scrape", "scrape"), ("archive", "scrape"), ("live_tail", "scrape"),
+    ("db", "db"), ("cold", "db"), ("batch.context", "db"),
+    ("selection", "selection"), ("batch.selection", "selection"),
+    ("llm", "llm"), ("batch.llm", "llm"), ("prefetch.llm_cache", "llm"),
+    ("report", "render"), ("batch.render", "render"),
+)
+OFF_CPU = "[attesa]"
+MAX_DEPTH = 128
+
+def profiling_enabled(cfg) -> bool:
+    return bool(getattr(cfg, "PROFILE", False)) or os.getenv("TE_PROFILE", "") not in ("", "0", "false")
+
+def stage_of(span_name: str) -> str:
+    for prefix, stage in STAGE_PREFIXES:
+        if span_name == prefix or span_name.startswith(prefix + "."): return stage
+    return "altro"
+
+def _cpu_clock(ident: int):
+    try: return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError): return None   # non Unix o thread già terminato
+
+class RunProfiler:
+    """Campionatore + cProfile attorno a una run di te_trace (start/stop dal thread della pipeline)."""
+    def __init__(self, interval_s: float = 0.01, cprofile: bool = True):
+        self.interval_s = interval_s
+        self.frames: List[Tuple[str, str, int]] = []         # (funzione, file, riga) condivisi nello speedscope
+        self._frame_ids: Dict[Tuple[str, str, int], int] = {}
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}   # thread -> [(stack di id frame, peso s)]
+        self.thread_names: Dict[int, str] = {}
+        self.stage_s: Dict[str, List[float]] = {}             # stage -> [wall s, cpu s, attesa s]
+        self.self_s: Counter = Counter()                      # (frame id, stage) -> s in foglia
+        self.self_cpu_s: Counter = Counter()
+        self.n_samples = 0
+        self.wall_s = 0.0
+        self._run: Optional["tr.TraceRun"] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cprof = cProfile.Profile() if cprofile else None
+        self._t0 = 0.0
+
+    # ---- ciclo di vita ----
+    def start(self, run: Optional["tr.TraceRun"] = None) -> "RunProfiler":
+        self._run = run or tr.current_run()
+        tr.track_thread_stages(True)
+        tr.publish_thread_stage()
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="te-profiler")
+        self._thread.start()
+        if self._cprof is not None:
+            try: self._cprof.enable()
+            except ValueError as e:   # un altro profiler (es. un secondo job) è già attivo su questo thread
+                logging.warning("cProfile non attivo: %s", e); self._cprof = None
+        return self
+
+    def stop(self) -> "RunProfiler":
+        if self._cprof is not None: self._cprof.disable()
+        self._stop.set()
+        if self._thread is not None: self._thread.join()
+        tr.publish_thread_stage(False)
+        tr.track_thread_stages(False)
+        self.wall_s = time.perf_counter() - self._t0
+        return self
+
+    # ---- campionamento ----
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        fid = self._frame_ids.get(key)
+        if fid is None:
+            fid = self._frame_ids[key] = len(self.frames); self.frames.append(key)
+        return fid
+
+    def _stage_frame(self, name: str) -> int:
+        key = (name, "", 0)
+        fid = self._frame_ids.get(key)
+        if fid is None:
+            fid = self._frame_ids[key] = len(self.frames); self.frames.append(key)
+        return fid
+
+    def _loop(self):
+        me = threading.get_ident()
+        clocks: Dict[int, Any] = {}
+        last_cpu: Dict[int, float] = {}
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            now = time.perf_counter(); dt = now - last; last = now
+            stages = {t: name for t, (run, name) in tr.thread_stages().items()
+                      if t != me and (self._run is None or run is self._run)}
+            if not stages: continue
+            frames = sys._current_frames()
+            for tid, span_name in stages.items():
+                f = frames.get(tid)
+                if f is None: continue
+                if tid not in clocks: clocks[tid] = _cpu_clock(tid)
+                on_cpu = True
+                if clocks[tid] is not None:
+                    try:
+                        c = time.clock_gettime(clocks[tid])
+                        on_cpu = tid not in last_cpu or (c - last_cpu[tid]) >= 0.5 * dt
+                        last_cpu[tid] = c
+                    except OSError:
+                        clocks[tid] = None
+                stack = []
+                while f is not None and len(stack) < MAX_DEPTH:
+                    stack.append(self._frame_id(f.f_code)); f = f.f_back
+                stack.reverse()
+                stage = stage_of(span_name)
+                leaf = stack[-1] if stack else None
+                stack = [self._stage_frame(f"[{stage}]"), self._stage_frame(span_name), *stack]
+                if not on_cpu: stack.append(self._stage_frame(OFF_CPU))
+                self.samples.setdefault(tid, []).append((stack, dt))
+                acc = self.stage_s.setdefault(stage, [0.0, 0.0, 0.0])
+                acc[0] += dt; acc[1 if on_cpu else 2] += dt
+                if leaf is not None:
+                    self.self_s[(leaf, stage)] += dt
+                    if on_cpu: self.self_cpu_s[(leaf, stage)] += dt
+                self.n_samples += 1
+            for t in threading.enumerate():
+                if t.ident in stages: self.thread_names[t.ident] = t.name
+
+    # ---- output ----
+    def speedscope(self, name: str = "") -> Dict[str, Any]:
+        profiles = []
+        for tid, rows in self.samples.items():
+            total = sum(w for _, w in rows)
+            profiles.append({"type": "sampled", "name": self.thread_names.get(tid, str(tid)), "unit": "seconds",
+                             "startValue": 0, "endValue": total,
+                             "samples": [s for s, _ in rows], "weights": [round(w, 6) for _, w in rows]})
+        return {"$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": name or (self._run.name if self._run is not None else "te"),
+                "exporter": "te_profile", "activeProfileIndex": 0,
+                "shared": {"frames": [{"name": n, "file": f, "line": l} if f else {"name": n}
+                                      for n, f, l in self.frames]},
+                "profiles": profiles}
+
+    def hotspots(self, top_n: int = 30) -> str:
+        out = io.StringIO()
+        w = lambda s="": out.write(s + "\n")
+        w(f"Profilo {self._run.name if self._run is not None else ''} — {self.wall_s:.2f} s, {self.n_samples} campioni "
+          f"ogni {self.interval_s*1000:.0f} ms su {len(self.samples)} thread")
+        w()
+        w(f"{'stage':<10} {'thread·s':>9} {'CPU s':>8} {'attesa s':>9} {'%':>6}")
+        tot = sum(v[0] for v in self.stage_s.values()) or 1.0
+        for stage, (wall, cpu, off) in sorted(self.stage_s.items(), key=lambda kv: -kv[1][0]):
+            w(f"{stage:<10} {wall:>9.2f} {cpu:>8.2f} {off:>9.2f} {100*wall/tot:>5.1f}%")
+        w()
+        w(f"Top {top_n} funzioni in foglia (campioni):")
+        w(f"{'self s':>8} {'CPU%':>5}  {'stage':<10} funzione")
+        for (fid, stage), s in self.self_s.most_common(top_n):
+            fn, file, line = self.frames[fid]
+            cpu = 100 * self.self_cpu_s[(fid, stage)] / s if s else 0.0
+            w(f"{s:>8.3f} {cpu:>4.0f}%  {stage:<10} {fn} ({Path(file).name}:{line})")
+        if self._cprof is not None:
+            w()
+            w(f"Top {top_n} cProfile (thread della pipeline, tottime):")
+            ps = pstats.Stats(self._cprof, stream=out)
+            ps.sort_stats("tottime").print_stats(top_n)
+        return out.getvalue()
+
+    def write(self, out_dir: str, stem: str, top_n: int = 30) -> Dict[str, str]:
+        d = Path(out_dir); d.mkdir(parents=True, exist_ok=True)
+        paths = {"speedscope": str(d / f"{stem}.speedscope.json"), "hotspots": str(d / f"{stem}.hotspots.txt")}
+        Path(paths["speedscope"]).write_text(json.dumps(self.speedscope(stem)), encoding="utf-8")
+        Path(paths["hotspots"]).write_text(self.hotspots(top_n), encoding="utf-8")
+        if self._cprof is not None:
+            paths["pstats"] = str(d / f"{stem}.pstats")
+            self._cprof.dump_stats(paths["pstats"])
+        return paths
+
+@contextmanager
+def maybe_profile(cfg, enabled: Optional[bool] = None):
+    """RunProfiler attivo nel blocco (dentro tr.run) se richiesto, altrimenti None."""
+    if not (profiling_enabled(cfg) if enabled is None else enabled):
+        yield None
+        return
+    prof = RunProfiler(interval_s=getattr(cfg, "PROFILE_INTERVAL_MS", 10) / 1000.0).start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Riepilogo di un profilo speedscope di te_profile")
+    ap.add_argument("path")
+    ap.add_argument("--top", type=int, default=30)
+    args = ap.parse_args(argv)
+    doc = json.loads(Path(args.path).read_text(encoding="utf-8"))
+    frames = doc["shared"]["frames"]
+    stage, leaf = Counter(), Counter()
+    for p in doc["profiles"]:
+        for s, wgt in zip(p["samples"], p["weights"]):
+            stage[frames[s[0]]["name"] + (" " + OFF_CPU if frames[s[-1]]["name"] == OFF_CPU else "")] += wgt
+            code = [i for i in s if frames[i].get("file")]
+            if code: leaf[code[-1]] += wgt
+    for k, v in stage.most_common(): print(f"{v:>9.3f} s  {k}")
+    print()
+    for i, v in leaf.most_common(args.top):
+        f = frames[i]; print(f"{v:>9.3f} s  {f['name']} ({Path(f['file']).name}:{f.get('line', 0)})")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
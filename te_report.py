@@ -0,0 +1,178 @@
+# te_report.py — rendering del report
+# - DOCX generato in memoria (bytes); la scrittura su disco è opzionale (save_report)
+# - Blocchi per-item (titolo, riga meta, riassunto rifilato) in cache per fingerprint + hash dei campi mostrati
+# - render_many: più report in un passaggio, condividendo la cache dei blocchi
+# - Anteprima Markdown/HTML per la UI senza python-docx
+
+import hashlib, html, threading
+from copy import deepcopy
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from typing import List, Dict, Optional, Any, Tuple
+
+import te_macro_agent_final_multi as ag
+
+REPORT_TITLE = "MACRO MARKETS ANALYSIS – Selezione Automatica"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+@dataclass(frozen=True)
+class ItemBlock:
+    title: str   # senza numerazione (dipende dalla posizione nel paese)
+    meta: str    # "" se non ci sono meta
+    body: str
+
+def _block_key(it: Dict[str, Any]) -> str:
+    shown = "\x1f".join(str(x) for x in (
+        it.get("title_it") or "", it.get("summary_it") or "", it.get("time") or "",
+        it.get("category_mapped") or "", it.get("score"), it.get("importance"),
+        bool(it.get("merged_from")) and it.get("topic_sig","") == "pce",
+    ))
+    # il fingerprint copre titolo/descrizione originali, l'hash i campi IT/meta effettivamente resi
+    return ag._fp(it) + ":" + hashlib.sha1(shown.encode("utf-8", "ignore")).hexdigest()
+
+def _build_block(it: Dict[str, Any]) -> ItemBlock:
+    head_raw = it.get('title_it') or it.get('title','')
+    title = ag._fix_glued_numbers(ag._strip_translation_preambles(head_raw))
+
+    meta = []
+    if it.get('time'): meta.append(f"⏰ {it['time']}")
+    if it.get('category_mapped'): meta.append(f"🏷 {it['category_mapped']}")
+    if it.get('score') is not None: meta.append(f"⭐ {it['score']}")
+    if it.get('importance') is not None: meta.append(f"🎯 {it['importance']}")
+    if it.get('merged_from') and it.get('topic_sig','') == 'pce':
+        meta.append("🧩 pce: headline+core")
+
+    text_it = it.get('summary_it') or it.get('description','')
+    text_it = ag._fix_glued_numbers(ag._strip_translation_preambles(text_it))
+    return ItemBlock(title=title, meta="  ·  ".join(meta), body=ag.trim_words(text_it, 120))
+
+def _by_country(selection: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    by_country: Dict[str, List[Dict[str, Any]]] = {}
+    for it in selection:
+        by_country.setdefault(it.get("country","Unknown"), []).append(it)
+    return by_country
+
+def _header_lines(countries: List[str], days: int, context_count: int, generated_at: datetime) -> List[str]:
+    return [
+        f"Executive Summary basato su {context_count} notizie (DB+stream) degli ultimi 60 giorni.",
+        f"Paesi considerati (60gg): {', '.join(countries)}",
+        f"Selezione mostrata: ultimi {days} giorni (ordinata per impatto, score, recency)",
+        f"Data Report: {generated_at.strftime('%d/%m/%Y %H:%M')}",
+        "Fonte: TradingEconomics (Stream) + cache locale",
+    ]
+
+class ReportRenderer:
+    """Renderer riusabile: testo e frammenti XML dei blocchi item restano in cache fra report."""
+    def __init__(self, max_cache: int = 4096):
+        self.max_cache = max_cache
+        self._lock = threading.Lock()
+        self._blocks: Dict[str, ItemBlock] = {}
+        self._frags: Dict[str, Tuple[Any, ...]] = {}   # key -> paragrafi w:p (head, meta?, body, vuoto)
+        self._scratch = None                            # Document di appoggio per costruire i frammenti
+        self.hits = self.misses = 0
+
+    # ---- blocchi testuali ----
+    def block(self, it: Dict[str, Any]) -> Tuple[str, ItemBlock]:
+        key = _block_key(it)
+        with self._lock:
+            blk = self._blocks.get(key)
+            if blk is not None:
+                self.hits += 1
+                return key, blk
+            self.misses += 1
+        blk = _build_block(it)
+        with self._lock:
+            if len(self._blocks) >= self.max_cache:
+                self._blocks.clear(); self._frags.clear()
+            self._blocks[key] = blk
+        return key, blk
+
+    # ---- DOCX ----
+    def _fragments(self, key: str, blk: ItemBlock) -> Tuple[Any, ...]:
+        with self._lock:
+            frags = self._frags.get(key)
+            if frags is not None: return frags
+            from docx import Document
+            if self._scratch is None: self._scratch = Document()
+            paras = []
+            p = self._scratch.add_paragraph(); p.add_run(blk.title).bold = True; paras.append(p)
+            if blk.meta: paras.append(self._scratch.add_paragraph("   " + blk.meta))
+            paras.append(self._scratch.add_paragraph(blk.body))
+            paras.append(self._scratch.add_paragraph(""))
+            frags = tuple(p._p for p in paras)
+            for el in frags: el.getparent().remove(el)
+            self._frags[key] = frags
+            return frags
+
+    def render_docx(self, es_text: str, selection: List[Dict[str, Any]], countries: List[str],
+                    days: int, context_count: int, generated_at: Optional[datetime] = None) -> bytes:
+        from docx import Document
+        from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+        generated_at = generated_at or datetime.now()
+        doc = Document()
+        title = doc.add_heading(REPORT_TITLE, 0)
+        title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+        for line in _header_lines(countries, days, context_count, generated_at):
+            doc.add_paragraph(line)
+        doc.add_paragraph("_" * 60)
+
+        doc.add_heading('EXECUTIVE SUMMARY', level=1)
+        doc.add_paragraph(es_text or "(non disponibile)")
+        doc.add_paragraph("_" * 60)
+
+        doc.add_heading('NOTIZIE SELEZIONATE', level=1)
+        body = doc.element.body
+        for country, arr in _by_country(selection).items():
+            doc.add_heading(country.upper(), level=2)
+            for i, it in enumerate(arr, 1):
+                key, blk = self.block(it)
+                for j, frag in enumerate(self._fragments(key, blk)):
+                    el = deepcopy(frag)
+                    if j == 0:  # numerazione per paese sul run in grassetto
+                        el.xpath(".//w:t")[0].text = f"{i}. {blk.title}"
+                    if body.sectPr is not None: body.sectPr.addprevious(el)
+                    else: body.append(el)
+
+        buf = BytesIO()
+        doc.save(buf)
+        return buf.getvalue()
+
+    def render_many(self, specs: List[Dict[str, Any]]) -> List[bytes]:
+        """specs: dict con es_text, selection, countries, days, context_count (generated_at opzionale)."""
+        return [self.render_docx(**spec) for spec in specs]
+
+    # ---- Anteprima UI (niente python-docx) ----
+    def render_markdown(self, es_text: str, selection: List[Dict[str, Any]], countries: List[str],
+                        days: int, context_count: int, generated_at: Optional[datetime] = None) -> str:
+        generated_at = generated_at or datetime.now()
+        out = [f"# {REPORT_TITLE}", ""]
+        out += [f"{line}  " for line in _header_lines(countries, days, context_count, generated_at)]
+        out += ["", "## EXECUTIVE SUMMARY", "", es_text or "(non disponibile)", "", "## NOTIZIE SELEZIONATE"]
+        for country, arr in _by_country(selection).items():
+            out += ["", f"### {country.upper()}"]
+            for i, it in enumerate(arr, 1):
+                _, blk = self.block(it)
+                out += ["", f"**{i}. {blk.title}**  "]
+                if blk.meta: out.append(f"{blk.meta}  ")
+                out.append(blk.body)
+        return "\n".join(out) + "\n"
+
+    def render_html(self, es_text: str, selection: List[Dict[str, Any]], countries: List[str],
+                    days: int, context_count: int, generated_at: Optional[datetime] = None) -> str:
+        e = html.escape
+        generated_at = generated_at or datetime.now()
+        out = [f"<h1>{e(REPORT_TITLE)}</h1>"]
+        out += [f"<p>{e(line)}</p>" for line in _header_lines(countries, days, context_count, generated_at)]
+        out += ["<h2>EXECUTIVE SUMMARY</h2>", f"<p>{e(es_text or '(non disponibile)')}</p>", "<h2>NOTIZIE SELEZIONATE</h2>"]
+        for country, arr in _by_country(selection).items():
+            out.append(f"<h3>{e(country.upper())}</h3>")
+            for i, it in enumerate(arr, 1):
+                _, blk = self.block(it)
+                out.append(f"<p><b>{e(f'{i}. {blk.title}')}</b></p>")
+                if blk.meta: out.append(f"<p><small>{e(blk.meta)}</small></p>")
+                out.append(f"<p>{e(blk.body)}</p>")
+        return "\n".join(out)
+
+DEFAULT_RENDERER = ReportRenderer()
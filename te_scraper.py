@@ -0,0 +1,746 @@
+# te_scraper.py — scraper dello stream TradingEconomics (caricato su richiesta dal macro agent)
+# - Motore HTTP: client httpx condiviso (keep-alive, gzip, ETag/If-Modified-Since) + parsing lxml
+# - Motore browser: Playwright importato solo quando serve (fallback o SCRAPE_ENGINE="browser")
+# - Post-process comune (_postprocess_raw): filtro paesi/orizzonte e mappatura colore -> importanza
+# - Live tail (live_tail): testa dello stream osservata di continuo, solo card con fingerprint nuove (te_live.py)
+
+import json, logging, threading, time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Callable, Set
+
+import httpx
+from lxml import html as lxml_html
+
+import te_trace as tr
+from te_macro_agent_final_multi import Config, COUNTRY_SYNONYMS, normalize_country, parse_age_days_from_text, _fp
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36")
+
+# ---- Motore HTTP (senza browser): client condiviso keep-alive + richieste condizionali ----
+_http_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_http_validators: Dict[str, Dict[str, str]] = {}   # url -> {etag, last_modified, body}
+HTTP_VALIDATORS_MAX = 512
+
+def _get_http_client(timeout: float) -> httpx.Client:
+    global _http_client
+    with _http_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(
+                headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9",
+                         "Accept-Encoding": "gzip, deflate"},
+                timeout=timeout, follow_redirects=True,
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4))
+        return _http_client
+
+def _http_get_text(client: httpx.Client, url: str, sp=tr.NO_SPAN) -> str:
+    """GET con ETag/If-Modified-Since: su 304 ritorna il corpo già in cache."""
+    with _http_lock:
+        cached = _http_validators.get(url)
+    headers = {}
+    if cached:
+        if cached.get("etag"): headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"): headers["If-Modified-Since"] = cached["last_modified"]
+    r = client.get(url, headers=headers)
+    sp.incr("requests"); sp.incr("bytes", len(r.content))
+    if r.status_code == 304 and cached:
+        sp.incr("not_modified")
+        return cached["body"]
+    r.raise_for_status()
+    body = r.text
+    etag, lm = r.headers.get("etag"), r.headers.get("last-modified")
+    if etag or lm:
+        with _http_lock:
+            if len(_http_validators) >= HTTP_VALIDATORS_MAX:
+                _http_validators.pop(next(iter(_http_validators)))
+            _http_validators[url] = {"etag": etag or "", "last_modified": lm or "", "body": body}
+    return body
+
+# Stessi selettori (e stesso ordine di fallback) di EXTRACT_FILTERED_JS lato browser, in XPath
+def _xp_cls(tag: str, cls: str) -> str:
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+XP_CARDS = f"//{_xp_cls('li', 'te-stream-item')} | //{_xp_cls('div', 'stream-item')} | //article"
+XP_COUNTRY = [f".//{_xp_cls('a', 'te-stream-country')}", f".//{_xp_cls('*', 'te-stream-country')}",
+              ".//a[contains(@href, '/country/')]", ".//a[contains(@href, '/countries/')]",
+              f".//{_xp_cls('*', 'country')}//a", ".//*[@data-entity='country']", ".//*[@data-country]"]
+XP_TITLE = [f".//{_xp_cls('a', 'te-stream-title')}", ".//h3", ".//h2", ".//a",
+            f".//{_xp_cls('*', 'te-title')}", ".//strong"]
+XP_DESC = [f".//{_xp_cls('span', 'te-stream-item-description')}", f".//{_xp_cls('*', 'desc')}", ".//p"]
+XP_IMPACT = f".//{_xp_cls('*', 'te-stream-impact')}"
+XP_TITLE_CLS = f".//{_xp_cls('*', 'te-stream-title')}"
+XP_CATEGORY = f".//{_xp_cls('a', 'te-stream-category')}"
+IMPORTANCE_CLASS = {3: "text-danger", 2: "text-primary", 1: "text-info"}
+
+def _first(el, xp: str):
+    r = el.xpath(xp)
+    return r[0] if r else None
+
+def _text(n) -> str:
+    return "".join(n.itertext()) if n is not None else ""
+
+def _attr(n, name: str) -> str:
+    return (n.get(name) or "") if n is not None else ""
+
+def _extract_cards_html(markup: str) -> List[Dict[str, str]]:
+    """Equivalente lxml dell'estrazione in pagina: stessi campi grezzi per card."""
+    if not (markup or "").strip(): return []
+    root = lxml_html.fromstring(markup) if "<html" in markup[:500].lower() \
+        else lxml_html.fromstring(f"<html><body><ul>{markup}</ul></body></html>")
+    out = []
+    for el in root.xpath(XP_CARDS):
+        def pick(xps):
+            for xp in xps:
+                n = _first(el, xp)
+                if n is not None:
+                    t = _text(n).strip()
+                    if t: return t
+            return ""
+        desc = ""
+        for xp in XP_DESC:
+            desc = _text(_first(el, xp))
+            if desc: break
+        desc = (desc or _text(el)).strip()
+        small, impact = _first(el, ".//small"), _first(el, XP_IMPACT)
+        out.append({
+            "country": pick(XP_COUNTRY), "title": pick(XP_TITLE),
+            "description": desc[:2000], "time_text": _text(small).strip(),
+            "class_blob": " ".join([_attr(el, "class"), _attr(impact, "class"), _attr(small, "class"),
+                                    _attr(_first(el, XP_TITLE_CLS), "class")]),
+            "style_blob": " ".join([_attr(el, "style"), _attr(impact, "style"), _attr(small, "style")]),
+            "category_raw": _text(_first(el, XP_CATEGORY)).strip(),
+        })
+    return out
+
+def _extract_cards_json(data: Any) -> List[Dict[str, str]]:
+    """Paginazione in JSON (variante dell'endpoint stream): stessi campi grezzi di _extract_cards_html."""
+    rows = (data.get("items") or data.get("data") or []) if isinstance(data, dict) else data
+    out = []
+    for r in rows or []:
+        if not isinstance(r, dict): continue
+        if r.get("html"):
+            out.extend(_extract_cards_html(r["html"])); continue
+        try: imp = int(r.get("importance") or 0)
+        except (TypeError, ValueError): imp = 0
+        out.append({
+            "country": str(r.get("country") or "").strip(), "title": str(r.get("title") or "").strip(),
+            "description": str(r.get("description") or "").strip()[:2000],
+            "time_text": str(r.get("date") or r.get("time") or "").strip(),
+            "class_blob": IMPORTANCE_CLASS.get(imp, ""), "style_blob": "",
+            "category_raw": str(r.get("category") or "").strip(),
+        })
+    return out
+
+def _min_tail_age(raw: List[Dict[str, str]], tail: int = 25) -> Optional[float]:
+    ages = [a for a in (parse_age_days_from_text(r.get("time_text", "")) for r in raw[-tail:]) if a is not None]
+    return min(ages) if ages else None
+
+# ---- Motore browser: script eseguiti nella pagina (un round trip per fase) ----
+BLOCKED_URL_PARTS = [".png",".jpg",".jpeg",".gif",".webp",".svg",".woff",".woff2",".ttf",
+                     ".mp4",".avi",".webm",".css?","doubleclick","googletag","analytics"]
+
+# Marcatori colore -> importanza (usati da _map_color_to_importance e dall'estrazione in pagina)
+IMPORTANCE_MARKERS = [
+    (3, ["high-impact","impact-high","text-danger","badge-danger","#dc3545"]),
+    (2, ["text-primary","badge-primary","#0d6efd"]),
+    (1, ["text-info","badge-info","#0dcaf0"]),
+]
+
+# Età in giorni come parse_age_days_from_text (relativo "N unit ago"; date assolute solo se c'è l'anno)
+_AGE_JS = r"""
+const ageDays = (t) => {
+  t = (t || '').trim(); if (!t) return null;
+  const m = /\b(\d+)\s*(minute|hour|day|week|month)s?\s+ago\b/i.exec(t);
+  if (m) {
+    const q = parseInt(m[1], 10), u = m[2].toLowerCase();
+    if (u.startsWith('minute')) return q / 1440; if (u.startsWith('hour')) return q / 24;
+    if (u.startsWith('day')) return q; if (u.startsWith('week')) return q * 7; return 30;
+  }
+  if (!/\b(19|20)\d{2}\b/.test(t)) return null;
+  const ts = Date.parse(t); return isNaN(ts) ? null : Math.max(0, (Date.now() - ts) / 86400000);
+};
+const CARD_SEL = 'li.te-stream-item, div.stream-item, article';
+"""
+
+# Hook di rete installato una volta per pagina: richieste fetch/XHR in volo, ultima attività, risposte di paginazione
+_NET_HOOK_JS = r"""
+  if (!window.__teNet) {
+    const net = window.__teNet = {inflight: 0, last: performance.now(), pages: 0, subs: new Set()};
+    const end = (url) => {
+      net.inflight = Math.max(0, net.inflight - 1); net.last = performance.now();
+      if (String(url || '').includes(o.pagePath)) { net.pages++; net.subs.forEach(f => f()); }
+    };
+    const f0 = window.fetch;
+    if (f0) window.fetch = function (input, init) {
+      const url = (input && input.url) || input;
+      net.inflight++; net.last = performance.now();
+      return f0.call(this, input, init).finally(() => end(url));
+    };
+    const open0 = XMLHttpRequest.prototype.open, send0 = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function (m, url) { this.__teUrl = url; return open0.apply(this, arguments); };
+    XMLHttpRequest.prototype.send = function () {
+      net.inflight++; net.last = performance.now();
+      this.addEventListener('loadend', () => end(this.__teUrl), {once: true});
+      return send0.apply(this, arguments);
+    };
+  }
+"""
+
+# Controller di scroll a eventi: dopo ogni scroll/"More" aspetta il primo segnale utile (card nuove, risposta di
+# paginazione, rete ferma da idleMs) invece di un tempo fisso; passo = altezza media card x resa recente (EWMA);
+# stop su orizzonte, fine stream, budget di iterazioni o di tempo. Ritorna la resa di ogni iterazione.
+SCROLL_DRIVER_JS = "async (o) => {" + _AGE_JS + _NET_HOOK_JS + r"""
+  const net = window.__teNet, t0 = performance.now();
+  const visible = (el) => !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+  const moreBtn = () => {
+    const s = document.querySelector('#stream-btn');
+    if (s && (s.textContent || '').includes('More') && visible(s)) return s;
+    for (const el of document.querySelectorAll('button, a'))
+      if ((el.textContent || '').includes('More') && visible(el)) return el;
+    return null;
+  };
+  const count = () => document.querySelectorAll(CARD_SEL).length;
+  const cardHeight = () => {
+    const hs = Array.from(document.querySelectorAll(CARD_SEL)).slice(-20).map(n => n.offsetHeight).filter(h => h > 0);
+    return hs.length ? hs.reduce((a, b) => a + b, 0) / hs.length : 80;
+  };
+  // primo segnale fra: card nuove, risposta di paginazione (+ settleMs per il rendering), rete ferma, timeout
+  const waitSignal = (before) => new Promise(resolve => {
+    const ts = performance.now(); let done = false, settle = null;
+    const finish = (why) => {
+      if (done) return; done = true;
+      obs.disconnect(); clearInterval(tick); clearTimeout(settle); net.subs.delete(onPage);
+      resolve({why, ms: performance.now() - ts});
+    };
+    const obs = new MutationObserver(() => { if (count() > before) finish('cards'); });
+    obs.observe(document.body, {childList: true, subtree: true});
+    const onPage = () => { settle = setTimeout(() => finish(count() > before ? 'cards' : 'response'), o.settleMs); };
+    net.subs.add(onPage);
+    const tick = setInterval(() => {
+      const now = performance.now();
+      if (count() > before) finish('cards');
+      else if (net.inflight === 0 && now - Math.max(ts, net.last) >= o.idleMs) finish('idle');
+      else if (now - ts >= o.waitMaxMs) finish('timeout');
+    }, 20);
+  });
+  let clicks = 0, older = 0, dry = 0, rate = 0, stopped = 'max_iter';
+  const log = [];
+  for (let i = 0; i < o.maxIter; i++) {
+    if (performance.now() - t0 >= o.budgetMs) { stopped = 'budget'; break; }
+    const before = count();
+    const step = Math.round(Math.min(o.maxStep, Math.max(o.minStep, cardHeight() * Math.max(o.minCards, rate))));
+    window.scrollBy(0, step);
+    const b = moreBtn(), clicked = b ? 1 : 0;
+    if (b) { b.click(); clicks++; }
+    const sig = await waitSignal(before);
+    const got = count() - before;
+    rate = rate ? 0.5 * rate + 0.5 * got : got;
+    log.push([step, got, Math.round(sig.ms), sig.why, clicked]);
+    const ages = Array.from(document.querySelectorAll(CARD_SEL)).slice(-25)
+      .map(n => ageDays(n.querySelector('small')?.textContent || '')).filter(a => a !== null);
+    older = (ages.length && Math.min(...ages) > o.maxDays) ? older + 1 : 0;
+    if (older >= 2) { stopped = 'horizon'; break; }
+    const atEnd = window.innerHeight + window.scrollY >= document.documentElement.scrollHeight - 2;
+    dry = (got === 0 && (atEnd || clicked)) ? dry + 1 : 0;
+    if (dry >= o.maxDry) { stopped = 'end'; break; }
+  }
+  return {iterations: log.length, more_clicks: clicks, cards: count(), stopped,
+          elapsed_ms: Math.round(performance.now() - t0), log};
+}"""
+
+# Stessi selettori di sempre; filtro paese/orizzonte e proiezione dei campi prima di tornare a Python
+EXTRACT_FILTERED_JS = "(o) => {" + _AGE_JS + r"""
+  const pick = (el, sels) => {
+    for (const s of sels) { const n = el.querySelector(s); if (n) { const t=(n.textContent||'').trim(); if (t) return t; } }
+    return '';
+  };
+  const selsCountry = [
+    'a.te-stream-country', '.te-stream-country',
+    'a[href*="/country/"]', 'a[href*="/countries/"]',
+    '.country a', '[data-entity="country"]', '[data-country]'
+  ];
+  const selsTitle = ['a.te-stream-title', 'h3', 'h2', 'a', '.te-title', 'strong'];
+  const allowed = o.allowed ? new Set(o.allowed) : null;
+  const importance = (blob) => {
+    blob = blob.toLowerCase();
+    for (const [imp, keys] of o.markers) if (keys.some(k => blob.includes(k))) return imp;
+    return 0;
+  };
+  const nodes = o.onlyNew ? (window.__teTail || []).splice(0).filter(n => n.isConnected)
+                          : Array.from(document.querySelectorAll(CARD_SEL));
+  const rows = []; let bytesFull = 0;
+  for (const el of nodes) {
+    const country = pick(el, selsCountry);
+    const desc    = (el.querySelector('span.te-stream-item-description')?.textContent
+                     || el.querySelector('.desc')?.textContent
+                     || el.querySelector('p')?.textContent
+                     || el.textContent || '').trim().slice(0, 2000);
+    const time    = (el.querySelector('small')?.textContent || '').trim();
+    const c_blob  = [el.getAttribute('class')||'',
+                     el.querySelector('.te-stream-impact')?.getAttribute('class')||'',
+                     el.querySelector('small')?.getAttribute('class')||'',
+                     el.querySelector('.te-stream-title')?.getAttribute('class')||''].join(' ');
+    const s_blob  = [el.getAttribute('style')||'',
+                     el.querySelector('.te-stream-impact')?.getAttribute('style')||'',
+                     el.querySelector('small')?.getAttribute('style')||''].join(' ');
+    const row = {country, title: pick(el, selsTitle), description: desc, time_text: time,
+                 category_raw: (el.querySelector('a.te-stream-category')?.textContent||'').trim()};
+    bytesFull += JSON.stringify(row).length + c_blob.length + s_blob.length + 40;
+    if (allowed && !allowed.has(country)) continue;
+    const a = ageDays(time);
+    if (a !== null && a > o.maxDays) continue;
+    row.importance = importance(c_blob + ' ' + s_blob);
+    if (o.keepBlobs) { row.class_blob = c_blob; row.style_blob = s_blob; }
+    rows.push(row);
+  }
+  return {rows, total: nodes.length, bytes_full: bytesFull, bytes_sent: JSON.stringify(rows).length};
+}"""
+
+# Live tail: le card inserite nella pagina finiscono in window.__teTail (EXTRACT_FILTERED_JS con onlyNew le consuma)
+TAIL_OBSERVER_JS = "() => {" + _AGE_JS + r"""
+  window.__teTail = [];
+  if (window.__teTailObs) window.__teTailObs.disconnect();
+  const push = (n) => {
+    if (n.nodeType !== 1) return;
+    if (n.matches(CARD_SEL)) window.__teTail.push(n);
+    else n.querySelectorAll(CARD_SEL).forEach(c => window.__teTail.push(c));
+  };
+  window.__teTailObs = new MutationObserver(ms => ms.forEach(m => m.addedNodes.forEach(push)));
+  window.__teTailObs.observe(document.body, {childList: true, subtree: true});
+  return true;
+}"""
+
+LIVE_TAIL_SEEN_MAX = 20_000
+
+def _raw_fp(r: Dict[str, Any]) -> str:
+    """Fingerprint di una card grezza, uguale a quella dell'item dopo _postprocess_raw."""
+    return _fp({"country": normalize_country((r.get("country") or "").strip()),
+                "title": (r.get("title") or "").strip(), "description": (r.get("description") or "").strip()})
+
+class _TailSeen:
+    """Fingerprint già viste dal tail (LRU limitata) + lookup opzionale di quelle già note (es. te_items)."""
+    def __init__(self, known: Optional[Callable[[List[str]], Set[str]]] = None, cap: int = LIVE_TAIL_SEEN_MAX):
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.known, self.cap = known, cap
+
+    def unseen(self, keys: List[str]) -> Set[str]:
+        cand = [k for k in dict.fromkeys(keys) if k not in self._seen]
+        if cand and self.known is not None:
+            old = self.known(cand)
+            self.add(old)
+            cand = [k for k in cand if k not in old]
+        return set(cand)
+
+    def add(self, keys):
+        for k in keys:
+            self._seen[k] = None; self._seen.move_to_end(k)
+        while len(self._seen) > self.cap: self._seen.popitem(last=False)
+
+def _wait(seconds: float, should_stop: Callable[[], bool]) -> bool:
+    """Attesa interrompibile; True se è arrivato lo stop."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        if should_stop(): return True
+        time.sleep(min(0.5, max(0.0, end - time.monotonic())))
+    return should_stop()
+
+class TEStreamScraper:
+    def __init__(self, cfg: Config): self.cfg = cfg
+
+    @staticmethod
+    def _map_color_to_importance(class_text: str, style_text: str) -> int:
+        t = (class_text or "").lower() + " " + (style_text or "").lower()
+        for imp, keys in IMPORTANCE_MARKERS:
+            if any(k in t for k in keys): return imp
+        return 0
+
+    def _url_candidates(self) -> List[str]:
+        u = self.cfg.BASE_URL.strip()
+        candidates = [u]
+        if "://www." not in u: candidates.append(u.replace("://", "://www.", 1))
+        if "://www." in u: candidates.append(u.replace("://www.", "://", 1))
+        return list(dict.fromkeys(candidates))
+
+    def scrape_30d(self, chosen_countries: List[str], max_days: int = 60) -> List[Dict[str, Any]]:
+        engine = (self.cfg.SCRAPE_ENGINE or "auto").strip().lower()
+        with tr.span("scrape", countries=len(chosen_countries), max_days=max_days) as sp:
+            raw: List[Dict[str, str]] = []; used = engine
+            pages: Optional[List[Dict[str, str]]] = [] if (self.cfg.ARCHIVE_RAW and self.cfg.ARCHIVE_HTML) else None
+            if engine in ("auto", "http"):
+                try:
+                    raw = self._scrape_http(max_days, pages)
+                except Exception as e:
+                    logging.warning("Scraper HTTP fallito: %s", e)
+                used = "http"
+            if not raw and engine in ("auto", "browser"):
+                if engine == "auto":
+                    logging.info("Scraper HTTP senza card: fallback Playwright.")
+                    tr.add("scrape_fallbacks", engine="browser")
+                raw = self._scrape_browser(chosen_countries, max_days)
+                used = "browser"
+            sp.set(engine=used)
+            if self.cfg.ARCHIVE_RAW and (raw or pages):
+                try:
+                    from te_archive import append_capture
+                    append_capture(self.cfg.ARCHIVE_DIR, raw, engine=used, max_days=max_days,
+                                   countries=chosen_countries, pages=pages, codec=self.cfg.ARCHIVE_CODEC)
+                except Exception as e:
+                    logging.warning("Archivio catture non scritto: %s", e)
+            items = self._postprocess_raw(raw, chosen_countries, max_days)
+            sp.set(cards=len(raw), items=len(items))
+        logging.info("Scraper: notizie raccolte (<=%sgg) paesi=%s -> %d",
+                     max_days, ",".join(chosen_countries), len(items))
+        return items
+
+    def _scrape_http(self, max_days: int, pages: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        """Stream + pagine dell'endpoint "More" via HTTP, con lo stesso early-stop dello scroll.
+        Se pages è una lista, ci accoda {url, body} di ogni risposta (archivio HTML)."""
+        client = _get_http_client(self.cfg.HTTP_TIMEOUT)
+        with tr.span("scrape.http") as sp:
+            page_url, markup, last_err = None, "", None
+            for url in self._url_candidates():
+                try:
+                    markup = _http_get_text(client, url, sp); page_url = url
+                    break
+                except Exception as e:
+                    last_err = e
+            if page_url is None:
+                raise last_err if last_err else RuntimeError("Impossibile raggiungere TradingEconomics")
+            if pages is not None: pages.append({"url": page_url, "body": markup})
+            raw = _extract_cards_html(markup)
+            sp.set(pages=1)
+            if not raw:
+                return []
+
+            u = httpx.URL(page_url)
+            stream_i = u.params.get("i", "economy")
+            btn = _first(lxml_html.fromstring(markup), "//*[@id='stream-btn']")
+            start = int(_attr(btn, "data-start") or len(raw)) if btn is not None else len(raw)
+            size = max(1, int(self.cfg.HTTP_PAGE_SIZE))
+            older_hits = 0
+            for _ in range(max(0, int(self.cfg.HTTP_MAX_PAGES) - 1)):
+                a = _min_tail_age(raw)
+                older_hits = older_hits + 1 if (a is not None and a > max_days) else 0
+                if older_hits >= 2:
+                    break
+                next_url = str(u.copy_with(path=self.cfg.STREAM_PAGE_PATH,
+                                           params={"i": stream_i, "start": start, "size": size}))
+                body = _http_get_text(client, next_url, sp)
+                if pages is not None: pages.append({"url": next_url, "body": body})
+                batch = _extract_cards_json(json.loads(body)) if body.lstrip()[:1] in ("[", "{") \
+                    else _extract_cards_html(body)
+                sp.incr("pages")
+                if not batch:
+                    break
+                raw.extend(batch)
+                start += size
+            sp.set(cards=len(raw))
+        return raw
+
+    def _open_stream_page(self, p, call, ipc: Dict[str, Any]):
+        """Chromium con blocco risorse, navigazione (www + retry), cookie e attesa della prima card.
+        Ritorna (browser, page) oppure None se la navigazione fallisce (browser già chiuso)."""
+        with tr.span("scrape.browser_launch"):
+            browser = p.chromium.launch(headless=self.cfg.HEADLESS, slow_mo=self.cfg.SLOW_MO,
+                args=["--disable-blink-features=AutomationControlled","--disable-gpu"])
+        context = browser.new_context(user_agent=USER_AGENT, viewport={"width":1440,"height":900}, locale="en-US")
+        page = context.new_page()
+
+        # Blocco dichiarativo (CDP): nessuna callback Python per richiesta; route() solo se CDP non c'è
+        try:
+            cdp = call(context.new_cdp_session, page)
+            call(cdp.send, "Network.enable")
+            call(cdp.send, "Network.setBlockedURLs", {"urls": [f"*{x}*" for x in BLOCKED_URL_PARTS]})
+        except Exception:
+            route_calls = [0]
+            def _block(route):
+                route_calls[0] += 1
+                try:
+                    if any(x in route.request.url for x in BLOCKED_URL_PARTS): return route.abort()
+                except Exception: pass
+                return route.continue_()
+            try: context.route("**/*", _block)
+            except Exception: pass
+            ipc["route_calls"] = route_calls
+
+        # Navigazione robusta (www + retry)
+        def safe_goto():
+            last_err = None
+            for url in self._url_candidates():
+                try:
+                    call(page.goto, url, wait_until="domcontentloaded", timeout=self.cfg.NAV_TIMEOUT)
+                    return True
+                except Exception as e:
+                    last_err = e
+                    continue
+            raise last_err if last_err else RuntimeError("Impossibile raggiungere TradingEconomics")
+
+        try:
+            with tr.span("scrape.navigate"):
+                safe_goto()
+        except Exception as nav_err:
+            logging.error("Navigazione fallita verso TradingEconomics: %s", nav_err)
+            try: browser.close()
+            except Exception: pass
+            return None
+
+        # Cookie
+        for sel in ['#onetrust-accept-btn-handler', 'button:has-text("Accept")', '[class*="cookie"] button']:
+            try:
+                b = page.locator(sel).first
+                if b and call(b.is_visible): call(b.click, timeout=1000); page.wait_for_timeout(200); break
+            except Exception: pass
+
+        # Aspetta almeno una card
+        try:
+            call(page.wait_for_selector, 'li.te-stream-item, div.stream-item, article', timeout=10_000)
+        except Exception:
+            logging.warning("Nessuna card visibile entro 10s; continuo comunque.")
+        return browser, page
+
+    def _scroll(self, page, call, max_days: int, retry: bool = False) -> Dict[str, Any]:
+        """SCROLL_DRIVER_JS con i budget di Config (retry: budget ridotto); resa per iterazione nel log e nello span."""
+        cfg = self.cfg
+        args = {"maxIter": 12 if retry else int(cfg.SCROLL_MAX_ITER),
+                "budgetMs": 1000.0 * cfg.SCROLL_BUDGET_S / (6 if retry else 1),
+                "idleMs": int(cfg.SCROLL_IDLE_MS), "waitMaxMs": int(cfg.SCROLL_WAIT_MAX_MS), "settleMs": 60,
+                "minStep": 600, "maxStep": 8000, "minCards": 8, "maxDry": 3,
+                "pagePath": cfg.STREAM_PAGE_PATH, "maxDays": float(max_days)}
+        with tr.span("scrape.scroll", retry=int(retry)) as sp:
+            try:
+                st = call(page.evaluate, SCROLL_DRIVER_JS, args) or {}
+            except Exception as e:
+                logging.warning("Driver di scroll interrotto: %s", e); st = {}
+            log = st.get("log") or []
+            sp.set(iterations=st.get("iterations", 0), more_clicks=st.get("more_clicks", 0), cards=st.get("cards", 0),
+                   idle_waits=sum(1 for r in log if r[3] in ("idle", "timeout")), stopped=st.get("stopped", ""))
+        if log:
+            logging.info("Scroll: %d iterazioni in %.1fs, %s card (stop: %s); resa per iterazione: %s",
+                         len(log), st.get("elapsed_ms", 0) / 1000.0, st.get("cards", 0), st.get("stopped", ""),
+                         " ".join(f"+{got}/{ms}ms" for _, got, ms, _, _ in log))
+            logging.debug("Scroll, dettaglio [passo px, card nuove, attesa ms, segnale, click]: %s", log)
+        return st
+
+    def _scrape_browser(self, chosen_countries: List[str], max_days: int) -> List[Dict[str, Any]]:
+        """Playwright: blocco richieste lato browser, scroll/"More" e filtro paesi/orizzonte dentro la pagina
+        (con ARCHIVE_RAW nessun filtro in pagina: l'archivio riceve tutte le card, filtra _postprocess_raw)."""
+        chosen_set = set(normalize_country(c) for c in chosen_countries)
+        archive = bool(self.cfg.ARCHIVE_RAW)
+        extract_args = {
+            "allowed": None if archive else
+                       sorted(n for n in chosen_set | set(COUNTRY_SYNONYMS) if normalize_country(n) in chosen_set),
+            "maxDays": 1e9 if archive else float(max_days) + 1.0,   # margine: il filtro esatto resta in _postprocess_raw
+            "markers": [[imp, keys] for imp, keys in IMPORTANCE_MARKERS],
+            "keepBlobs": archive,   # blob classi/stili servono alla ri-estrazione
+        }
+        ipc = {"round_trips": 0}
+        def call(fn, *a, **kw):
+            ipc["round_trips"] += 1
+            return fn(*a, **kw)
+
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            opened = self._open_stream_page(p, call, ipc)
+            if opened is None:
+                return []  # fallback al DB nel chiamante
+            browser, page = opened
+
+            # Scroll + "More" a eventi con early-stop: un solo evaluate, il controller gira nella pagina
+            st = self._scroll(page, call, max_days)
+
+            def _extract() -> Dict[str, Any]:
+                try:
+                    return call(page.evaluate, EXTRACT_FILTERED_JS, extract_args) or {}
+                except Exception as e:
+                    logging.warning("Estrazione fallita: %s", e); return {}
+
+            with tr.span("scrape.extract") as sp_ex:
+                res = _extract()
+                sp_ex.set(cards=res.get("total", 0), rows=len(res.get("rows") or []))
+            if not res.get("total"):
+                tr.add("scrape_retries", phase="empty_extract")
+                self._scroll(page, call, max_days, retry=True)
+                with tr.span("scrape.extract", retry=1) as sp_ex:
+                    res = _extract()
+                    sp_ex.set(cards=res.get("total", 0), rows=len(res.get("rows") or []))
+
+            browser.close()
+
+        # Misure IPC: round trip effettivi vs stima del vecchio loop (evaluate + 3 probe + tail per iterazione)
+        iters = int(st.get("iterations", 0))
+        tr.add("scrape_ipc_round_trips", ipc["round_trips"])
+        tr.add("scrape_ipc_round_trips_saved", max(0, iters * 5 + 1 - ipc["round_trips"]))
+        tr.add("scrape_ipc_bytes", res.get("bytes_sent", 0))
+        tr.add("scrape_ipc_bytes_saved", max(0, res.get("bytes_full", 0) - res.get("bytes_sent", 0)))
+        if "route_calls" in ipc:
+            tr.add("scrape_route_callbacks", ipc["route_calls"][0])
+        return res.get("rows") or []
+
+    # ---- Live tail: testa dello stream osservata di continuo ----
+    def live_tail(self, on_new: Callable[[List[Dict[str, Any]]], None], countries: Optional[List[str]] = None,
+                  on_red: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  known: Optional[Callable[[List[str]], Set[str]]] = None,
+                  on_poll: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  interval_s: Optional[float] = None, should_stop: Optional[Callable[[], bool]] = None,
+                  max_polls: Optional[int] = None) -> Dict[str, int]:
+        """
+        Osserva la testa dello stream e passa a on_new(items) solo le card con fingerprint mai viste.
+        on_red(item): card nuove con importanza 3 (non al primo giro, che è lo stato iniziale della pagina).
+        known(keys) -> chiavi già note (es. in te_items): non ripubblicate, e il primo giro va in profondità
+        (pagine "More") solo finché trova card sconosciute. on_poll(stats) dopo ogni giro, con ok=False se il giro
+        è fallito (rete, pagina) e non ha letto lo stream.
+        Motore HTTP: GET condizionale della prima pagina, pagine successive solo finché sono tutte nuove;
+        motore browser: una pagina aperta, MutationObserver sulle card inserite e reload ogni LIVE_TAIL_RELOAD_S.
+        """
+        interval = float(self.cfg.LIVE_TAIL_INTERVAL_S if interval_s is None else interval_s)
+        stop = should_stop or (lambda: False)
+        seen = _TailSeen(known)
+        engine = (self.cfg.SCRAPE_ENGINE or "auto").strip().lower()
+        rounds = self._tail_browser_rounds(countries, interval, stop) if engine == "browser" \
+            else self._tail_http_rounds(seen, countries, interval, stop)
+        horizon = float(self.cfg.SCRAPE_HORIZON_DAYS)
+        stats = {"polls": 0, "cards": 0, "new": 0, "red": 0, "errors": 0}
+        try:
+            for raw, ok in rounds:
+                with tr.span("scrape.tail", engine=engine, cards=len(raw)) as sp:
+                    items = self._postprocess_raw(raw, countries, horizon)
+                    keys = [_fp(it) for it in items]
+                    fresh = seen.unseen(keys)
+                    new = [it for k, it in zip(keys, items) if k in fresh and not fresh.discard(k)]
+                    seen.add([_raw_fp(r) for r in raw])   # anche card di altri paesi/oltre orizzonte: niente lookup ripetuti
+                    first = stats["polls"] == 0
+                    stats["polls"] += 1; stats["cards"] += len(raw); stats["new"] += len(new); stats["errors"] += not ok
+                    sp.set(new=len(new))
+                    if new:
+                        on_new(new)
+                        if on_red is not None and not first:
+                            for it in new:
+                                if int(it.get("importance", 0)) >= 3:
+                                    stats["red"] += 1
+                                    try: on_red(it)
+                                    except Exception as e: logging.warning("Callback notizia rossa fallita: %s", e)
+                if new:
+                    logging.info("Live tail: %d card nuove (%s)", len(new), ", ".join(sorted({it["country"] for it in new})))
+                if on_poll is not None: on_poll(dict(stats, last_new=len(new), ok=ok))
+                if max_polls is not None and stats["polls"] >= max_polls: break
+        finally:
+            rounds.close()
+        return stats
+
+    def _tail_http_rounds(self, seen: _TailSeen, countries: Optional[List[str]], interval: float, stop: Callable[[], bool]):
+        """Un giro = (card della testa dello stream, ok); la prima pagina invariata (304) non produce card ma è ok."""
+        client = _get_http_client(self.cfg.HTTP_TIMEOUT)
+        chosen = {normalize_country(c) for c in countries} if countries is not None else None
+        horizon = float(self.cfg.SCRAPE_HORIZON_DAYS)
+        def _all_new(batch) -> bool:
+            keys = [_raw_fp(r) for r in batch if chosen is None or normalize_country((r.get("country") or "").strip()) in chosen]
+            a = _min_tail_age(batch)
+            return bool(keys) and (a is None or a <= horizon) and len(seen.unseen(keys)) == len(set(keys))
+        page_url, last_body, depth = None, None, max(1, int(self.cfg.HTTP_MAX_PAGES))
+        while not stop():
+            raw: List[Dict[str, str]] = []
+            ok = True
+            with tr.span("scrape.tail_poll", engine="http") as sp:
+                try:
+                    if page_url is None:
+                        last_err = None
+                        for url in self._url_candidates():
+                            try: body = _http_get_text(client, url, sp); page_url = url; break
+                            except Exception as e: last_err = e
+                        if page_url is None:
+                            raise last_err if last_err else RuntimeError("Impossibile raggiungere TradingEconomics")
+                    else:
+                        body = _http_get_text(client, page_url, sp)
+                    if body is not last_body:
+                        last_body, raw = body, _extract_cards_html(body)
+                        # raffica oltre la prima pagina (o primo giro dopo una pausa): pagine "More" finché tutte nuove
+                        btn = _first(lxml_html.fromstring(body), "//*[@id='stream-btn']")
+                        start = int(_attr(btn, "data-start") or len(raw)) if btn is not None else len(raw)
+                        size, u, batch = max(1, int(self.cfg.HTTP_PAGE_SIZE)), httpx.URL(page_url), raw
+                        for _ in range(depth - 1):
+                            if not _all_new(batch): break
+                            next_url = str(u.copy_with(path=self.cfg.STREAM_PAGE_PATH,
+                                                       params={"i": u.params.get("i", "economy"), "start": start, "size": size}))
+                            nb = _http_get_text(client, next_url, sp)
+                            batch = _extract_cards_json(json.loads(nb)) if nb.lstrip()[:1] in ("[", "{") else _extract_cards_html(nb)
+                            raw.extend(batch); start += size
+                            sp.incr("pages")
+                    else:
+                        sp.set(unchanged=1)
+                except Exception as e:
+                    ok = False; sp.set(error=1)
+                    logging.warning("Live tail: giro fallito (%s), riprovo fra %.0fs", e, interval)
+            depth = max(1, int(self.cfg.LIVE_TAIL_MAX_PAGES))
+            yield raw, ok
+            if _wait(interval, stop): break
+
+    def _tail_browser_rounds(self, countries: Optional[List[str]], interval: float, stop: Callable[[], bool]):
+        """Pagina aperta: primo giro (e dopo ogni reload) tutte le card visibili, poi solo quelle inserite; (card, ok)."""
+        args = {"allowed": None, "maxDays": float(self.cfg.SCRAPE_HORIZON_DAYS) + 1.0,
+                "markers": [[imp, keys] for imp, keys in IMPORTANCE_MARKERS], "keepBlobs": False}
+        if countries is not None:
+            chosen = {normalize_country(c) for c in countries}
+            args["allowed"] = sorted(n for n in chosen | set(COUNTRY_SYNONYMS) if normalize_country(n) in chosen)
+        ipc = {"round_trips": 0}
+        call = lambda fn, *a, **kw: fn(*a, **kw)
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            opened = self._open_stream_page(p, call, ipc)
+            if opened is None:
+                raise RuntimeError("Live tail: stream non raggiungibile")
+            browser, page = opened
+            try:
+                page.evaluate(TAIL_OBSERVER_JS)
+                reload_at, full = time.monotonic() + self.cfg.LIVE_TAIL_RELOAD_S, True
+                while not stop():
+                    with tr.span("scrape.tail_poll", engine="browser", full=int(full)) as sp:
+                        try:
+                            if time.monotonic() >= reload_at:
+                                page.reload(wait_until="domcontentloaded", timeout=self.cfg.NAV_TIMEOUT)
+                                page.wait_for_selector('li.te-stream-item, div.stream-item, article', timeout=10_000)
+                                page.evaluate(TAIL_OBSERVER_JS)
+                                reload_at, full = time.monotonic() + self.cfg.LIVE_TAIL_RELOAD_S, True
+                            res = page.evaluate(EXTRACT_FILTERED_JS, dict(args, onlyNew=not full)) or {}
+                            full, ok = False, True
+                        except Exception as e:
+                            logging.warning("Live tail: estrazione fallita (%s), reload al prossimo giro", e)
+                            res, reload_at, ok = {}, 0.0, False
+                            sp.set(error=1)
+                        sp.set(cards=res.get("total", 0))
+                    yield res.get("rows") or [], ok
+                    if _wait(interval, stop): break
+            finally:
+                browser.close()
+
+    @classmethod
+    def _postprocess_raw(cls, raw: List[Dict[str, Any]], chosen_countries: Optional[List[str]], max_days: float,
+                         now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Post-process & filtro Paesi in Python (comune ai due motori e alla ri-estrazione).
+        chosen_countries=None: nessun filtro paese; now: istante della cattura (età delle date assolute)."""
+        items: List[Dict[str, Any]] = []
+        chosen_set = set(normalize_country(c) for c in chosen_countries) if chosen_countries is not None else None
+        ref = datetime.fromtimestamp(now) if now is not None else None
+        for r in raw:
+            country_raw = (r.get("country") or "").strip()
+            country = normalize_country(country_raw)
+            if not country or (chosen_set is not None and country not in chosen_set):
+                continue
+            age_days = parse_age_days_from_text(r.get("time_text",""), ref) or parse_age_days_from_text(r.get("description",""), ref)
+            if age_days is None or age_days > float(max_days):
+                continue
+            if "class_blob" in r or "style_blob" in r or "importance" not in r:
+                importance = cls._map_color_to_importance(r.get("class_blob",""), r.get("style_blob",""))
+            else:
+                importance = int(r["importance"])
+            items.append({
+                "country": country,
+                "title": (r.get("title","") or "").strip(),
+                "description": (r.get("description","") or "").strip(),
+                "time": (r.get("time_text","") or "").strip(),
+                "age_days": age_days,
+                "importance": importance,
+                "category_raw": (r.get("category_raw","") or "").strip(),
+            })
+        return items
@@ -0,0 +1,386 @@
+# te_service.py — servizio HTTP headless (JSON) attorno alla pipeline, per altri sistemi interni
+# - Handler asyncio (stdlib, HTTP/1.1 keep-alive); gli stadi CPU/DB e LLM girano in pool di thread limitati
+# - Fast path in sola lettura: GET /selection e GET /context servono dal DB (connessioni read-only, WAL)
+#   senza browser né LLM; risposte già serializzate in cache LRU, invalidate dalla data_version del DB (te_meta),
+#   letta in un thread a parte con TTL breve (mai sul thread dell'event loop); richieste identiche concorrenti
+#   condividono lo stesso calcolo
+# - POST /report: pipeline completa (refresh dello stream opzionale, ES, selezione, testi IT, DOCX base64 o binario)
+# - GET /metrics: latenze per endpoint (p50/p95/p99/max, errori) e delle chiamate LLM per task × modello
+#   (istogrammi di te_summarizer) in JSON o testo Prometheus (?format=prom)
+# Uso: python te_service.py [--host 127.0.0.1] [--port 8080] [--workers 4]
+#   curl 'http://127.0.0.1:8080/selection?countries=United%20States,Italy&days=5'
+#   curl -X POST http://127.0.0.1:8080/report -d '{"countries":["Italy"],"days":5}'
+
+import argparse, asyncio, base64, contextvars, json, logging, os, threading, time
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+from te_summarizer import latency_prometheus, latency_stats
+
+MAX_BODY = 1 << 20
+IDLE_TIMEOUT_S = 30.0
+SIGNATURE_TTL_S = 0.25   # data_version riletta al più ogni TTL (scritture visibili alla cache entro questo ritardo)
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# ============= Metriche per endpoint =============
+class EndpointStats:
+    __slots__ = ("count", "errors", "total_s", "max_s", "recent")
+
+    def __init__(self, window: int = 2048):
+        self.count = self.errors = 0
+        self.total_s = self.max_s = 0.0
+        self.recent = deque(maxlen=window)   # ultime latenze, per i percentili
+
+    def observe(self, seconds: float, error: bool):
+        self.count += 1; self.errors += int(error)
+        self.total_s += seconds; self.max_s = max(self.max_s, seconds)
+        self.recent.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent: return 0.0
+        xs = sorted(self.recent)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        ms = lambda s: round(s * 1000.0, 2)
+        return {"count": self.count, "errors": self.errors, "mean_ms": ms(self.total_s / self.count) if self.count else 0.0,
+                "p50_ms": ms(self.quantile(0.50)), "p95_ms": ms(self.quantile(0.95)),
+                "p99_ms": ms(self.quantile(0.99)), "max_ms": ms(self.max_s)}
+
+def _parse_countries(raw) -> List[str]:
+    if isinstance(raw, str): raw = raw.split(",")
+    out = [ag.normalize_country(str(c).strip()) for c in raw or [] if str(c).strip()]
+    out = ["Euro Area" if c == "European Union" else c for c in out]
+    if not out: raise HTTPError(400, "countries mancante")
+    return list(dict.fromkeys(out))
+
+def _parse_days(raw) -> int:
+    try: days = int(raw if raw not in (None, "") else 5)
+    except (TypeError, ValueError): raise HTTPError(400, f"days non valido: {raw!r}")
+    if not 1 <= days <= 30: raise HTTPError(400, f"days fuori da 1–30 ({days})")
+    return days
+
+def _json_bytes(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, default=lambda o: dict(o) if isinstance(o, Mapping) else str(o)).encode("utf-8")
+
+# ============= Servizio =============
+class ReportService:
+    """Stato del servizio: pool, cache del fast path, metriche; le route sono coroutine (status, headers, body)."""
+    def __init__(self, cfg: ag.Config, workers: Optional[int] = None):
+        self.cfg = cfg
+        self.cpu_pool = ThreadPoolExecutor(max_workers=max(1, workers or cfg.SERVICE_WORKERS), thread_name_prefix="te-svc-cpu")
+        self.llm_pool = ThreadPoolExecutor(max_workers=max(1, cfg.JOB_CONCURRENCY), thread_name_prefix="te-svc-llm")
+        # ES (chiamata LLM bloccante) accanto alla selezione di ogni report: pool proprio, uno per report in corso;
+        # nel cpu_pool affamerebbe il fast path, nel llm_pool aspetterebbe i report che lo occupano
+        self.es_pool = ThreadPoolExecutor(max_workers=max(1, cfg.JOB_CONCURRENCY), thread_name_prefix="te-svc-es")
+        self.sig_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="te-svc-sig")   # data_version (_signature)
+        self._sig: Tuple = (None,)
+        self._sig_ts = 0.0
+        self._sig_fut: Optional[asyncio.Future] = None
+        self.stats: Dict[str, EndpointStats] = {}
+        self.inflight = 0
+        self.started = time.time()
+        self._cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._pending: Dict[Tuple, asyncio.Future] = {}
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._summarizer = None
+        self._summarizer_lock = threading.Lock()
+        self.cache_hits = self.cache_misses = self.cache_shared = 0
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("GET", "/context"): self.context,
+            ("GET", "/selection"): self.selection,
+            ("POST", "/report"): self.report,
+        }
+
+    # ---- DB in sola lettura (una connessione per thread del pool) ----
+    def _ro_conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not os.path.exists(self.cfg.DB_PATH):
+                raise HTTPError(503, f"DB non inizializzato: {self.cfg.DB_PATH}")
+            conn = self._local.conn = ag.db_connect_ro(self.cfg.DB_PATH)
+        return conn
+
+    def db_signature(self) -> Tuple:
+        """data_version del DB (incrementata da ogni upsert/prune committato): chiave di validità della cache.
+        A differenza della firma dei file non cambia per scritture estranee (cache LLM, checkpoint del WAL)."""
+        if not os.path.exists(self.cfg.DB_PATH): return (None,)
+        return (ag.db_data_version(self._ro_conn()),)
+
+    async def _signature(self) -> Tuple:
+        """db_signature con TTL breve, letta in sig_pool: sotto contesa del WAL la query bloccherebbe l'event loop.
+        Le richieste che trovano la firma scaduta condividono una sola lettura."""
+        if time.monotonic() - self._sig_ts < SIGNATURE_TTL_S: return self._sig
+        fut = self._sig_fut
+        if fut is None:
+            fut = self._sig_fut = asyncio.get_running_loop().run_in_executor(self.sig_pool, self.db_signature)
+            fut.add_done_callback(self._signature_done)
+        return await asyncio.shield(fut)
+
+    def _signature_done(self, fut: asyncio.Future):
+        self._sig_fut = None
+        if not fut.cancelled() and fut.exception() is None:
+            self._sig, self._sig_ts = fut.result(), time.monotonic()
+
+    def _load_context(self, countries: List[str], lazy: bool = True) -> List[Dict[str, Any]]:
+        return ag.db_load_recent(self._ro_conn(), countries, max_age_days=self.cfg.CONTEXT_DAYS,
+                                 lazy_descriptions=lazy and self.cfg.LAZY_DESCRIPTIONS, derived=lazy)
+
+    def _summarizer_get(self):
+        with self._summarizer_lock:
+            if self._summarizer is None:
+                from te_summarizer import MacroSummarizer
+                self._summarizer = MacroSummarizer(self.cfg.ANTHROPIC_API_KEY, self.cfg.MODEL, self.cfg.MODEL_TEMP, self.cfg.MAX_TOKENS)
+            return self._summarizer
+
+    # ---- esecuzione nei pool + cache del fast path ----
+    async def _run(self, pool: ThreadPoolExecutor, fn, *args):
+        """Calcolo nel pool; oltre SERVICE_MAX_PENDING calcoli in corso -> 503 (le risposte in cache passano sempre)."""
+        if self.inflight >= self.cfg.SERVICE_MAX_PENDING:
+            raise HTTPError(503, "servizio saturo")
+        self.inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, contextvars.copy_context().run, fn, *args)
+        finally:
+            self.inflight -= 1
+
+    async def _cached(self, key: Tuple, compute) -> Tuple[bytes, bool]:
+        """Risposta serializzata dalla cache; al miss un solo calcolo per chiave anche con richieste concorrenti."""
+        key = key + (await self._signature(),)
+        body = self._cache.get(key)
+        if body is not None:
+            self._cache.move_to_end(key); self.cache_hits += 1
+            return body, True
+        fut = self._pending.get(key)
+        if fut is not None:
+            self.cache_shared += 1
+            return await asyncio.shield(fut), True
+        self.cache_misses += 1
+        fut = self._pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            body = await self._run(self.cpu_pool, lambda: _json_bytes(compute()))
+            fut.set_result(body)
+        except BaseException as e:
+            fut.set_exception(e); fut.exception()   # evita il warning se nessuno è in attesa
+            raise
+        finally:
+            del self._pending[key]
+        self._cache[key] = body
+        while len(self._cache) > self.cfg.SERVICE_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+        return body, False
+
+    # ---- route ----
+    async def health(self, q, body):
+        return 200, {}, _json_bytes({"ok": True, "uptime_s": round(time.time() - self.started, 1),
+                                     "inflight": self.inflight, "db": self.cfg.DB_PATH,
+                                     "db_present": os.path.exists(self.cfg.DB_PATH)})
+
+    async def metrics(self, q, body):
+        if (q.get("format") or [""])[0] == "prom":
+            return 200, {"Content-Type": "text/plain; version=0.0.4"}, self.to_prometheus().encode("utf-8")
+        return 200, {}, _json_bytes({
+            "endpoints": {k: v.to_dict() for k, v in sorted(self.stats.items())},
+            "inflight": self.inflight,
+            "cache": {"entries": len(self._cache), "hits": self.cache_hits, "shared": self.cache_shared,
+                      "misses": self.cache_misses},
+            "llm": latency_stats(),
+        })
+
+    async def context(self, q, body):
+        countries = _parse_countries((q.get("countries") or [""])[0])
+        def _compute():
+            items = self._load_context(countries, lazy=False)
+            return {"countries": countries, "context_days": self.cfg.CONTEXT_DAYS, "count": len(items), "items": items}
+        data, hit = await self._cached(("context", tuple(countries)), _compute)
+        return 200, {"X-Cache": "hit" if hit else "miss"}, data
+
+    async def selection(self, q, body):
+        countries = _parse_countries((q.get("countries") or [""])[0])
+        days = _parse_days((q.get("days") or [""])[0])
+        def _compute():
+            items = self._load_context(countries)
+            sel = ag.build_selection(items, days, self.cfg, expand1_days=10, expand2_days=30) if items else []
+            return {"countries": countries, "days": days, "context_count": len(items), "selection": sel}
+        data, hit = await self._cached(("selection", tuple(countries), days), _compute)
+        return 200, {"X-Cache": "hit" if hit else "miss"}, data
+
+    async def report(self, q, body):
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"JSON non valido: {e}")
+        countries = _parse_countries(req.get("countries"))
+        days = _parse_days(req.get("days"))
+        res = await self._run(self.llm_pool, self._build_report, countries, days, bool(req.get("refresh", False)),
+                              bool(req.get("enrich", True)), bool(req.get("docx", True)))
+        if (q.get("format") or [""])[0] == "docx":
+            from te_report import DOCX_MIME
+            return 200, {"Content-Type": DOCX_MIME, "Content-Disposition": f'attachment; filename="{res["filename"]}"'}, \
+                res.pop("docx_bytes", b"")
+        data = res.pop("docx_bytes", None)
+        if data is not None: res["docx_b64"] = base64.b64encode(data).decode("ascii")
+        return 200, {}, _json_bytes(res)
+
+    def _build_report(self, countries: List[str], days: int, refresh: bool, enrich: bool, with_docx: bool) -> Dict[str, Any]:
+        """Pipeline completa in un thread del pool LLM; senza refresh il contesto viene dal DB in sola lettura."""
+        cfg = self.cfg
+        with tr.run("service", countries=",".join(countries), days=days) as trace:
+            if refresh:
+                with self._refresh_lock:   # uno scrape alla volta: i lettori continuano a servire dal DB (WAL)
+                    items_ctx = ag.load_context_items(cfg, countries)
+                self._sig_ts = 0.0   # scrittura appena fatta: data_version riletta alla prossima richiesta
+            else:
+                items_ctx = self._load_context(countries)
+            if not items_ctx:
+                raise HTTPError(404, "Nessuna notizia disponibile entro la finestra.")
+            summarizer = self._summarizer_get()
+            es_fut = self.es_pool.submit(contextvars.copy_context().run, summarizer.executive_summary, items_ctx, cfg, countries)
+            selection = ag.build_selection(items_ctx, days, cfg, expand1_days=10, expand2_days=30)
+            if enrich:
+                ag.enrich_selection_it(summarizer, selection, cfg, delay_s=0.4, workers=cfg.ENRICH_WORKERS)
+            es_text = es_fut.result()
+            out = {"countries": countries, "days": days, "context_count": len(items_ctx),
+                   "es_text": es_text, "selection": selection,
+                   "filename": f"MacroAnalysis_AutoSelect_{days}days_{datetime.now():%Y%m%d_%H%M}.docx"}
+            if with_docx:
+                out["docx_bytes"] = ag.render_report_docx(es_text, selection, countries, days, len(items_ctx))
+        out["stages"] = trace.stage_breakdown()
+        return out
+
+    # ---- HTTP ----
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        u = urlparse(target)
+        path = u.path.rstrip("/") or "/"
+        route = self.routes.get((method, path))
+        if route is None:
+            status = 405 if any(p == path for _, p in self.routes) else 404
+            return status, {}, _json_bytes({"error": f"{method} {path}"})
+        t0 = time.perf_counter(); status = 500
+        try:
+            status, headers, data = await route(parse_qs(u.query), body)
+        except HTTPError as e:
+            status, headers, data = e.status, ({"Retry-After": "1"} if e.status == 503 else {}), _json_bytes({"error": str(e)})
+        except Exception as e:
+            logging.exception("Errore su %s %s: %s", method, path, e)
+            headers, data = {}, _json_bytes({"error": str(e)})
+        finally:
+            self.stats.setdefault(f"{method} {path}", EndpointStats()).observe(time.perf_counter() - t0, status >= 500)
+        return status, headers, data
+
+    async def handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT_S)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                if not line: break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, 400, {}, _json_bytes({"error": "request line"}), False)
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""): break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                cl = headers.get("content-length") or "0"
+                if not (cl.isascii() and cl.isdigit()):
+                    await self._write(writer, 400, {}, _json_bytes({"error": "content-length non valido"}), False)
+                    break
+                length = int(cl)
+                if length > MAX_BODY:
+                    await self._write(writer, 413, {}, _json_bytes({"error": "body troppo grande"}), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                conn_hdr = headers.get("connection", "").lower()
+                keep = conn_hdr == "keep-alive" if version == "HTTP/1.0" else conn_hdr != "close"
+                status, extra, data = await self.dispatch(method.upper(), target, body)
+                await self._write(writer, status, extra, data, keep)
+                if not keep: break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], data: bytes, keep: bool):
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                f"Content-Length: {len(data)}", f"Connection: {'keep-alive' if keep else 'close'}"]
+        if not any(k.lower() == "content-type" for k in headers):
+            head.append("Content-Type: application/json; charset=utf-8")
+        head += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+    def to_prometheus(self) -> str:
+        lines = ["# TYPE te_service_request_duration_seconds summary"]
+        for name, st in sorted(self.stats.items()):
+            lbl = f'endpoint="{name}"'
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'te_service_request_duration_seconds{{{lbl},quantile="{q}"}} {st.quantile(q):.6f}')
+            lines.append(f"te_service_request_duration_seconds_sum{{{lbl}}} {st.total_s:.6f}")
+            lines.append(f"te_service_request_duration_seconds_count{{{lbl}}} {st.count}")
+        lines.append("# TYPE te_service_request_errors_total counter")
+        lines += [f'te_service_request_errors_total{{endpoint="{n}"}} {st.errors}' for n, st in sorted(self.stats.items())]
+        lines.append("# TYPE te_service_inflight gauge")
+        lines.append(f"te_service_inflight {self.inflight}")
+        lines.append("# TYPE te_service_cache_total counter")
+        for k, v in (("hit", self.cache_hits), ("shared", self.cache_shared), ("miss", self.cache_misses)):
+            lines.append(f'te_service_cache_total{{result="{k}"}} {v}')
+        return "\n".join(lines) + "\n" + latency_prometheus()
+
+    async def serve(self, host: str, port: int, ready: Optional[threading.Event] = None):
+        server = await asyncio.start_server(self.handle_conn, host, port, limit=64 * 1024)
+        self.port = server.sockets[0].getsockname()[1]
+        logging.info("te_service in ascolto su http://%s:%d (DB %s)", host, self.port, self.cfg.DB_PATH)
+        if ready is not None: ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def shutdown(self):
+        self.cpu_pool.shutdown(wait=False, cancel_futures=True)
+        self.llm_pool.shutdown(wait=False, cancel_futures=True)
+        self.es_pool.shutdown(wait=False, cancel_futures=True)
+        self.sig_pool.shutdown(wait=False, cancel_futures=True)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="TE Macro Agent – servizio HTTP (JSON)")
+    ap.add_argument("--host", default="")
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=0, help="thread per gli stadi CPU/DB (default Config.SERVICE_WORKERS)")
+    args = ap.parse_args(argv)
+    ag.setup_logging(logging.INFO)
+    cfg = ag.Config()
+    from te_writer import get_writer
+    get_writer(cfg.DB_PATH)   # schema + WAL e scrittore unico (refresh): per il resto il servizio legge in sola lettura
+    svc = ReportService(cfg, workers=args.workers or None)
+    try:
+        asyncio.run(svc.serve(args.host or cfg.SERVICE_HOST, args.port or cfg.SERVICE_PORT))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        svc.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,398 @@
+# te_summarizer.py — client LLM per ES, riassunti e traduzioni IT (caricato su richiesta dal macro agent)
+# - anthropic importato alla creazione del client
+# - Retry su rate limit, 5xx/sovraccarico e rete (retry dell'SDK spenti nelle chiamate dirette), token/costi registrati nel trace per task (es/summary/translate)
+# - Titoli "a formula" tradotti dai template locali (te_headlines, Config.HEADLINE_TEMPLATES): niente richiesta LLM
+# - Modalità Message Batches (batch_generate): ES + titoli/riassunti IT di uno o più run in un'unica batch,
+#   polling fino alla fine e risultati rimappati per custom_id con lo stesso post-processing delle chiamate dirette
+# - Modello/timeout per task (Config.LLM_TASK_MODELS/LLM_TASK_TIMEOUT_S) e istogrammi di latenza per task × modello
+#   nel processo (latency_stats, latency_prometheus)
+# - Richieste "hedged" (Config.LLM_HEDGE): se la chiamata supera il p95 osservato del task (prima: LLM_SLO_P95_S)
+#   parte una copia, anche su un modello alternativo (LLM_HEDGE_MODELS); vince la prima risposta valida, la copia
+#   ancora in coda è annullata, quella già in volo scartata. Copie in volo al più HEDGE_MAX_INFLIGHT nel processo
+#   (oltre: niente copia, si aspetta la prima), ognuna con timeout pari all'attesa dell'hedge e senza retry
+
+import contextvars, threading, time, logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Tuple
+
+import te_trace as tr
+from te_macro_agent_final_multi import (Config, PROMPT_ES, build_es_input_text, _normalize_spaces_in_perc,
+                                        _strip_generic_intro, _strip_translation_preambles)
+
+# Prezzi USD per milione di token (input, output) per la stima costi nel trace
+LLM_PRICES_USD_PER_MTOK = {
+    "claude-3-haiku-20240307": (0.25, 1.25),
+    "claude-3-5-haiku-latest": (0.80, 4.00),
+    "claude-3-5-sonnet-latest": (3.00, 15.00),
+}
+
+BATCH_DISCOUNT = 0.5   # le Message Batches costano la metà
+
+def _template_title_it(title: str, cfg: Config) -> Optional[str]:
+    if not getattr(cfg, "HEADLINE_TEMPLATES", False): return None
+    from te_headlines import translate_headline
+    return translate_headline(title)
+
+# ---- Latenze per task × modello (condivise fra run del processo: servono al budget dell'hedging) ----
+LATENCY_BUCKETS_S = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+HEDGE_POOL_WORKERS = 16
+HEDGE_MAX_INFLIGHT = 4   # copie in volo nel processo: le perdenti tengono un thread del pool fino al loro timeout
+
+class LatencyHistogram:
+    """Bucket cumulativi (Prometheus) + ultime latenze per i percentili."""
+    __slots__ = ("buckets", "count", "sum_s", "max_s", "recent")
+
+    def __init__(self, window: int = 512):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_S) + 1)
+        self.count, self.sum_s, self.max_s = 0, 0.0, 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.buckets[next((i for i, b in enumerate(LATENCY_BUCKETS_S) if seconds <= b), len(LATENCY_BUCKETS_S))] += 1
+        self.count += 1; self.sum_s += seconds; self.max_s = max(self.max_s, seconds)
+        self.recent.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.recent: return None
+        xs = sorted(self.recent)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        ms = lambda s: round(s * 1000.0, 1) if s is not None else None
+        return {"count": self.count, "mean_ms": ms(self.sum_s / self.count) if self.count else None,
+                "p50_ms": ms(self.quantile(0.50)), "p95_ms": ms(self.quantile(0.95)),
+                "p99_ms": ms(self.quantile(0.99)), "max_ms": ms(self.max_s)}
+
+_latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+_latency_lock = threading.Lock()
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_INFLIGHT)
+
+def observe_latency(task: str, model: str, seconds: float):
+    with _latency_lock:
+        h = _latency.get((task, model))
+        if h is None: h = _latency[(task, model)] = LatencyHistogram()
+        h.observe(seconds)
+
+def latency_stats() -> Dict[str, Dict[str, Any]]:
+    """{"task/modello": count, mean/p50/p95/p99/max in ms} delle chiamate riuscite del processo."""
+    with _latency_lock:
+        return {f"{t}/{m}": h.to_dict() for (t, m), h in sorted(_latency.items())}
+
+def latency_prometheus() -> str:
+    lines = ["# TYPE te_llm_latency_seconds histogram"]
+    with _latency_lock:
+        for (task, model), h in sorted(_latency.items()):
+            lbl, acc = f'task="{task}",model="{model}"', 0
+            for b, n in zip((*LATENCY_BUCKETS_S, "+Inf"), h.buckets):
+                acc += n
+                lines.append(f'te_llm_latency_seconds_bucket{{{lbl},le="{b}"}} {acc}')
+            lines.append(f"te_llm_latency_seconds_sum{{{lbl}}} {h.sum_s:.6f}")
+            lines.append(f"te_llm_latency_seconds_count{{{lbl}}} {h.count}")
+    return "\n".join(lines) + "\n"
+
+def hedge_budget_s(cfg: Config, task: str, model: str) -> float:
+    """Attesa prima della copia: p95 osservato del task × modello, o lo SLO finché i campioni sono pochi."""
+    slo = cfg.LLM_SLO_P95_S.get(task, 30.0)
+    with _latency_lock:
+        h = _latency.get((task, model))
+        p95 = h.quantile(0.95) if h is not None and h.count >= cfg.LLM_HEDGE_MIN_SAMPLES else None
+    return slo if p95 is None else p95
+
+def _pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _latency_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_WORKERS, thread_name_prefix="te-llm")
+        return _hedge_pool
+
+def _task_model(cfg: Optional[Config], task: str, default: str) -> str:
+    return (cfg.LLM_TASK_MODELS.get(task) if cfg is not None else None) or default
+
+def _record_usage(sp, task: str, model: str, resp, discount: float = 1.0):
+    usage = getattr(resp, "usage", None)
+    if usage is None: return
+    tin = int(getattr(usage, "input_tokens", 0) or 0)
+    tout = int(getattr(usage, "output_tokens", 0) or 0)
+    sp.set(input_tokens=tin, output_tokens=tout)
+    tr.add("llm_tokens", tin, task=task, kind="input")
+    tr.add("llm_tokens", tout, task=task, kind="output")
+    p_in, p_out = LLM_PRICES_USD_PER_MTOK.get(model, (0.0, 0.0))
+    if p_in or p_out:
+        cost = (tin * p_in + tout * p_out) / 1e6 * discount
+        sp.set(cost_usd=cost)
+        tr.add("llm_cost_usd", cost, task=task)
+
+RETRY_STATUS = (408, 409, 429, 500, 502, 503, 504, 529)
+
+def _retry_wait_s(e: Exception, attempt: int) -> Optional[float]:
+    """Secondi prima di ritentare, None se l'errore non si ritenta: rate limit, sovraccarico/5xx e connessione
+    (come i retry dell'SDK, timeout esclusi: il limite è il timeout del task). retry-after del server se presente."""
+    status = getattr(e, "status_code", None)
+    rate = "rate_limit" in str(e).lower() or "429" in str(e)
+    if not (rate or status in RETRY_STATUS or type(e).__name__ == "APIConnectionError"):
+        return None
+    try: return min(60.0, max(0.0, float(e.response.headers["retry-after"])))
+    except Exception: return float(2 ** attempt)   # backoff esponenziale: 2^attempt secondi
+
+def _retry_reason(e: Exception) -> str:
+    if "rate_limit" in str(e).lower() or "429" in str(e): return "Rate limit raggiunto"
+    status = getattr(e, "status_code", None)
+    return f"Errore API {status}" if status else "Connessione all'API fallita"
+
+class MacroSummarizer:
+    def __init__(self, api_key: str, model: str, temp: float, max_tokens: int):
+        import anthropic
+        if not api_key: raise RuntimeError("ANTHROPIC_API_KEY non impostata nel .env")
+        self.client = anthropic.Anthropic(api_key=api_key)
+        self._client_once = self.client.with_options(max_retries=0)   # chiamate dirette: retry in _call_with_retry_inner
+        self.model, self.temp, self.max_tokens = model, temp, max_tokens
+
+    def _call_with_retry(self, messages, temperature, max_tokens, max_retries=5, task="llm", cfg: Optional[Config] = None):
+        """Chiama l'API con retry automatico in caso di rate limit (con cfg: modello/timeout del task e hedging)"""
+        model = _task_model(cfg, task, self.model)
+        timeout = cfg.LLM_TASK_TIMEOUT_S.get(task) if cfg is not None else None
+        call = lambda m, hedge, retries=max_retries, tmo=timeout: self._attempt(
+            task, m, messages, temperature, max_tokens, retries, tmo, hedge, cfg)
+        if cfg is None or not cfg.LLM_HEDGE:
+            return self._observe(task, model, *call(model, 0), cfg)
+        pool = _pool()
+        primary = pool.submit(contextvars.copy_context().run, call, model, 0)
+        budget = hedge_budget_s(cfg, task, model)
+        done, _ = wait([primary], timeout=budget)
+        if done: return self._observe(task, model, *primary.result(), cfg)
+        if not _hedge_slots.acquire(blocking=False):   # troppe copie in volo: niente hedge, si aspetta la prima
+            tr.add("llm_hedge_skipped", task=task)
+            return self._observe(task, model, *primary.result(), cfg)
+        hedge_model = cfg.LLM_HEDGE_MODELS.get(task) or model
+        # la copia serve solo se arriva entro un'altra attesa dell'hedge: oltre, la prima è altrettanto vicina
+        copy = pool.submit(contextvars.copy_context().run, call, hedge_model, 1, 1, min(budget, timeout or budget))
+        copy.add_done_callback(lambda _: _hedge_slots.release())
+        tr.add("llm_hedged", task=task)
+        pending, err = {primary, copy}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is not None:
+                    err = f.exception(); continue
+                for p in pending: p.cancel()   # in coda: annullata; già in volo: risposta (e latenza) scartata
+                tr.add("llm_hedge_winner", task=task, winner="copy" if f is copy else "primary")
+                return self._observe(task, hedge_model if f is copy else model, *f.result(), cfg)
+        raise err
+
+    @staticmethod
+    def _observe(task, model, resp, lat, cfg):
+        """Solo la gamba vincente (o l'unica) entra nell'istogramma che decide il budget dell'hedging."""
+        if resp is not None and lat is not None:
+            observe_latency(task, model, lat)
+            if cfg is not None and lat > cfg.LLM_SLO_P95_S.get(task, float("inf")):
+                tr.add("llm_slo_miss", task=task)
+        return resp
+
+    def _attempt(self, task, model, messages, temperature, max_tokens, max_retries, timeout, hedge, cfg):
+        """(risposta, latenza della sola chiamata riuscita: esclusi i tentativi in 429 e le attese di backoff)"""
+        with tr.span(f"llm.{task}", model=model, hedge=hedge) as sp:
+            resp, lat = self._call_with_retry_inner(messages, temperature, max_tokens, max_retries, sp, model, timeout)
+            if lat is not None: sp.set(latency_ms=round(lat * 1000.0, 1))
+            _record_usage(sp, task, model, resp)
+        return resp, lat
+
+    def _call_with_retry_inner(self, messages, temperature, max_tokens, max_retries, sp, model=None, timeout=None):
+        """(risposta, secondi della sola chiamata riuscita). Retry dell'SDK spenti: tentativi e attese sono tutti
+        qui, fuori dalla latenza misurata (istogramma dell'hedging)."""
+        client = self._client_once
+        for attempt in range(max_retries):
+            try:
+                extra = {"timeout": timeout} if timeout else {}
+                t0 = time.perf_counter()
+                resp = client.messages.create(
+                    model=model or self.model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    messages=messages,
+                    **extra
+                )
+                return resp, time.perf_counter() - t0
+            except Exception as e:
+                wait_time = _retry_wait_s(e, attempt)
+                if wait_time is None:
+                    raise
+                if attempt < max_retries - 1:
+                    sp.incr("retries")
+                    logging.warning(f"{_retry_reason(e)}. Attendo {wait_time:g}s prima del retry {attempt+1}/{max_retries}...")
+                    time.sleep(wait_time)
+                    continue
+                logging.error("%s: tutti i tentativi falliti", _retry_reason(e))
+                raise
+        return None, None
+
+    # ---- richieste (messages/temperature/max_tokens) e post-processing per task ----
+    def _es_params(self, context_items: List[Dict[str, Any]], cfg: Config, chosen_countries: List[str]) -> Dict[str, Any]:
+        extra = max(0, len(chosen_countries)-1)
+        target_words = cfg.ES_WORD_MIN + cfg.ES_WORD_PER_EXTRA_COUNTRY * extra
+        content_text = build_es_input_text(context_items, cfg.ES_INPUT_MODE) if context_items else "Nessun contenuto."
+        return dict(
+            messages=[{"role":"user","content":f"{PROMPT_ES}\n\nLunghezza obiettivo: circa {target_words} parole.\n\nTESTO DA RIELABORARE:\n{content_text}"}],
+            temperature=self.temp,
+            max_tokens=min(cfg.MAX_TOKENS,1600),
+        )
+
+    @staticmethod
+    def _es_post(text: str) -> str:
+        text = _normalize_spaces_in_perc((text or "").strip())
+        text = _strip_generic_intro(text)
+        return text or "Executive Summary non disponibile."
+
+    def executive_summary(self, context_items: List[Dict[str, Any]], cfg: Config, chosen_countries: List[str],
+                          fallback: bool = True) -> str:
+        """fallback=False: gli errori (già ritentati in _call_with_retry) sollevano invece del testo segnaposto"""
+        try:
+            resp = self._call_with_retry(**self._es_params(context_items, cfg, chosen_countries), task="es", cfg=cfg)
+            return self._es_post(resp.content[0].text if resp and resp.content else "")
+        except Exception as e:
+            logging.error("Errore ES: %s", e)
+            if not fallback: raise
+            return "Executive Summary non disponibile per errore di generazione."
+
+    def _summary_params(self, item: Dict[str, Any], cfg: Config) -> Dict[str, Any]:
+        title = (item.get("title","") or "").strip()
+        desc  = (item.get("description","") or "").strip()
+        country = (item.get("country","") or "").strip()
+        text_in = f"TITOLO: {title}\nPAESE: {country}\nTESTO: {desc}"
+        prompt = (
+            "Scrivi un riassunto in ITALIANO della seguente notizia economica. "
+            "Usa 100–120 parole, tono professionale e chiaro, senza elenchi puntati né sezioni. "
+            "Mantieni tutti i dati numerici presenti nel testo (percentuali, livelli, variazioni) senza introdurne di nuovi. "
+            "Evidenzia il messaggio macro principale e l'eventuale implicazione di policy. "
+            "Inizia direttamente con il contenuto.\n\n"
+            f"CONTENUTO:\n{text_in}"
+        )
+        return dict(messages=[{"role":"user","content":prompt}], temperature=min(self.temp,0.3), max_tokens=500)
+
+    @staticmethod
+    def _summary_post(text: str) -> str:
+        return _normalize_spaces_in_perc((text or "").strip())
+
+    def summarize_item_it(self, item: Dict[str, Any], cfg: Config, fallback: bool = True) -> str:
+        """fallback=False: errori e risposte vuote sollevano invece di ripiegare sul titolo (es. per non metterli in cache)"""
+        try:
+            resp = self._call_with_retry(**self._summary_params(item, cfg), task="summary", cfg=cfg)
+            text = self._summary_post(resp.content[0].text if resp and resp.content else "")
+            if not text and not fallback: raise ValueError("risposta vuota")
+            return text
+        except Exception as e:
+            logging.error("Errore summarize_item_it: %s", e)
+            if not fallback: raise
+            return ((item.get("title","") or "").strip())[:180]
+
+    def _translate_params(self, text: str, cfg: Config) -> Dict[str, Any]:
+        prompt = "Traduci in ITALIANO il seguente titolo. Rispondi SOLO con il titolo tradotto, senza frasi introduttive.\n\n" + text
+        return dict(messages=[{"role":"user","content":prompt}], temperature=min(self.temp,0.2), max_tokens=120)
+
+    @staticmethod
+    def _translate_post(text: str) -> str:
+        return _strip_translation_preambles(_normalize_spaces_in_perc((text or "").strip()))
+
+    def translate_it(self, text: str, cfg: Config, fallback: bool = True) -> str:
+        """fallback=False: errori e risposte vuote sollevano invece di restituire il titolo originale"""
+        if not text: return ""
+        local = _template_title_it(text, cfg)
+        if local: return local
+        try:
+            resp = self._call_with_retry(**self._translate_params(text, cfg), task="translate", cfg=cfg)
+            out = self._translate_post(resp.content[0].text if resp and resp.content else "")
+            if not out and not fallback: raise ValueError("risposta vuota")
+            return out
+        except Exception as e:
+            logging.error("Errore translate_it: %s", e)
+            if not fallback: raise
+            return text
+
+    def enrich_item_it(self, it: Dict[str, Any], cfg: Config, task: str) -> bool:
+        """title_it (task "translate") o summary_it ("summary") in place; False se è un ripiego (titolo originale o
+        descrizione), segnato con it["llm_fallback"] perché non finisca in llm_cache."""
+        try:
+            if task == "translate": it["title_it"] = self.translate_it(it.get("title", ""), cfg, fallback=False)
+            else: it["summary_it"] = self.summarize_item_it(it, cfg, fallback=False)
+            return True
+        except Exception as e:
+            logging.warning("%s IT non disponibile: %s", "Titolo" if task == "translate" else "Riassunto", e)
+            if task == "translate": it["title_it"] = it.get("title", "")
+            else: it["summary_it"] = it.get("description", "") or ""
+            it["llm_fallback"] = True
+            return False
+
+    # ---- Message Batches ----
+    def _batches(self):
+        b = getattr(self.client.messages, "batches", None)
+        return b if b is not None else self.client.beta.messages.batches   # SDK meno recenti: API in beta
+
+    def batch_generate(self, cfg: Config, es_jobs: Optional[Dict[str, Tuple[List[Dict[str, Any]], List[str]]]] = None,
+                       items: Optional[List[Dict[str, Any]]] = None, poll_s: Optional[float] = None,
+                       timeout_s: Optional[float] = None) -> Dict[str, str]:
+        """
+        ES (es_jobs: chiave -> (context_items, paesi)) + titolo/riassunto IT degli items in un'unica Message Batch.
+        Gli items ricevono title_it/summary_it in place; ritorna {chiave: testo ES}.
+        Richieste fallite/scadute (o batch non conclusa entro timeout_s) ripiegano sulle chiamate dirette.
+        """
+        es_jobs, items = es_jobs or {}, items or []
+        poll_s = cfg.LLM_BATCH_POLL_S if poll_s is None else poll_s
+        timeout_s = cfg.LLM_BATCH_TIMEOUT_S if timeout_s is None else timeout_s
+        reqs, route = [], {}   # custom_id -> (task, chiave es | indice item)
+        models = {t: _task_model(cfg, t, self.model) for t in ("es", "translate", "summary")}
+        for n, (key, (ctx, countries)) in enumerate(es_jobs.items()):
+            cid = f"es-{n}"; route[cid] = ("es", key)
+            reqs.append({"custom_id": cid, "params": dict(model=models["es"], **self._es_params(ctx, cfg, countries))})
+        for i, it in enumerate(items):
+            title = it.get("title", "") or ""
+            local = _template_title_it(title, cfg) if title else None
+            if local:
+                it["title_it"] = local
+            elif title:
+                cid = f"tr-{i}"; route[cid] = ("translate", i)
+                reqs.append({"custom_id": cid, "params": dict(model=models["translate"], **self._translate_params(title, cfg))})
+            else:
+                it["title_it"] = ""
+            cid = f"su-{i}"; route[cid] = ("summary", i)
+            reqs.append({"custom_id": cid, "params": dict(model=models["summary"], **self._summary_params(it, cfg))})
+        es_out: Dict[str, str] = {}
+        if not reqs: return es_out
+
+        done = set()
+        with tr.span("llm.batch", model=self.model, requests=len(reqs)) as sp:
+            api = self._batches()
+            batch = api.create(requests=reqs)
+            logging.info("Message Batch %s inviata (%d richieste)", batch.id, len(reqs))
+            deadline = time.monotonic() + timeout_s
+            while batch.processing_status != "ended":
+                if time.monotonic() > deadline:
+                    logging.warning("Message Batch %s non conclusa entro %ss: annullo e ripiego sulle chiamate dirette", batch.id, timeout_s)
+                    try: api.cancel(batch.id)
+                    except Exception as e: logging.warning("Annullamento batch fallito: %s", e)
+                    break
+                time.sleep(poll_s); sp.incr("polls")
+                batch = api.retrieve(batch.id)
+            if batch.processing_status == "ended":
+                for entry in api.results(batch.id):
+                    task, ref = route.get(entry.custom_id, (None, None))
+                    if task is None: continue
+                    if getattr(entry.result, "type", "") != "succeeded":
+                        tr.add("llm_batch_failed", task=task, kind=getattr(entry.result, "type", "?"))
+                        continue
+                    msg = entry.result.message
+                    text = msg.content[0].text if msg.content else ""
+                    with tr.span(f"llm.{task}", model=models[task], batch=1) as sp_t:
+                        _record_usage(sp_t, task, models[task], msg, discount=BATCH_DISCOUNT)
+                    if task == "es": es_out[ref] = self._es_post(text)
+                    elif task == "translate": items[ref]["title_it"] = self._translate_post(text)
+                    else: items[ref]["summary_it"] = self._summary_post(text)
+                    done.add(entry.custom_id)
+            sp.set(succeeded=len(done), fallback=len(reqs) - len(done))
+
+        # ripiego sincrono per quanto manca
+        for cid, (task, ref) in route.items():
+            if cid in done: continue
+            if task == "es": es_out[ref] = self.executive_summary(es_jobs[ref][0], cfg, es_jobs[ref][1])
+            else: self.enrich_item_it(items[ref], cfg, task)
+        return es_out
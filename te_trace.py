@@ -0,0 +1,201 @@
+# te_trace.py — strumentazione leggera per run: span (durate + attributi) e contatori
+# - Una TraceRun attiva per contesto (contextvars): senza run attiva span()/add() sono no-op
+# - Attributi tipici: item letti/scritti, iterazioni di scroll, retry, token input/output
+# - Export: trace JSON e snapshot in formato testo Prometheus; breakdown per stage per la UI
+# - Con un profilo attivo (te_profile) ogni thread pubblica run e span aperto: i campioni sono attribuiti agli stage
+
+import json, time, threading, contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple
+
+# attributi "parametro" (non sommati nel breakdown per stage)
+PARAM_ATTRS = {"days", "max_days", "max_age_days", "retry", "countries", "workers"}
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar("te_trace_run", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("te_trace_span", default=None)
+# thread ident -> (run, nome dello span aperto); None se nessun profilo è attivo (costo nullo negli span)
+_thread_stage: Optional[Dict[int, Tuple["TraceRun", str]]] = None
+_thread_stage_users = 0
+_thread_stage_lock = threading.Lock()
+
+class Span:
+    __slots__ = ("id", "parent", "name", "start", "end", "attrs", "thread")
+
+    def __init__(self, sid: int, parent: Optional[int], name: str, attrs: Dict[str, Any]):
+        self.id, self.parent, self.name, self.attrs = sid, parent, name, attrs
+        self.start = time.perf_counter(); self.end = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def incr(self, key: str, value: float = 1):
+        self.attrs[key] = self.attrs.get(key, 0) + value
+
+    @property
+    def duration_s(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start)
+
+class _NoSpan:
+    __slots__ = ()
+    def set(self, **attrs): pass
+    def incr(self, key: str, value: float = 1): pass
+
+NO_SPAN = _NoSpan()
+
+class TraceRun:
+    def __init__(self, name: str, **attrs):
+        self.name, self.attrs = name, dict(attrs)
+        self.wall_start = time.time()
+        self.t0 = time.perf_counter()
+        self.spans: List[Span] = []
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _open(self, name: str, parent: Optional[int], attrs: Dict[str, Any]) -> Span:
+        with self._lock:
+            self._next_id += 1
+            sp = Span(self._next_id, parent, name, attrs)
+            self.spans.append(sp)
+        return sp
+
+    def add(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    # ---- export ----
+    def stage_breakdown(self) -> List[Dict[str, Any]]:
+        """Aggregato per nome di span: chiamate, totale/max ms, somma degli attributi numerici."""
+        agg: Dict[str, Dict[str, Any]] = {}
+        for sp in self.spans:
+            a = agg.setdefault(sp.name, {"stage": sp.name, "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            ms = sp.duration_s * 1000.0
+            a["calls"] += 1; a["total_ms"] += ms; a["max_ms"] = max(a["max_ms"], ms)
+            for k, v in sp.attrs.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool) and k not in PARAM_ATTRS:
+                    a[k] = a.get(k, 0) + v
+        rows = sorted(agg.values(), key=lambda r: -r["total_ms"])
+        for r in rows:
+            r["total_ms"] = round(r["total_ms"], 1); r["max_ms"] = round(r["max_ms"], 1)
+        return rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run": self.name, "attrs": self.attrs, "started_at": self.wall_start,
+            "duration_s": round(time.perf_counter() - self.t0, 4),
+            "spans": [{
+                "id": sp.id, "parent": sp.parent, "name": sp.name, "thread": sp.thread,
+                "start_s": round(sp.start - self.t0, 4), "duration_s": round(sp.duration_s, 4),
+                "attrs": sp.attrs,
+            } for sp in self.spans],
+            "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self.counters.items()],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=1, default=str)
+
+    def to_prometheus(self) -> str:
+        def _lbl(pairs) -> str:
+            if not pairs: return ""
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+        lines = ["# TYPE te_stage_duration_seconds summary"]
+        for r in self.stage_breakdown():
+            lbl = _lbl([("stage", r["stage"])])
+            lines.append(f"te_stage_duration_seconds_sum{lbl} {r['total_ms']/1000.0:.6f}")
+            lines.append(f"te_stage_duration_seconds_count{lbl} {r['calls']}")
+        seen = set()
+        for (name, labels), v in sorted(self.counters.items()):
+            metric = f"te_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter"); seen.add(metric)
+            lines.append(f"{metric}{_lbl(labels)} {v:g}")
+        lines.append("# TYPE te_run_duration_seconds gauge")
+        lines.append(f"te_run_duration_seconds{_lbl([('run', self.name)])} {time.perf_counter() - self.t0:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, out_dir: str, stem: str) -> Dict[str, str]:
+        d = Path(out_dir); d.mkdir(parents=True, exist_ok=True)
+        pj, pp = d / f"{stem}.trace.json", d / f"{stem}.prom"
+        pj.write_text(self.to_json(), encoding="utf-8")
+        pp.write_text(self.to_prometheus(), encoding="utf-8")
+        return {"json": str(pj), "prom": str(pp)}
+
+# ============= Stage per thread (campionatori di te_profile) =============
+def track_thread_stages(on: bool):
+    """Attiva/disattiva (a conteggio) la pubblicazione di run/span per thread."""
+    global _thread_stage, _thread_stage_users
+    with _thread_stage_lock:
+        _thread_stage_users = max(0, _thread_stage_users + (1 if on else -1))
+        if _thread_stage_users and _thread_stage is None: _thread_stage = {}
+        elif not _thread_stage_users: _thread_stage = None
+
+def publish_thread_stage(on: bool = True):
+    """Pubblica (o toglie) run/span correnti del thread chiamante: per chi attiva il profilo dentro una run già aperta."""
+    st, run = _thread_stage, _current_run.get()
+    if st is None or run is None: return
+    if not on:
+        st.pop(threading.get_ident(), None); return
+    sp = _current_span.get()
+    st[threading.get_ident()] = (run, sp.name if sp is not None else run.name)
+
+def thread_stages() -> Dict[int, Tuple["TraceRun", str]]:
+    st = _thread_stage
+    return dict(st) if st is not None else {}
+
+@contextmanager
+def _publish_stage(tr: "TraceRun", name: str):
+    st = _thread_stage
+    if st is None:
+        yield
+        return
+    tid = threading.get_ident()
+    prev = st.get(tid); st[tid] = (tr, name)
+    try:
+        yield
+    finally:
+        if prev is None: st.pop(tid, None)
+        else: st[tid] = prev
+
+# ============= API di modulo (usa la run del contesto corrente) =============
+def current_run() -> Optional[TraceRun]:
+    return _current_run.get()
+
+@contextmanager
+def run(name: str, **attrs):
+    tr = TraceRun(name, **attrs)
+    tok_r = _current_run.set(tr); tok_s = _current_span.set(None)
+    try:
+        with _publish_stage(tr, name):
+            yield tr
+    finally:
+        _current_span.reset(tok_s); _current_run.reset(tok_r)
+
+@contextmanager
+def span(name: str, **attrs):
+    tr = _current_run.get()
+    if tr is None:
+        yield NO_SPAN
+        return
+    parent = _current_span.get()
+    sp = tr._open(name, parent.id if parent is not None else None, attrs)
+    tok = _current_span.set(sp)
+    try:
+        with _publish_stage(tr, name):
+            yield sp
+    except BaseException as e:
+        sp.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        sp.end = time.perf_counter()
+        _current_span.reset(tok)
+
+def add(name: str, value: float = 1, **labels):
+    tr = _current_run.get()
+    if tr is not None: tr.add(name, value, **labels)
+
+def current_span():
+    sp = _current_span.get()
+    return sp if sp is not None else NO_SPAN
@@ -0,0 +1,179 @@
+# te_writer.py — scrittore unico del DB nel processo (sessioni Streamlit, job, servizio)
+# - Un thread dedicato possiede l'unica connessione di scrittura: nessuna contesa sui lock fra sessioni
+# - Job upsert/prune/meta/llm_cache in coda; a ogni giro il thread svuota la coda e fonde i job pendenti
+#   (upsert uniti per chiave, vince l'osservazione più recente; prune identici eseguiti una volta)
+#   in un'unica transazione, poi risponde a ogni job con la data_version risultante
+# - Classificazione e valori delle chiavi nuove (db_upsert_prepare) nel thread di chi invia il job, con una
+#   connessione in lettura: nel thread scrittore, sotto lock, restano solo gli executemany
+# - Tutti gli altri leggono con connessioni in sola lettura (db_connect_ro, WAL)
+# - get_writer(path): un writer per file DB e processo
+
+import atexit, contextvars, logging, os, queue, threading, time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any
+
+import te_macro_agent_final_multi as ag
+import te_trace as tr
+
+MAX_JOBS_PER_TXN = 64
+
+@dataclass
+class _Job:
+    kind: str                                   # "upsert" | "prune" | "meta" | "llm_cache"
+    future: Future
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    keys: List[str] = field(default_factory=list)               # _fp degli item, calcolati da chi invia
+    prepared: Dict[str, tuple] = field(default_factory=dict)   # db_upsert_prepare, calcolato da chi invia
+    now: float = 0.0
+    max_age_days: int = 0
+    cold_dir: Optional[str] = None
+    meta: Dict[str, int] = field(default_factory=dict)
+    cache_rows: List[tuple] = field(default_factory=list)       # righe di llm_cache (te_batch)
+    ctx: contextvars.Context = field(default_factory=contextvars.copy_context)   # trace di chi ha inviato il job
+
+class DBWriter:
+    """Thread scrittore con coda di job; i metodi pubblici sono thread-safe e ritornano la data_version."""
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.data_version = 0
+        self.stats = {"jobs": 0, "transactions": 0, "rows": 0, "merged_rows": 0, "merged_prunes": 0}
+        self._q: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="te-db-writer")
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    # ---- API ----
+    def submit_upsert(self, items: List[Dict[str, Any]], now: Optional[float] = None) -> Future:
+        items, now = list(items), time.time() if now is None else float(now)
+        keys = [ag._fp(it) for it in items]
+        conn = ag.db_connect_ro(self.db_path)
+        try:
+            prepared = ag.db_upsert_prepare(conn, items, keys)
+        finally:
+            conn.close()
+        return self._submit(_Job("upsert", Future(), items=items, keys=keys, prepared=prepared, now=now))
+
+    def submit_prune(self, max_age_days: int, cold_dir: Optional[str] = None) -> Future:
+        return self._submit(_Job("prune", Future(), max_age_days=int(max_age_days), cold_dir=cold_dir))
+
+    def submit_meta(self, **values: int) -> Future:
+        return self._submit(_Job("meta", Future(), meta={k: int(v) for k, v in values.items()}))
+
+    def submit_llm_cache(self, rows: List[tuple], prune_days: int = 0) -> Future:
+        """Righe di llm_cache (db_llm_cache_put); prune_days > 0: anche le righe più vecchie tolte."""
+        return self._submit(_Job("llm_cache", Future(), cache_rows=list(rows), max_age_days=int(prune_days)))
+
+    def upsert(self, items: List[Dict[str, Any]], now: Optional[float] = None, timeout: Optional[float] = None) -> int:
+        return self.submit_upsert(items, now).result(timeout)
+
+    def prune(self, max_age_days: int, cold_dir: Optional[str] = None, timeout: Optional[float] = None) -> int:
+        return self.submit_prune(max_age_days, cold_dir).result(timeout)
+
+    def set_meta(self, timeout: Optional[float] = None, **values: int) -> int:
+        return self.submit_meta(**values).result(timeout)
+
+    def close(self, timeout: float = 30.0):
+        if self._thread.is_alive():
+            self._q.put(None)
+            self._thread.join(timeout)
+
+    def _submit(self, job: _Job) -> Future:
+        if not self._thread.is_alive():
+            raise RuntimeError(f"Writer DB chiuso: {self.db_path}")
+        self._q.put(job)
+        return job.future
+
+    # ---- thread scrittore ----
+    def _loop(self):
+        try:
+            conn = ag.db_init(self.db_path)
+            self.data_version = ag.db_data_version(conn)
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            while True:
+                job = self._q.get()
+                if job is None: break
+                jobs, stop = [job], False
+                while len(jobs) < MAX_JOBS_PER_TXN:
+                    try: nxt = self._q.get_nowait()
+                    except queue.Empty: break
+                    if nxt is None: stop = True; break
+                    jobs.append(nxt)
+                jobs[0].ctx.run(self._apply, conn, jobs)   # span nella trace del primo job del giro
+                if stop: break
+        finally:
+            conn.close()
+
+    def _apply(self, conn, jobs: List[_Job]):
+        """Job fusi in una transazione; in caso di errore rollback e stessa eccezione a tutti i job del giro."""
+        ups = [j for j in jobs if j.kind == "upsert"]
+        prunes = list(dict.fromkeys((j.max_age_days, j.cold_dir) for j in jobs if j.kind == "prune"))
+        meta = {k: v for j in jobs if j.kind == "meta" for k, v in j.meta.items()}   # vince l'ultimo job
+        cache_rows = [r for j in jobs if j.kind == "llm_cache" for r in j.cache_rows]
+        cache_prune = sorted({j.max_age_days for j in jobs if j.kind == "llm_cache" and j.max_age_days > 0})
+        # stessa chiave da più job (sessioni che scaricano gli stessi paesi): una riga, l'osservazione più recente
+        latest: Dict[str, tuple] = {}
+        for j in ups:
+            for k, it in zip(j.keys, j.items):
+                if k not in latest or j.now >= latest[k][0]: latest[k] = (j.now, it)
+        by_now: Dict[float, List[tuple]] = {}
+        for k, (now, it) in latest.items(): by_now.setdefault(now, []).append((k, it))
+        prepared = {k: v for j in ups for k, v in j.prepared.items()}
+        n_in = sum(len(j.items) for j in ups)
+        with tr.span("db.writer", jobs=len(jobs), rows=len(latest)) as sp:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for now in sorted(by_now):
+                    keys, items = zip(*by_now[now])
+                    ag.db_upsert(conn, list(items), now=now, commit=False, prepared=prepared, keys=list(keys))
+                for max_age_days, cold_dir in prunes:
+                    # prune fallito (es. archivio freddo): righe scadute mantenute, gli upsert del giro restano validi
+                    conn.execute("SAVEPOINT prune")
+                    try:
+                        ag.db_prune(conn, max_age_days, cold_dir=cold_dir, commit=False)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO prune")
+                        logging.error("Prune DB annullato, righe scadute mantenute: %s", e)
+                    conn.execute("RELEASE prune")
+                for k, v in meta.items():
+                    ag.db_set_meta(conn, k, v, commit=False)
+                if cache_rows: ag.db_llm_cache_put(conn, cache_rows, commit=False)
+                for days in cache_prune: ag.db_llm_cache_prune(conn, days, commit=False)
+                conn.commit()
+            except BaseException as e:
+                if conn.in_transaction: conn.rollback()
+                logging.error("Writer DB: transazione annullata (%d job): %s", len(jobs), e)
+                for j in jobs: j.future.set_exception(e)
+                return
+            self.data_version = ag.db_data_version(conn)
+            sp.set(merged_rows=n_in - len(latest), data_version=self.data_version)
+        st = self.stats
+        st["jobs"] += len(jobs); st["transactions"] += 1; st["rows"] += len(latest)
+        st["merged_rows"] += n_in - len(latest)
+        st["merged_prunes"] += sum(j.kind == "prune" for j in jobs) - len(prunes)
+        for j in jobs: j.future.set_result(self.data_version)
+
+_writers: Dict[str, DBWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_writer(db_path: str) -> DBWriter:
+    """Writer del processo per il file DB (creato al primo uso: schema/migrazioni nel thread scrittore)."""
+    key = os.path.abspath(db_path)
+    with _writers_lock:
+        w = _writers.get(key)
+        if w is None or not w._thread.is_alive():
+            w = _writers[key] = DBWriter(db_path)
+        return w
+
+@atexit.register
+def _close_all():
+    for w in list(_writers.values()): w.close()